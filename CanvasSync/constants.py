@@ -14,10 +14,18 @@ HISTORY_ID = u'id'
 HISTORY_MODIFIED_AT = u'modified_at'
 HISTORY_PATH = u'path'
 HISTORY_TYPE = u'type'
+HISTORY_SIZE = u'size'
+HISTORY_ETAG = u'etag'
+HISTORY_CONTENT_HASH = u'content_hash'
+HISTORY_VERIFIED_AT = u'verified_at'
+
+# The hashlib algorithm of the content hash recorded in the history
+CONTENT_HASH_ALGORITHM = u'sha256'
 
 # special folder names
 FOLDER_ASSIGNMENTS = u"Assignments"
 FOLDER_OTHERS = u"Other Files"
+FOLDER_ARCHIVE = u".archive"
 
 # entity
 ENTITY_COURSE = u'course'
@@ -35,7 +43,10 @@ LOCAL_ET_MODULE = u"local_module"
 COURSE_CODE = u'course_code'
 
 # module
+MODULE_ITEMS = u'items'
+MODULE_ITEMS_COUNT = u'items_count'
 MODULE_ITEM_TYPE_FILE = u'File'
+MODULE_ITEM_CONTENT_ID = u'content_id'
 
 # page
 PAGE_ID = u'page_id'
@@ -45,6 +56,12 @@ PAGE_HTML_URL = u'html_url'
 # file
 FILE_LOCKED_FOR_USER = u'locked_for_user'
 FILE_FOLDER_ID = u'folder_id'
+PARTIAL_DOWNLOAD_SUFFIX = u'.part'
+PARTIAL_DOWNLOAD_INFO_SUFFIX = u'.part.info'
+FILE_SIZE = u'size'
+
+# folder
+FOLDER_PARENT_FOLDER_ID = u'parent_folder_id'
 
 # file upload api
 FILE_UPLOAD_LOCATION = u'location'
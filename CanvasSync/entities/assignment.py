@@ -143,7 +143,7 @@ class Assignment(CanvasEntity):
         1) Adding all File and LinkedFile objects to the list of children
         2) Synchronize all children objects
         """
-        print(text_type(self))
+        helpers.print_line(text_type(self))
 
         self.add_files()
         self.make_html()
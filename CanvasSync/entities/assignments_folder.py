@@ -25,6 +25,7 @@ from six import text_type
 from CanvasSync.entities.canvas_entity import CanvasEntity
 from CanvasSync.entities.assignment import Assignment
 from CanvasSync.utilities.ANSI import ANSI
+from CanvasSync.utilities import helpers
 
 
 class AssignmentsFolder(CanvasEntity):
@@ -81,7 +82,7 @@ class AssignmentsFolder(CanvasEntity):
         1) Adding all Assignment objects to the list of children
         2) Synchronize all children objects
         """
-        print(text_type(self))
+        helpers.print_line(text_type(self))
 
         self.add_assignments()
 
@@ -23,8 +23,10 @@ See developer_info.txt file for more information on the class hierarchy of Canva
 
 # Inbuilt modules
 import os
+import time
 
 # CanvasSync module imports
+from CanvasSync import constants as CONSTANTS
 from CanvasSync.utilities import helpers
 
 
@@ -111,6 +113,7 @@ class CanvasEntity(object):
             self.synchronizer = synchronizer
         else:
             self.synchronizer = self.get_parent().get_synchronizer()
+            self.synchronizer.mark_seen(self.sync_path, self.get_course().get_id())
 
             if add_to_list_of_entities:
                 # Add CanvasEntity to the list in the Synchronizer object
@@ -197,6 +200,35 @@ class CanvasEntity(object):
     def update_path(self):
         """ Update the path to the current parents sync path plus the current file name """
         self.sync_path = os.path.join(self.get_parent().get_path(), self.get_name())
+        self.synchronizer.mark_seen(self.sync_path, self.get_course().get_id())
+
+    def is_verification_due(self, history_record):
+        """
+        Returns True if the local file or folder of the entity should be inspected although its history record shows it
+        to be up to date, that is if a full verification is requested or the history record was last verified more than
+        the verify interval ago
+
+        history_record : dict | The history record of the entity
+        """
+        if self.settings.full_verify:
+            return True
+
+        verified_at = history_record.get(CONSTANTS.HISTORY_VERIFIED_AT)
+        if not verified_at:
+            return True
+
+        verify_interval = self.settings.verify_interval_days * 24 * 60 * 60
+        return time.time() - helpers.convert_utc_to_timestamp(verified_at) >= verify_interval
+
+    def mark_verified(self, history_record):
+        """
+        Updates the verification time of a history record to the current time
+
+        history_record : dict | The history record of the entity
+        """
+        history_record = dict(history_record)
+        history_record[CONSTANTS.HISTORY_VERIFIED_AT] = helpers.convert_timestamp_to_utc(time.time())
+        self.synchronizer.history.write_history_record_to_file(history_record)
 
     def _make_folder(self):
         """ Create a folder on the sync path if not already present """
@@ -26,6 +26,7 @@ from __future__ import print_function
 import os
 
 # Third party
+import requests
 from six import text_type
 
 # CanvasSync modules
@@ -69,15 +70,80 @@ class Course(CanvasEntity):
                               identifier=CONSTANTS.ENTITY_COURSE,
                               folder=self.to_be_synced)
 
+        # Request the course in full again if asked to
+        if course_name in self.settings.invalidate_courses or text_type(course_id) in self.settings.invalidate_courses:
+            self.api.invalidate_course(course_id)
+
+        # Dictionaries of information on all files in the course by file ID and lists hereof by folder ID, see
+        # index_files
+        self.file_index = None
+        self.files_by_folder = None
+
+        # Dictionary of lists of information on all folders in the course by parent folder ID, see add_files_folder
+        self.folders_by_parent = {}
+
     def __repr__(self):
         """ String representation, overwriting base class method """
         status = ANSI.format(u"[SYNCED]" if self.to_be_synced else u"[SKIPPED]", formatting=u"green" if self.to_be_synced else u"yellow")
         return status + u" " * (7 if self.to_be_synced else 6) + u"|   " + u"\t" * self.indent + u"%s: %s" \
                                                         % (ANSI.format(u"Course", formatting=u"course"), self.name)
 
+    def index_files(self):
+        """
+        Downloads the information on all files of the course once through the course-wide file listing and indexes it
+        by file ID and by folder ID, instead of requesting information on every single file and folder. If the listing
+        is not accessible to the user (e.g. if the Files section is hidden), the file index stays empty and the folder
+        index is left unset.
+        """
+        if self.file_index is not None:
+            return
+
+        try:
+            files = list(self.api.get_files_in_course(self.id))
+        except requests.exceptions.HTTPError:
+            self.file_index = {}
+            return
+
+        self.file_index = {}
+        self.files_by_folder = {}
+        for file_info in files:
+            self.file_index[file_info[CONSTANTS.ID]] = file_info
+            self.files_by_folder.setdefault(file_info.get(CONSTANTS.FILE_FOLDER_ID), []).append(file_info)
+
+    def get_file_information(self, file_id):
+        """
+        Returns a dictionary of information on a file in the course, or None if the file is not found.
+
+        file_id : int | A file ID number
+        """
+        self.index_files()
+        return self.file_index.get(file_id)
+
+    def get_files_in_folder(self, folder_id):
+        """
+        Returns a list of dictionaries of information on the files located in a given folder of the course. The list is
+        taken from the course-wide file index, or downloaded if the course-wide file listing is not accessible.
+
+        folder_id : int | A folder ID number
+        """
+        self.index_files()
+        if self.files_by_folder is None:
+            return self.api.get_files_in_folder(folder_id)
+
+        return self.files_by_folder.get(folder_id, [])
+
+    def get_sub_folders(self, folder_id):
+        """
+        Returns a list of dictionaries of information on the folders located in a given folder of the course, taken from
+        the course-wide folder listing downloaded by add_files_folder
+
+        folder_id : int | A folder ID number
+        """
+        return self.folders_by_parent.get(folder_id, [])
+
     def download_modules(self):
-        """ Returns a list of dictionaries representing module objects """
-        return self.api.get_modules_in_course(self.id)
+        """ Returns a list of dictionaries representing module objects along with their items """
+        return self.api.get_modules_in_course(self.id, include_items=True)
 
     def add_modules(self):
         """ [HIDDEN]  Method that adds all Module objects to the list of Module objects """
@@ -104,17 +170,18 @@ class Course(CanvasEntity):
         self.add_child(assignments)
 
     def add_files_folder(self):
-        """ Add a SubFolder object representing the files folder of the course """
-
-        # The main file folder should always be the first in the list, but is there a better way to get this initial ID
-        # than downloading the entire list of folders??
-        folders = self.api.get_folders_in_course(self.id)
+        """
+        Add a SubFolder object representing the files folder of the course
 
+        The entire list of folders of the course is downloaded once and indexed by parent folder ID, so that the Folder
+        objects can assemble the folder hierarchy without requesting the sub-folders of every folder.
+        """
         main_folder = None
-        for folder in folders:
+        self.folders_by_parent = {}
+        for folder in self.api.get_folders_in_course(self.id):
             if folder[u"full_name"] == u"course files":
                 main_folder = folder
-                break
+            self.folders_by_parent.setdefault(folder.get(CONSTANTS.FOLDER_PARENT_FOLDER_ID), []).append(folder)
 
         # Change name of folder
         main_folder[u"name"] = u"Other Files"
@@ -148,7 +215,7 @@ class Course(CanvasEntity):
         1) Adding all Modules and AssignmentFolder objects to the list of children
         2) Synchronize all children objects
         """
-        print(text_type(self))
+        helpers.print_line(text_type(self))
 
         if not self.to_be_synced:
             return
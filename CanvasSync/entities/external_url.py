@@ -19,9 +19,6 @@ See developer_info.txt file for more information on the class hierarchy of Canva
 # Future imports
 from __future__ import print_function
 
-# Inbuilt modules
-import sys
-
 # Third party
 from six import text_type
 
@@ -78,8 +75,7 @@ class ExternalUrl(CanvasEntity):
         # As opposed to the File and Page classes we never write the "DOWNLOAD" status as we already have
         # all information needed to create the URL shortcut at this point. Here we just print the SYNCED status
         # no matter if the shortcut was recreated or not
-        print(ANSI.format(u"[SYNCED]", formatting=u"green") + str(self)[len(u"[SYNCED]"):])
-        sys.stdout.flush()
+        helpers.print_line(ANSI.format(u"[SYNCED]", formatting=u"green") + str(self)[len(u"[SYNCED]"):])
 
     def show(self):
         """ Show the folder hierarchy by printing every level """
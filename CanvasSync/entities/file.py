@@ -21,9 +21,10 @@ from __future__ import print_function
 
 # Inbuilt modules
 import os
-import sys
+import time
 
 # Third party
+import requests
 from six import text_type
 
 from CanvasSync import constants as CONSTANTS
@@ -64,31 +65,107 @@ class File(CanvasEntity):
                                                                                     formatting=u"file"),
                                                                         self.name)
 
-    def download(self):
-        """ Download the file """
-        if os.path.exists(self.sync_path):
-            remote_file_modified_at = helpers.convert_utc_to_timestamp(self.file_info.get(CONSTANTS.HISTORY_MODIFIED_AT))
-            local_file_modified_at = os.stat(self.sync_path).st_mtime
-            if remote_file_modified_at == local_file_modified_at:
-                return False
+    def is_recorded(self, history_record):
+        """
+        Returns True if the history record of the local file shows that it holds the current version of the file on the
+        Canvas server, by comparing the ID number, modified_at timestamp and size of the file. The local file itself is
+        not inspected, so changes of its modified time do not cause the file to be downloaded again.
 
-        self.print_status(u"DOWNLOADING", color=u"blue")
+        history_record : dict | The history record of the sync path of the file, or None
+        """
+        if not history_record or not history_record.get(CONSTANTS.HISTORY_SIZE):
+            return False
 
-        # Download file payload from server
-        file_data = self.api.download_file_payload(self.file_info[u"url"])
+        remote_size = self.file_info.get(CONSTANTS.FILE_SIZE)
+        return (history_record.get(CONSTANTS.HISTORY_ID) == text_type(self.id) and
+                history_record.get(CONSTANTS.HISTORY_MODIFIED_AT) == self.file_info.get(CONSTANTS.HISTORY_MODIFIED_AT)
+                and (remote_size is None or history_record.get(CONSTANTS.HISTORY_SIZE) == text_type(remote_size)))
 
-        # Write data to file
+    def verify_local_file(self, history_record):
+        """
+        Returns True if the local file exists and has the size recorded in its history record, and updates the
+        verification time of the record if so. On a full verification, the content hash of the local file must also
+        match the content hash recorded when it was downloaded, if any, which detects files modified without changing
+        their size.
+
+        history_record : dict | The history record of the sync path of the file
+        """
+        try:
+            local_size = os.stat(self.sync_path).st_size
+        except OSError:
+            return False
+
+        if text_type(local_size) != history_record.get(CONSTANTS.HISTORY_SIZE):
+            return False
+
+        content_hash = history_record.get(CONSTANTS.HISTORY_CONTENT_HASH)
+        if self.settings.full_verify and content_hash and helpers.hash_file(self.sync_path).hexdigest() != content_hash:
+            return False
+
+        self.mark_verified(history_record)
+        return True
+
+    def is_unchanged_on_disk(self, history_record):
+        """
+        Returns True if the local file has the modified time of the file on the Canvas server. Used for files without
+        a history record, or with one written before the size of files was recorded. The history record is completed
+        if the file is unchanged.
+
+        history_record : dict | The history record of the sync path of the file, or None
+        """
+        remote_modified_at = self.file_info.get(CONSTANTS.HISTORY_MODIFIED_AT)
         try:
-            with open(self.sync_path, u"wb") as out_file:
-                out_file.write(file_data)
+            local_file_modified_at = os.stat(self.sync_path).st_mtime
+        except OSError:
+            return False
+        if helpers.convert_utc_to_timestamp(remote_modified_at) != local_file_modified_at:
+            return False
+
+        history_record = dict(history_record or {})
+        history_record.update({
+            CONSTANTS.HISTORY_ID: self.id,
+            CONSTANTS.HISTORY_MODIFIED_AT: remote_modified_at,
+            CONSTANTS.HISTORY_PATH: self.sync_path,
+            CONSTANTS.HISTORY_TYPE: CONSTANTS.ENTITY_FILE,
+            CONSTANTS.HISTORY_SIZE: self.file_info.get(CONSTANTS.FILE_SIZE)
+        })
+        self.mark_verified(history_record)
+        return True
 
-        except KeyboardInterrupt as e:
-            # If interrupted mid-writing, delete the corrupted file
-            if os.path.exists(self.sync_path):
-                os.remove(self.sync_path)
+    def is_up_to_date(self):
+        """
+        Returns True if the local file holds the current version of the file on the Canvas server. The decision is made
+        from the history record of the file alone, the local file is only inspected if its history record is missing,
+        outdated or due for verification, see CanvasEntity.is_verification_due.
+        """
+        history_record = self.synchronizer.history.get_history_for_path(self.sync_path)
 
-            # Re-raise, will be catched in CanvasSync.py
-            raise e
+        if self.is_recorded(history_record):
+            return not self.is_verification_due(history_record) or self.verify_local_file(history_record)
+
+        return self.is_unchanged_on_disk(history_record)
+
+    def download(self):
+        """
+        Download the file, returns True or False depending on if the file was downloaded or not. Returns -1 if the
+        server answered the download with an error.
+        """
+        if self.is_up_to_date():
+            return False
+
+        self.print_status(u"DOWNLOADING", color=u"blue")
+
+        # Stream the file payload from the server to disk. The file at the sync path is only replaced once the
+        # payload is completely downloaded. An interruption (e.g. KeyboardInterrupt) keeps the partial download, which
+        # is resumed on the next sync if the file did not change in the mean time, and is re-raised to be catched
+        # in CanvasSync.py. An error response fails the download of this file only.
+        try:
+            payload = self.api.download_file_payload_to_path(
+                self.file_info[u"url"], self.sync_path, size=self.file_info.get(CONSTANTS.FILE_SIZE),
+                modified_at=self.file_info.get(CONSTANTS.HISTORY_MODIFIED_AT))
+        except requests.exceptions.HTTPError:
+            self.print_status(u"FAILED", u"red", overwrite_previous_line=True)
+            return -1
 
         modified_at = self.file_info.get(CONSTANTS.HISTORY_MODIFIED_AT)
         id = self.file_info.get(CONSTANTS.ID)
@@ -98,12 +175,18 @@ class File(CanvasEntity):
         timestamp = helpers.convert_utc_to_timestamp(modified_at)
         os.utime(self.sync_path, (timestamp, timestamp))
 
-        # Update sync history
+        # Update sync history. The size of the file on the Canvas server is recorded to compare it on the next sync, see
+        # is_recorded, and the content hash to detect local changes on a full verification, see verify_local_file
+        size = self.file_info.get(CONSTANTS.FILE_SIZE)
         history_record = dict({
             CONSTANTS.HISTORY_ID: id,
             CONSTANTS.HISTORY_MODIFIED_AT: modified_at,
             CONSTANTS.HISTORY_PATH: path,
-            CONSTANTS.HISTORY_TYPE: CONSTANTS.ENTITY_FILE
+            CONSTANTS.HISTORY_TYPE: CONSTANTS.ENTITY_FILE,
+            CONSTANTS.HISTORY_SIZE: size if size is not None else payload[CONSTANTS.HISTORY_SIZE],
+            CONSTANTS.HISTORY_ETAG: payload[CONSTANTS.HISTORY_ETAG],
+            CONSTANTS.HISTORY_CONTENT_HASH: payload[CONSTANTS.HISTORY_CONTENT_HASH],
+            CONSTANTS.HISTORY_VERIFIED_AT: helpers.convert_timestamp_to_utc(time.time())
         })
         self.synchronizer.history.write_history_record_to_file(history_record)
 
@@ -112,13 +195,8 @@ class File(CanvasEntity):
     def print_status(self, status, color, overwrite_previous_line=False):
         """ Print status to console """
 
-        if overwrite_previous_line:
-            # Move up one line
-            sys.stdout.write(ANSI.format(u"", formatting=u"lineup"))
-            sys.stdout.flush()
-
-        print(ANSI.format(u"[%s]" % status, formatting=color) + str(self)[len(status) + 2:])
-        sys.stdout.flush()
+        helpers.print_line(ANSI.format(u"[%s]" % status, formatting=color) + str(self)[len(status) + 2:],
+                           owner=self, overwrite_previous_line=overwrite_previous_line)
 
     def walk(self, counter):
         """ Stop walking, endpoint """
@@ -132,10 +210,17 @@ class File(CanvasEntity):
         Synchronize the file by downloading it from the Canvas server and saving it to the sync path
         If the file has already been downloaded, skip downloading.
         File objects have no children objects and represents an end point of a folder traverse.
+
+        The download is executed by the DownloadPool of the Synchronizer object.
         """
+        self.get_synchronizer().download_pool.submit(self._sync)
+
+    def _sync(self):
+        """ [PRIVATE] Download the file and print its status, executed by the DownloadPool """
         if not self.locked:
             was_downloaded = self.download()
-            self.print_status(u"SYNCED", color=u"green", overwrite_previous_line=was_downloaded)
+            if was_downloaded != -1:
+                self.print_status(u"SYNCED", color=u"green", overwrite_previous_line=was_downloaded)
         else:
             self.print_status(u"LOCKED", color=u"red", overwrite_previous_line=False)
 
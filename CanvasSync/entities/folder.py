@@ -8,6 +8,8 @@ folder.py, CanvasEntity Class
 
 The Folder class represents the top level 'Files' section in Canvas or a sub-folder here-off. The object is a container
 of other Folder objects as well as Files objects. Recursion is used to map the Folder hierarchy of the 'Files' section.
+The information on the files and sub-folders of a folder is looked up in the course-wide file and folder listings held
+by the Course object.
 
 A Course or Folder object is the parent object.
 
@@ -29,7 +31,7 @@ from CanvasSync.utilities import helpers
 
 
 class Folder(CanvasEntity):
-    def __init__(self, folder_info, parent, black_list=False):
+    def __init__(self, folder_info, parent):
         """
         Constructor method, initializes base Module class and adds all children Folder and/or Item objects to
         the list of children
@@ -52,8 +54,6 @@ class Folder(CanvasEntity):
                               parent=parent,
                               identifier=u"folder")
 
-        self.black_list = black_list
-
     def __repr__(self):
         """ String representation, overwriting base class method """
         status = ANSI.format(u"[SYNCED]", formatting=u"green")
@@ -61,28 +61,30 @@ class Folder(CanvasEntity):
                                                                    % (ANSI.format(u"Folder", formatting=u"folder"),
                                                                       self.name)
 
-    def initialize_black_list(self):
-        """
-        Some files may have been added to Module or Assignment objects already, so we do not need to store them again
-        This method initializes a list of all file names that exist in the hierarchy of the Course object so far
+    def is_black_listed(self, file_id):
         """
+        Some files may have been added to Module or Assignment objects already, so we do not need to store them again.
+        If the avoid duplicates setting is active, returns True if a File object with the ID number is already placed in
+        the hierarchy of the Course object, as kept track of by the Synchronizer object.
 
-        # Get all entities listed in the Synchronizer object under the course.
-        entities = self.get_synchronizer().get_entities(self.get_course().get_id())
+        file_id : int | A file ID number
+        """
+        if not self.settings.avoid_duplicates:
+            return False
 
-        # Get list of names of all the File objects of the entities list
-        black_list = [x.get_id() for x in entities if x.get_identifier_string() == u"file"]
+        return self.get_synchronizer().is_file_placed(file_id, self.get_course().get_id())
 
-        return black_list
+    def is_files_section(self):
+        """ Returns True if this Folder object represents the top level 'Files' section of the course """
+        return self.get_parent() is self.get_course()
 
     def add_files(self):
         """ Add all files stored by this folder to the list of children """
-        files = self.api.get_files_in_folder(self.id)
+        files = self.get_course().get_files_in_folder(self.id)
 
         for file in files:
             # Skip duplicates if this settings is active
-            # (otherwise the list will be empty)
-            if file[u"id"] in self.black_list:
+            if self.is_black_listed(file[u"id"]):
                 continue
 
             file = File(file, self, add_to_list_of_entities=False)
@@ -90,14 +92,14 @@ class Folder(CanvasEntity):
 
     def add_sub_folders(self):
         """ Add all sub-folders stored by this folder to the list of children """
-        folders = self.api.get_folders_in_folder(self.id)
+        folders = self.get_course().get_sub_folders(self.id)
 
         for folder in folders:
             if folder[u"name"] == u"course_image":
                 # Do we really need that course image?
                 continue
 
-            folder = Folder(folder, self, black_list=self.black_list)
+            folder = Folder(folder, self)
             self.add_child(folder)
 
     def walk(self, counter):
@@ -106,13 +108,6 @@ class Folder(CanvasEntity):
         """
         print(text_type(self))
 
-        # If avoid duplicated setting is active, initialize black list of files found in Modules and
-        # Assignments if it was not passed to the object at initialization.
-        if not self.black_list and self.settings.avoid_duplicates:
-            self.black_list = self.initialize_black_list()
-        elif not self.settings.avoid_duplicates:
-            self.black_list = []
-
         self.add_files()
         self.add_sub_folders()
 
@@ -125,14 +120,12 @@ class Folder(CanvasEntity):
         1) Adding all Files and Folder objects to the list of children
         2) Synchronize all children objects
         """
-        print(text_type(self))
+        helpers.print_line(text_type(self))
 
-        # If avoid duplicated setting is active, initialize black list of files found in Modules and
-        # Assignments if it was not passed to the object at initialization.
-        if not self.black_list and self.settings.avoid_duplicates:
-            self.black_list = self.initialize_black_list()
-        elif not self.settings.avoid_duplicates:
-            self.black_list = []
+        if self.is_files_section() and self.settings.avoid_duplicates:
+            # Pages being downloaded may still add the files they link to the hierarchy, wait for them to finish before
+            # the black list is consulted
+            self.get_synchronizer().download_pool.wait()
 
         self.add_files()
         self.add_sub_folders()
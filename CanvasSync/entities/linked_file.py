@@ -21,16 +21,16 @@ from __future__ import print_function
 
 # Inbuilt modules
 import os
-import sys
 
 # Third party modules
-import requests
 from six import text_type
 
 # CanvasSync module imports
 from CanvasSync import constants as CONSTANTS
 from CanvasSync.entities.canvas_entity import CanvasEntity
 from CanvasSync.utilities.ANSI import ANSI
+from CanvasSync.utilities import helpers
+from CanvasSync.utilities.instructure_api import DownloadStopped
 
 
 class LinkedFile(CanvasEntity):
@@ -79,40 +79,54 @@ class LinkedFile(CanvasEntity):
     def print_status(self, status, color, overwrite_previous_line=False):
         """ Print status to console """
 
-        if overwrite_previous_line:
-            # Move up one line
-            sys.stdout.write(ANSI.format(u"", formatting=u"lineup"))
-            sys.stdout.flush()
+        helpers.print_line(ANSI.format(u"[%s]" % status, formatting=color) + str(self)[len(status) + 2:],
+                           owner=self, overwrite_previous_line=overwrite_previous_line)
 
-        print(ANSI.format(u"[%s]" % status, formatting=color) + str(self)[len(status) + 2:])
-        sys.stdout.flush()
+    def is_up_to_date(self):
+        """
+        Returns True if the file was already downloaded from the same URL. The decision is made from the history record
+        of the file alone, the local file is only inspected if the history record is missing or due for verification,
+        see CanvasEntity.is_verification_due. The history record is updated if the local file is inspected.
+        """
+        history_record = self.synchronizer.history.get_history_for_path(self.sync_path)
+        if (history_record and history_record.get(CONSTANTS.HISTORY_ID) == self.download_url and
+                not self.is_verification_due(history_record)):
+            return True
+
+        if not os.path.exists(self.sync_path):
+            return False
+
+        self.mark_verified(self.get_history_record())
+        return True
+
+    def get_history_record(self):
+        """ Returns a new history record of the file """
+        return dict({
+            CONSTANTS.HISTORY_ID: self.download_url,
+            CONSTANTS.HISTORY_PATH: self.sync_path,
+            CONSTANTS.HISTORY_TYPE: CONSTANTS.ENTITY_LINKED_FILE
+        })
 
     def download(self):
         """
         Download the file, returns True or False depecting if the file was downloaded or not. Returns -1 if the file
         was attempted downloaded but failed.
         """
-        if os.path.exists(self.sync_path):
+        if self.is_up_to_date():
             return False
 
         self.print_status(u"DOWNLOADING", color=u"blue")
-        # Attempt to download the file
+        # Attempt to download the file through the session of the InstructureApi object. The file at the sync path is
+        # only replaced once the file is completely downloaded.
         try:
-            response = requests.get(self.download_url)
+            self.api.download_file_payload_to_path(self.download_url, self.sync_path, external=True)
+        except DownloadStopped:
+            raise
         except Exception:
-            # Could not download, catch any exception
+            # Could not download, catch any exception, including error responses
             self.print_status(u"FAILED", u"red", overwrite_previous_line=True)
             return -1
 
-        # Check for OK 200 HTTP response
-        if not response.status_code == 200:
-            self.print_status(u"FAILED", u"red", overwrite_previous_line=True)
-            return -1
-
-        # If here, download was successful, write to disk and print status
-        with open(self.sync_path, u"wb") as out_file:
-            out_file.write(response.content)
-
         return True
 
     def walk(self, counter):
@@ -126,19 +140,21 @@ class LinkedFile(CanvasEntity):
         """
         Attempt to download a file a the url 'download_url' to the path 'path'/filename while printing
         the status using an indent of print_indent to align with the parent object
+
+        The download is executed by the DownloadPool of the Synchronizer object.
         """
+        self.get_synchronizer().download_pool.submit(self._sync)
+
+    def _sync(self):
+        """ [PRIVATE] Download the file, print its status and update the history, executed by the DownloadPool """
         was_downloaded = self.download()
 
         if was_downloaded != - 1:
             self.print_status(u"SYNCED", color=u"green", overwrite_previous_line=was_downloaded)
 
-
-        history_record = dict({
-            CONSTANTS.HISTORY_ID: self.download_url,
-            CONSTANTS.HISTORY_PATH: self.sync_path,
-            CONSTANTS.HISTORY_TYPE: CONSTANTS.ENTITY_LINKED_FILE
-        })
-        self.synchronizer.history.write_history_record_to_file(history_record)
+        # Skipped files are recorded by is_up_to_date, failed downloads are not recorded
+        if was_downloaded is True:
+            self.mark_verified(self.get_history_record())
 
     def show(self):
         """ Show the folder hierarchy by printing every level """
@@ -68,7 +68,14 @@ class Module(CanvasEntity):
                                                                       self.name))
 
     def get_item_information(self):
-        """ Returns a dictionary of items from the Canvas server """
+        """
+        Returns a list of dictionaries of items in the module. The items included in the module listing of the course
+        are used if present and complete, otherwise (e.g. if Canvas truncated them) they are fetched from the server.
+        """
+        items = self.module_info.get(CONSTANTS.MODULE_ITEMS)
+        if items is not None and len(items) >= self.module_info.get(CONSTANTS.MODULE_ITEMS_COUNT, 0):
+            return items
+
         return self.api.get_items_in_module(self.get_course().get_id(), self.id)
 
     def add_sub_header(self, folder_info, folder_position, folder_items):
@@ -93,7 +100,10 @@ class Module(CanvasEntity):
         Method that adds an Item object to the list of children and synchronizes it
         """
 
-        detailed_file_info = self.api.download_item_information(file_information[u"url"])
+        # Look up the file in the course-wide file index, only request the file information on a miss
+        detailed_file_info = self.get_course().get_file_information(file_information.get(CONSTANTS.MODULE_ITEM_CONTENT_ID))
+        if detailed_file_info is None:
+            detailed_file_info = self.api.download_item_information(file_information[u"url"])
 
         # Initialize Item object and add to list of children
         item = File(detailed_file_info, self)
@@ -127,7 +137,7 @@ class Module(CanvasEntity):
         """
 
         # If the Folder was initialized with an items dictionary, skip downloading
-        if not items:
+        if items is None:
             items = self.get_item_information()
 
         # Determine which items are in the outer-scope (located in the folder represented by this module) and which
@@ -165,7 +175,7 @@ class Module(CanvasEntity):
         1) Adding all File, Page, ExternalLink and SubFolder objects to the list of children
         2) Synchronize all children objects
         """
-        print(text_type(self))
+        helpers.print_line(text_type(self))
 
         self.add_items()
 
@@ -22,11 +22,11 @@ from __future__ import print_function
 
 # Inbuilt modules
 import os
-import sys
 import io
 import re
 
 # Third party
+import requests
 from six import text_type
 
 from CanvasSync import constants as CONSTANTS
@@ -36,6 +36,9 @@ from CanvasSync.utilities import helpers
 from CanvasSync.entities.file import File
 from CanvasSync.entities.linked_file import LinkedFile
 
+# The status codes of a linked Canvas file that no longer exists on the server
+GONE_STATUS_CODES = (404, 410)
+
 
 class Page(CanvasEntity):
     def __init__(self, page_info, parent):
@@ -66,6 +69,9 @@ class Page(CanvasEntity):
                               folder=False,
                               identifier=CONSTANTS.ENTITY_PAGE)
 
+        # True if the information on a file linked in the page could not be downloaded, see download_linked_files
+        self.linked_files_incomplete = False
+
     def __repr__(self):
         """ String representation, overwriting base class method """
         return u" " * 15 + u"|   " + u"\t" * self.indent + u"%s: %s" % (ANSI.format(u"Page",
@@ -81,11 +87,18 @@ class Page(CanvasEntity):
 
         # Download information on all found files and add File objects to the children
         for url in canvas_file_urls:
+            # Only files that are gone from the server are left out, the history records of files that could not be
+            # looked up are kept, see _sync
             try:
                 file_info = self.api.download_item_information(url)
-                if CONSTANTS.DISPLAY_NAME not in file_info:
-                    continue
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or e.response.status_code not in GONE_STATUS_CODES:
+                    self.linked_files_incomplete = True
+                continue
             except Exception:
+                self.linked_files_incomplete = True
+                continue
+            if CONSTANTS.DISPLAY_NAME not in file_info:
                 continue
 
             item = File(file_info, parent=self)
@@ -117,12 +130,43 @@ class Page(CanvasEntity):
             timestamp = helpers.convert_utc_to_timestamp(modified_at)
             os.utime(self.sync_path, (timestamp, timestamp))
             history_record = dict({
-                CONSTANTS.HISTORY_ID: self.page_item_info.get(CONSTANTS.ID),
+                CONSTANTS.HISTORY_ID: self.id,
                 CONSTANTS.HISTORY_MODIFIED_AT: modified_at,
                 CONSTANTS.HISTORY_PATH: self.sync_path,
                 CONSTANTS.HISTORY_TYPE: CONSTANTS.ENTITY_PAGE
             })
-            self.synchronizer.history.write_history_record_to_file(history_record)
+            self.mark_verified(history_record)
+
+    def is_up_to_date(self):
+        """
+        Returns True if the local page folder holds the current version of the page. The decision is made from the
+        history record of the page alone, the page folder is only inspected if the history record is missing, outdated
+        or due for verification, see CanvasEntity.is_verification_due.
+        """
+        remote_updated_at = self.page_info.get(CONSTANTS.UPDATED_AT)
+        history_record = self.synchronizer.history.get_history_for_path(self.sync_path)
+
+        if (history_record and
+                history_record.get(CONSTANTS.HISTORY_TYPE) == CONSTANTS.ENTITY_PAGE and
+                history_record.get(CONSTANTS.HISTORY_ID) == text_type(self.id) and
+                history_record.get(CONSTANTS.HISTORY_MODIFIED_AT) == remote_updated_at):
+            if not self.is_verification_due(history_record):
+                return True
+            if os.path.isdir(self.sync_path):
+                self.mark_verified(history_record)
+                return True
+            return False
+
+        # Without a matching history record, compare the modified time of the page folder and record it if unchanged
+        try:
+            local_updated_at = os.stat(self.sync_path).st_mtime
+        except OSError:
+            return False
+        if helpers.convert_utc_to_timestamp(remote_updated_at) != local_updated_at:
+            return False
+
+        self.update_page_folder_modified_at(remote_updated_at)
+        return True
 
     def download(self):
         # Print download status
@@ -132,11 +176,8 @@ class Page(CanvasEntity):
         self.page_info = self.api.download_item_information(self.page_item_info[u"url"]) if not self.page_info else self.page_info
 
         # Check if page updated
-        if os.path.exists(self.sync_path):
-            remote_updated_at = helpers.convert_utc_to_timestamp(self.page_info.get(CONSTANTS.UPDATED_AT))
-            local_updated_at = os.stat(self.sync_path).st_mtime
-            if remote_updated_at == local_updated_at:
-                return False
+        if self.is_up_to_date():
+            return False
 
         # Create a HTML page locally and add a link leading to the live version
         body = self.page_info.get(CONSTANTS.PAGE_BODY, "")
@@ -158,13 +199,8 @@ class Page(CanvasEntity):
 
     def print_status(self, status, color, overwrite_previous_line=False):
         """ Print status to console """
-        if overwrite_previous_line:
-            # Move up one line
-            sys.stdout.write(ANSI.format(u"", formatting=u"lineup"))
-            sys.stdout.flush()
-
-        print(ANSI.format(u"[%s]" % status, formatting=color) + str(self)[len(status) + 2:])
-        sys.stdout.flush()
+        helpers.print_line(ANSI.format(u"[%s]" % status, formatting=color) + str(self)[len(status) + 2:],
+                           owner=self, overwrite_previous_line=overwrite_previous_line)
 
     def walk(self, counter):
         """ Stop walking, endpoint """
@@ -178,8 +214,14 @@ class Page(CanvasEntity):
         Synchronize the page by downloading it from the Canvas server and saving it to the sync path
         If the page has already been downloaded, skip downloading.
         Page objects have no children objects and represents an end point of a folder traverse.
+
+        The download is executed by the DownloadPool of the Synchronizer object. File and LinkedFile objects linked in
+        the page are synced in the same worker thread, before the modified date of the page folder is updated.
         """
+        self.get_synchronizer().download_pool.submit(self._sync)
 
+    def _sync(self):
+        """ [PRIVATE] Download the page and its linked files, executed by the DownloadPool """
         was_downloaded = self.download()
         self.print_status(u"SYNCED", color=u"green", overwrite_previous_line=was_downloaded)
 
@@ -187,7 +229,13 @@ class Page(CanvasEntity):
             file.update_path()
             file.sync()
 
-        self.update_page_folder_modified_at(self.page_info.get(CONSTANTS.UPDATED_AT))
+        if was_downloaded:
+            self.update_page_folder_modified_at(self.page_info.get(CONSTANTS.UPDATED_AT))
+
+        if not was_downloaded or self.linked_files_incomplete:
+            # The files of the page are only added when it is downloaded and all its linked files were looked up, keep
+            # their history records otherwise
+            self.get_synchronizer().mark_seen(self.sync_path, self.get_course().get_id(), subtree=True)
 
     def show(self):
         """ Show the folder hierarchy by printing every level """
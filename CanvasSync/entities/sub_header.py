@@ -30,6 +30,7 @@ from six import text_type
 from CanvasSync import constants as CONSTANTS
 from CanvasSync.utilities.ANSI import ANSI
 from CanvasSync.entities.module import Module
+from CanvasSync.utilities import helpers
 
 
 class SubHeader(Module):
@@ -87,7 +88,7 @@ class SubHeader(Module):
         SubFolder is instantiated with a list of dictionaries of item information and will supply this to the add_items
         method. add_items will then not download the items from the server.
         """
-        print(text_type(self))
+        helpers.print_line(text_type(self))
 
         self.add_items(items=self.items)
 
@@ -20,15 +20,21 @@ The Synchronizer encapsulates a list of children Course objects.
 # Future imports
 from __future__ import print_function
 
+# Inbuilt modules
+import os
+
 # Third party
 from six import text_type
 
 # CanvasSync modules
+from CanvasSync import constants as CONSTANTS
 from CanvasSync.entities.course import Course
 from CanvasSync.entities.canvas_entity import CanvasEntity
 from CanvasSync.utilities import helpers
 from CanvasSync.utilities.ANSI import ANSI
+from CanvasSync.utilities.download_pool import DownloadPool
 from CanvasSync.utilities.history import History
+from CanvasSync.utilities.prune import Pruner
 
 
 class Synchronizer(CanvasEntity):
@@ -54,8 +60,20 @@ class Synchronizer(CanvasEntity):
         # A dictionary to store lists of CanvasEntity objects
         # added to the hierarchy under a course ID number
         self.entities = {}
+
+        # A dictionary to store sets of the ID numbers of the File
+        # objects among these entities, see is_file_placed
+        self.file_ids = {}
+
+        # A dictionary to store dictionaries of the normalized paths of
+        # the entities seen under a course ID number, see mark_seen
+        self.seen_paths = {}
         self.history = History(settings)
 
+        # Executes the payload downloads of File, LinkedFile and Page objects concurrently. Sized for the highest
+        # payload concurrency, the InstructureApi object limits the transfers in flight.
+        self.download_pool = DownloadPool(api.payload_controller.maximum)
+
         # Initialize base class
         CanvasEntity.__init__(self,
                               id_number=-1,
@@ -78,6 +96,26 @@ class Synchronizer(CanvasEntity):
         """ Add method to append CanvasEntity objects to the list of entities """
         self.entities[course_id].append(entity)
 
+        if entity.get_identifier_string() == CONSTANTS.ENTITY_FILE:
+            self.file_ids[course_id].add(entity.get_id())
+
+    def is_file_placed(self, file_id, course_id):
+        """
+        Returns True if a File object with the ID number was added to the list of entities under the course ID number.
+        Used by Folder objects to avoid storing duplicates of files already placed in Modules or Assignments.
+        """
+        return file_id in self.file_ids[course_id]
+
+    def mark_seen(self, path, course_id, subtree=False):
+        """
+        Records that an entity with the path exists on the Canvas server, so that its history record is not pruned as
+        stale. If subtree is True, all history records below the path are kept as well, e.g. the files of a Page object
+        that was not downloaded again.
+        """
+        path = os.path.normpath(path)
+        seen_paths = self.seen_paths[course_id]
+        seen_paths[path] = seen_paths.get(path, False) or subtree
+
     def download_courses(self):
         """ Returns a dictionary of courses from the Canvas server """
         return self.api.get_courses()
@@ -94,6 +132,8 @@ class Synchronizer(CanvasEntity):
             # Add an empty list to the entities dictionary that will
             # store entities when added
             self.entities[course_information[u"id"]] = []
+            self.file_ids[course_information[u"id"]] = set()
+            self.seen_paths[course_information[u"id"]] = {}
 
             # Create Course object
             course = Course(course_information,
@@ -119,12 +159,36 @@ class Synchronizer(CanvasEntity):
         """
         1) Adding all Courses objects to the list of children
         2) Synchronize all children objects
+        3) Wait for the remaining downloads of the DownloadPool to finish
+        4) Prune the stale entries of the synchronized courses, only once all courses are synchronized
+        5) Stop the downloads in progress if interrupted, and wait for the DownloadPool to shut down
+        6) Commit the remaining changes to the sync history and close it, also if interrupted
         """
-        print(text_type(self))
+        helpers.print_line(text_type(self))
 
         self.add_courses()
-        for course in self:
-            course.sync()
+        try:
+            for course in self:
+                course.sync()
+                self.history.commit(course.get_path())
+
+            self.download_pool.wait()
+
+            pruner = Pruner(self.settings, self.history, self.settings.prune_mode)
+            for course in self:
+                if course.to_be_synced:
+                    pruner.prune_course(course.get_path(), self.seen_paths[course.get_id()])
+            pruner.print_summary()
+        except BaseException:
+            # Do not start queued downloads after an error or an interrupt, and stop the running ones. Resumable
+            # downloads leave their partial file to be continued by the next synchronization.
+            self.download_pool.cancel()
+            self.api.stop_downloads()
+            raise
+        finally:
+            # The workers record their downloads in the history, let them finish before it is closed
+            self.download_pool.shutdown()
+            self.history.close()
 
     def show(self):
         """ Show the folder hierarchy by printing every level """
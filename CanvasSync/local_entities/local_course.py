@@ -21,7 +21,7 @@ from CanvasSync.local_entities.local_module import LocalModule
 from CanvasSync.utilities import helpers
 
 # Special folder names within a Course folder
-NON_MODULE_FOLDER_NAMES = [CONSTANTS.FOLDER_ASSIGNMENTS, CONSTANTS.FOLDER_OTHERS]
+NON_MODULE_FOLDER_NAMES = [CONSTANTS.FOLDER_ASSIGNMENTS, CONSTANTS.FOLDER_OTHERS, CONSTANTS.FOLDER_ARCHIVE]
 
 
 class LocalCourse(LocalCanvasEntity):
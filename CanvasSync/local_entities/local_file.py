@@ -69,8 +69,7 @@ class LocalFile(LocalCanvasEntity):
         # When status code is 3XX, need to perform additional steps to complete upload
         # (https://canvas.instructure.com/doc/api/file.file_uploads.html#method.file_uploads.post)
         if 300 <= file_upload_res.status_code < 400:
-            confirm_upload_res = requests.get(file_upload_res_json.get(CONSTANTS.FILE_UPLOAD_LOCATION),
-                                              headers=self.api.get_auth_header())
+            confirm_upload_res = self.api.confirm_file_upload(file_upload_res_json.get(CONSTANTS.FILE_UPLOAD_LOCATION))
             confirm_upload_res.raise_for_status()
 
         # Set this entity's ID
@@ -55,7 +55,10 @@ class LocalSynchronizer:
                 path=course_path,
                 name=course_name
             )
-            course_history = self.history.get_history_for_path(course_path)
+            # The history shard of a course is only opened if the course is synchronized
+            course_history = None
+            if course_name in self.settings.courses_to_sync:
+                course_history = self.history.get_history_for_path(course_path)
 
             course = LocalCourse(course_info, course_history, self, self.api, self.settings)
             self.courses.append(course)
@@ -95,5 +98,10 @@ class LocalSynchronizer:
         print(u"\n[*] Synchronizing from folder: %s\n" % self.settings.sync_path)
 
         self.add_courses()
-        for course in self.courses:
-            course.sync()
+        try:
+            for course in self.courses:
+                course.sync()
+                self.history.commit(course.sync_path)
+        finally:
+            # Commit the remaining changes to the sync history and close it, also if interrupted
+            self.history.close()
@@ -67,13 +67,105 @@ class Settings(object):
         self.use_nicknames = False
         self.history_file_name = u".history"
 
+        # HTTP connection pool settings, the number of connections kept alive
+        # per host and the default connect and read timeouts in seconds. The
+        # pool is enlarged to the API and payload concurrency maximums if
+        # these add up to more connections, see InstructureApi
+        self.connection_pool_size = 10
+        self.connect_timeout = 10
+        self.read_timeout = 120
+
+        # The number of pages of a listing that are fetched concurrently
+        # when Canvas reports the number of the last page
+        self.page_prefetch_workers = 4
+
+        # GET requests failing with a transient error (429, 5xx, reset
+        # connections) are sent up to this many times, waiting a random delay
+        # below an exponentially growing bound in seconds between attempts
+        self.retry_attempts = 5
+        self.retry_base_delay = 1.0
+        self.retry_max_delay = 60.0
+
+        # Requests are paced to keep the rate limit quota reported by Canvas
+        # above this floor, assuming it refills at the leak rate (units/s)
+        self.rate_limit_floor = 100.0
+        self.rate_limit_leak_rate = 10.0
+
+        # The number of File, LinkedFile and Page downloads executed
+        # concurrently while the folder hierarchy is being synchronized
+        self.download_workers = 4
+
+        # Adapt the number of API calls and payload transfers in flight to
+        # the latency and errors of the server, starting from the number of
+        # page prefetch and download workers up to these maximums
+        self.adaptive_concurrency = True
+        self.api_concurrency_max = 16
+        self.payload_concurrency_max = 8
+
+        # Changes to the sync history are committed to the history file
+        # in batches of this many changes or after this many seconds
+        self.history_commit_records = 500
+        self.history_commit_seconds = 30
+
+        # The storage backend of the sync history, "csv" or "sqlite"
+        self.history_backend = u"csv"
+
+        # The csv backend appends changes to a journal, synced to disk on
+        # every commit if enabled, and compacts it into the history file
+        # once it is this many times the size of the history file
+        self.history_journal_fsync = True
+        self.history_compaction_ratio = 1.0
+
+        # Unchanged files are skipped by their sync history without inspecting
+        # the local file, unless it was last verified this many days ago or a
+        # full verification of all local files is requested (-V flag)
+        self.verify_interval_days = 30
+        self.full_verify = False
+
+        # Entries of the sync history no longer found on the Canvas server are
+        # pruned after a sync: only reported, deleted or moved to the
+        # .archive folder of the course (off, report, delete or archive)
+        self.prune_mode = u"report"
+
         # Get the path pointing to the settings file.
         self.settings_path = os.path.abspath(os.path.expanduser(u"~")
                                              + u"/.CanvasSync.settings")
 
-        # Initialize user prompt class, used to get information from the user
-        # via the terminal
-        self.api = InstructureApi(self)
+        # JSON responses of the Canvas API are stored in this folder and
+        # requested conditionally (If-None-Match) on the next run
+        self.response_cache = True
+        self.response_cache_path = os.path.abspath(os.path.expanduser(u"~")
+                                                   + u"/.CanvasSync.cache")
+
+        # The size in bytes the response cache may take up before the least
+        # recently used responses are evicted
+        self.response_cache_max_size = 200 * 1024 * 1024
+
+        # If enabled (-c flag), stored responses are used without a request
+        # for this many seconds after Canvas last returned them, per endpoint
+        self.metadata_cache = False
+        self.metadata_cache_ttl = {u"courses": 6 * 60 * 60,
+                                   u"modules": 15 * 60,
+                                   u"module_items": 5 * 60,
+                                   u"assignments": 15 * 60,
+                                   u"files": 15 * 60,
+                                   u"folders": 60 * 60,
+                                   u"pages": 15 * 60,
+                                   u"other": 5 * 60}
+
+        # The course codes or ID numbers of courses whose stored responses are
+        # discarded before the sync (--invalidate option)
+        self.invalidate_courses = []
+
+        # The InstructureApi object used to make API calls, created by get_api
+        # on first use, once the settings and command line options are applied
+        self.api = None
+
+    def get_api(self):
+        """ Returns the InstructureApi object of the settings, created on the first call """
+        if self.api is None:
+            self.api = InstructureApi(self)
+        return self.api
 
     def settings_file_exists(self):
         """
@@ -178,7 +270,7 @@ class Settings(object):
         self.print_settings(first_time_setup=True, clear=True)
 
         # Prompt user for course sync selection
-        self.courses_to_sync = user_prompter.ask_for_courses(self, api=self.api)
+        self.courses_to_sync = user_prompter.ask_for_courses(self, api=self.get_api())
         self.print_settings(first_time_setup=True, clear=True)
 
         # Ask user for advanced settings
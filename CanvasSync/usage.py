@@ -34,12 +34,41 @@ institutions Canvas web server to a mirrored folder on their local computer.
 Usage
 -----
 $ canvas.py [-S] <sync> [-h] <help> [-s] <reset settings> [-i] <show current settings>
-    [-p {password}] <specify password>
+    [-V] <verify local files> [-P {mode}] <prune stale files> [-c] <use cached metadata>
+    [--invalidate {course}] <discard cached metadata of a course> [-p {password}] <specify password>
 
     -h [--help], optional                : Show this help screen.
 
     -S [--sync], optional                : Synchronize with Canvas
 
+    -V [--verify], optional              : Inspect every local file during the synchronization.
+
+                                           Unchanged files are normally skipped by their sync history alone, and
+                                           the local files are only inspected every 30 days. A verification
+                                           restores local files that were deleted or truncated in the mean time.
+                                           With -V, the content of every file is also compared to the content
+                                           hash recorded when it was downloaded.
+
+    -P [--prune] {mode}, optional        : Set how files no longer found on Canvas are pruned after the sync.
+
+                                           off     : Keep stale files.
+                                           report  : List stale files and the space they use (default).
+                                           delete  : Delete stale files.
+                                           archive : Move stale files to the .archive folder of the course.
+
+                                           Courses are only pruned if all module items and assignments are
+                                           synchronized. Empty module folders are removed as well.
+
+    -c [--cached], optional              : Use the cached responses of the Canvas API without a request while they
+                                           are fresh (the course list for hours, module items for minutes).
+
+                                           Responses are always cached and requested conditionally, so that
+                                           unchanged listings are not downloaded again. For frequent runs, -c
+                                           skips the requests as well.
+
+    --invalidate {course}, optional      : Discard the cached responses of a course, given by its course code or
+                                           ID number, before the sync. May be given several times.
+
     -s [--setup], optional               : Enter settings setup screen.
 
                                            The first time CanvasSync is launched settings must be set. Invoking
@@ -62,6 +91,14 @@ CanvasSync requires at least the following settings to be set:
 CanvasSync will guide you through these settings during the first time launch. Alternatively,
 the settings may be reset using the -s or --setup flag. See below.
 
+Concurrency
+-----------
+CanvasSync sends API calls and downloads files concurrently over a pool of kept-alive connections.
+The number of requests in flight is adapted to the response times and errors of the server, up to
+16 API calls and 8 file downloads. The connection pool keeps at least as many connections per host
+alive as requests may be in flight (at least 10), so that every request reuses an open connection.
+Raising the concurrency maximums in the settings enlarges the connection pool accordingly.
+
 ADDITIONAL RESOURCES
 --------------------
 - Authentication token info and help:
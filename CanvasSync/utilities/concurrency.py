@@ -0,0 +1,142 @@
+"""
+concurrency.py, module
+
+Implements the adaptive concurrency limits of the InstructureApi object.
+
+The thread pools behind the InstructureApi object (the page prefetch pool and the DownloadPool) are sized for the
+highest concurrency allowed, and a ConcurrencyController object limits how many requests of a kind are actually in
+flight. The InstructureApi object keeps one controller for JSON API calls and one for file payload transfers, as they
+load the server differently.
+
+The limit is adjusted by additive increase, multiplicative decrease (AIMD), like the congestion window of TCP: every
+request that completes without a sign of congestion while the limit is fully used raises the limit by 1 / limit, that
+is by one per round of 'limit' requests. A sign of congestion, a transient error (429, 5xx, a reset connection, see
+retry.py) or a latency above 'latency_factor' times the average latency, cuts the limit by 'decrease_factor'. The
+requests already in flight when the limit was cut do not cut it again. The limit is kept between 'minimum' and
+'maximum' and recorded over time for the summary of the run.
+"""
+
+# Inbuilt modules
+import threading
+import time
+from contextlib import contextmanager
+
+# The weight of the latest latency in the average latency
+LATENCY_SMOOTHING = 0.1
+
+# The number of latencies averaged before latency spikes are considered
+LATENCY_WARMUP = 10
+
+
+class ConcurrencyController(object):
+    def __init__(self, initial, minimum, maximum, decrease_factor=0.5, latency_factor=3.0):
+        """
+        initial         : int   | The initial limit of concurrent requests
+        minimum         : int   | The lowest limit
+        maximum         : int   | The highest limit
+        decrease_factor : float | The factor the limit is multiplied by on congestion
+        latency_factor  : float | The multiple of the average latency that is considered a sign of congestion
+        """
+        self.minimum = max(int(minimum), 1)
+        self.maximum = max(int(maximum), self.minimum)
+        self.limit = float(min(max(int(initial), self.minimum), self.maximum))
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+
+        self.condition = threading.Condition()
+
+        # The number of requests holding a slot
+        self.active = 0
+
+        # The average latency of requests without congestion and the number of latencies averaged
+        self.average_latency = None
+        self.latencies = 0
+
+        # The number of requests that were in flight when the limit was last cut, and still have to complete
+        self.recovering = 0
+
+        # The number of times the limit was cut, and a list of (seconds since start, limit) for every change
+        self.decreases = 0
+        self.started_at = time.time()
+        self.timeline = [(0.0, int(self.limit))]
+
+    def acquire(self):
+        """ Blocks until fewer requests than the current limit hold a slot, then takes a slot """
+        with self.condition:
+            while self.active >= int(self.limit):
+                self.condition.wait()
+            self.active += 1
+
+    def release(self):
+        """ Releases a slot taken by acquire """
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """ A context manager holding a slot, see acquire """
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _set_limit(self, limit):
+        """ [PRIVATE] Sets the limit within the bounds and records a change of the whole number of slots """
+        limit = min(max(limit, float(self.minimum)), float(self.maximum))
+        changed = int(limit) != int(self.limit)
+        self.limit = limit
+        if changed:
+            self.timeline.append((time.time() - self.started_at, int(limit)))
+            self.condition.notify_all()
+
+    def observe(self, latency, congested):
+        """
+        Adjusts the limit by the outcome of a request that holds a slot
+
+        latency   : float   | The seconds until the response was received
+        congested : boolean | True if the request failed with a transient error
+        """
+        with self.condition:
+            if not congested and self.latencies >= LATENCY_WARMUP and \
+                    latency > self.latency_factor * self.average_latency:
+                congested = True
+
+            if not congested:
+                if self.average_latency is None:
+                    self.average_latency = latency
+                else:
+                    self.average_latency += LATENCY_SMOOTHING * (latency - self.average_latency)
+                self.latencies += 1
+
+            if self.recovering:
+                # Sent before the limit was cut, does not reflect the current limit
+                self.recovering -= 1
+                return
+
+            if congested:
+                self.decreases += 1
+                self.recovering = max(self.active - 1, 0)
+                self._set_limit(self.limit * self.decrease_factor)
+            elif self.active >= int(self.limit):
+                self._set_limit(self.limit + 1.0 / self.limit)
+
+    def get_summary(self):
+        """
+        Returns a dictionary of the current, lowest, highest and time-weighted average limit, the number of times the
+        limit was cut and the list of (seconds since start, limit) changes of the limit
+        """
+        with self.condition:
+            now = time.time() - self.started_at
+            timeline = list(self.timeline)
+
+        limits = [limit for _, limit in timeline]
+        weighted = sum(limit * ((timeline[idx + 1][0] if idx + 1 < len(timeline) else now) - at)
+                       for idx, (at, limit) in enumerate(timeline))
+        return {u"limit": limits[-1],
+                u"lowest": min(limits),
+                u"highest": max(limits),
+                u"average": weighted / now if now > 0 else float(limits[-1]),
+                u"decreases": self.decreases,
+                u"timeline": timeline}
@@ -0,0 +1,104 @@
+"""
+connection_pool.py, module
+
+Implements the pooled, keep-alive HTTP session used by the InstructureApi object.
+
+All API calls and file payload transfers of a synchronization go through a single requests.Session object mounted with
+the PooledHTTPAdapter below. The adapter keeps a bounded pool of open connections per host so that the TCP and TLS
+handshake to the Canvas server is only paid once per pooled connection instead of once per request. The adapter also
+applies default timeouts and counts how many requests were served by a newly opened connection versus a reused one.
+"""
+
+# Inbuilt modules
+import threading
+
+# Third party modules
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ConnectionStats(object):
+    """ Thread safe counters of the requests sent and the connections opened by a PooledHTTPAdapter """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def count_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    @property
+    def reused_connections(self):
+        """ The number of requests that were sent over an already open connection """
+        return max(self.requests - self.new_connections, 0)
+
+    def as_dict(self):
+        return {u"requests": self.requests,
+                u"new_connections": self.new_connections,
+                u"reused_connections": self.reused_connections}
+
+
+def _counting_pool_class(pool_class, stats):
+    """
+    Returns a subclass of the urllib3 connection pool class 'pool_class' that reports every newly opened connection to
+    the ConnectionStats object 'stats'
+    """
+    class CountingConnectionPool(pool_class):
+        def _new_conn(self):
+            stats.count_new_connection()
+            return pool_class._new_conn(self)
+
+    return CountingConnectionPool
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    def __init__(self, pool_connections, pool_maxsize, timeout):
+        """
+        pool_connections : int   | The number of hosts to keep a connection pool for
+        pool_maxsize     : int   | The maximum number of open connections kept alive per host
+        timeout          : tuple | Default (connect, read) timeout in seconds used when a request specifies none
+        """
+        self.stats = ConnectionStats()
+        self.timeout = timeout
+
+        HTTPAdapter.__init__(self, pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
+    def init_poolmanager(self, *args, **kwargs):
+        HTTPAdapter.init_poolmanager(self, *args, **kwargs)
+
+        # Swap the connection pool classes of the pool manager for subclasses that count new connections
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: _counting_pool_class(pool_class, self.stats)
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+    def send(self, request, **kwargs):
+        if kwargs.get(u"timeout") is None:
+            kwargs[u"timeout"] = self.timeout
+        self.stats.count_request()
+        return HTTPAdapter.send(self, request, **kwargs)
+
+
+def make_session(pool_connections, pool_maxsize, timeout):
+    """
+    Returns a requests.Session object that shares one PooledHTTPAdapter across HTTP and HTTPS and keeps its
+    connections alive between requests.
+
+    pool_connections : int   | The number of hosts to keep a connection pool for
+    pool_maxsize     : int   | The maximum number of open connections kept alive per host
+    timeout          : tuple | Default (connect, read) timeout in seconds
+    """
+    adapter = PooledHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, timeout=timeout)
+
+    session = requests.Session()
+    session.headers.update({u"Connection": u"keep-alive"})
+    session.mount(u"https://", adapter)
+    session.mount(u"http://", adapter)
+
+    return session, adapter
@@ -0,0 +1,110 @@
+"""
+download_pool.py, Class
+
+The DownloadPool object executes the payload downloads of File, LinkedFile and Page objects on a bounded pool of
+worker threads, so that a number of transfers are in flight at the same time while the Synchronizer continues to walk
+the Canvas folder hierarchy in the main thread.
+
+At most two tasks per worker are queued at a time, submitting more blocks the main thread until a worker is free, which
+keeps the hierarchy discovery from running far ahead of the downloads. Tasks submitted from within a worker thread (for
+instance the File objects linked in a Page) are executed directly in that worker, as they may depend on the outcome of
+the surrounding task. With a single worker, all tasks are executed directly in the calling thread.
+
+The first exception raised by a task is re-raised in the main thread by the next call to submit or wait. The pool is
+shut down at the end of a synchronization, which waits for the running tasks to finish.
+"""
+
+# Inbuilt modules
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as wait_for_futures
+
+
+class DownloadPool(object):
+    def __init__(self, workers):
+        """
+        workers : int | The number of downloads to execute concurrently
+        """
+        self.workers = max(int(workers), 1)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+
+        # Bounds the number of queued and running tasks
+        self.slots = threading.BoundedSemaphore(self.workers * 2)
+
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.errors = []
+
+        # Marks the worker threads of this pool
+        self.local = threading.local()
+
+    def is_concurrent(self):
+        """ Returns True if tasks are executed by worker threads """
+        return self.executor is not None
+
+    def in_worker(self):
+        """ Returns True if called from a worker thread of this pool """
+        return getattr(self.local, u"in_worker", False)
+
+    def _run(self, task):
+        """ [PRIVATE] Execute a task in a worker thread and store a potential exception """
+        self.local.in_worker = True
+        try:
+            task()
+        except Exception as e:
+            with self.lock:
+                self.errors.append(e)
+        finally:
+            self.slots.release()
+
+    def _done(self, future):
+        """ [PRIVATE] Callback removing a finished task from the set of pending tasks """
+        with self.lock:
+            self.pending.discard(future)
+
+    def raise_errors(self):
+        """ Re-raise the first exception raised by a task, if any """
+        with self.lock:
+            if self.errors:
+                raise self.errors[0]
+
+    def submit(self, task):
+        """
+        Execute the callable 'task' on the pool, or directly if the pool is not concurrent or when called from a
+        worker thread
+
+        task : callable | A function taking no arguments
+        """
+        if not self.is_concurrent() or self.in_worker():
+            task()
+            return
+
+        self.raise_errors()
+
+        self.slots.acquire()
+        future = self.executor.submit(self._run, task)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._done)
+
+    def wait(self):
+        """ Block until all submitted tasks are finished, then re-raise the first exception raised by a task """
+        while True:
+            with self.lock:
+                pending = list(self.pending)
+            if not pending:
+                break
+            wait_for_futures(pending)
+
+        self.raise_errors()
+
+    def cancel(self):
+        """ Cancel all tasks that have not yet been started, running tasks are allowed to finish """
+        with self.lock:
+            pending = list(self.pending)
+        for future in pending:
+            future.cancel()
+
+    def shutdown(self):
+        """ Block until the running tasks are finished and stop the worker threads, no tasks may be submitted after """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
@@ -18,13 +18,26 @@ A collection of small static helper-functions used in various modules of CanvasS
 from __future__ import print_function
 
 # Inbuilt modules
+import hashlib
+import io
+import json
 import os
+import sys
+import threading
 import calendar
 from datetime import datetime
 
 # Third party modules
 import requests
 
+# CanvasSync modules
+from CanvasSync import constants as CONSTANTS
+from CanvasSync.utilities.ANSI import ANSI
+
+# Serializes console output of the download worker threads and the main thread, see print_line
+OUTPUT_LOCK = threading.Lock()
+_last_line_owner = [None]
+
 
 def reorganize(items):
     """
@@ -77,6 +90,27 @@ def reorganize(items):
     return outer_scope_files, sub_folders
 
 
+def print_line(text, owner=None, overwrite_previous_line=False):
+    """
+    Prints a line to the console while holding the OUTPUT_LOCK, so that lines printed from several threads are never
+    interleaved.
+
+    text                    : string  | The line to print
+    owner                   : object  | The object printing the line, e.g. a File object
+    overwrite_previous_line : boolean | Overwrite the previously printed line, e.g. to replace a [DOWNLOADING] status.
+                                        Only honored if the previous line was printed by the same owner, as other
+                                        threads may have printed in between.
+    """
+    with OUTPUT_LOCK:
+        if overwrite_previous_line and owner is not None and _last_line_owner[0] is owner:
+            # Move up one line
+            sys.stdout.write(ANSI.format(u"", formatting=u"lineup"))
+
+        print(text)
+        sys.stdout.flush()
+        _last_line_owner[0] = owner
+
+
 def clear_console():
     """ Clears the console on UNIX and Windows """
     os.system(u'cls' if os.name == u'nt' else u'clear')
@@ -128,6 +162,8 @@ def get_files_and_folders(path, include_full_path=False, include_dot=False):
     path: string | A string a directory path containing other files and folders
     include_full_path: boolean | True to include full path of the retrieved files and folders
     include_dot: boolean | True to include files and folders with names starting with a "."
+
+    Partial downloads (see is_partial_download) are never included.
     """
     files = []
     folders = []
@@ -141,6 +177,8 @@ def get_files_and_folders(path, include_full_path=False, include_dot=False):
 
         if res.startswith(".") and not include_dot:
             continue
+        if is_partial_download(res):
+            continue
         if os.path.isfile(res_path):
             files.append(res_data)
         elif os.path.isdir(res_path):
@@ -149,6 +187,81 @@ def get_files_and_folders(path, include_full_path=False, include_dot=False):
     return files, folders
 
 
+def is_partial_download(path):
+    """
+    Returns True if the path points to a partial download or its resume information file, see
+    InstructureApi.download_file_payload_to_path
+
+    path: string | A file name or path
+    """
+    return path.endswith(CONSTANTS.PARTIAL_DOWNLOAD_SUFFIX) or path.endswith(CONSTANTS.PARTIAL_DOWNLOAD_INFO_SUFFIX)
+
+
+def read_json_file(path):
+    """
+    Returns the JSON digested content of the file at 'path' or None if it does not exist or cannot be parsed
+
+    path: string | A file path
+    """
+    try:
+        with io.open(path, u"r", encoding=u"utf-8") as in_file:
+            return json.load(in_file)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def hash_file(path, hasher=None):
+    """
+    Feeds the content of the file at 'path' to a hashlib hash object and returns the hash object
+
+    path: string | A file path
+    hasher: object | A hashlib hash object, a new CONSTANTS.CONTENT_HASH_ALGORITHM hash object if None
+    """
+    if hasher is None:
+        hasher = hashlib.new(CONSTANTS.CONTENT_HASH_ALGORITHM)
+
+    with io.open(path, u"rb") as in_file:
+        for chunk in iter(lambda: in_file.read(1024 * 1024), b""):
+            hasher.update(chunk)
+
+    return hasher
+
+
+def write_json_file(path, data, mode=None):
+    """
+    Writes 'data' to the file at 'path' in JSON format. The data is written to a temporary file that then replaces the
+    file at 'path', so the file is never left half-written.
+
+    path: string | A file path
+    data: object | A JSON serializable object
+    mode: int    | The permissions of the file (e.g. 0o600), the default permissions of new files if None
+    """
+    temp_path = path + u".tmp"
+    if mode is None:
+        out_file = io.open(temp_path, u"w", encoding=u"utf-8")
+    else:
+        out_file = io.open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode), u"w", encoding=u"utf-8")
+        os.chmod(temp_path, mode)
+    with out_file:
+        out_file.write(json.dumps(data))
+    os.replace(temp_path, path)
+
+
+def format_size(size):
+    """
+    Returns a human readable representation of a number of bytes, for instance '1.5 MB'
+
+    size: int | A number of bytes
+    """
+    for unit in (u"B", u"KB", u"MB", u"GB"):
+        if size < 1024:
+            break
+        size /= 1024.0
+    else:
+        unit = u"TB"
+    return (u"%d %s" if unit == u"B" else u"%.1f %s") % (size, unit)
+
+
 def validate_domain(domain):
     """
     Validate the the specified domain is a valid Canvas domain by
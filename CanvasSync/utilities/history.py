@@ -3,6 +3,35 @@ History
 
 Sync history state management.
 
+The History object is the interface to the sync history used by the Synchronizer and LocalSynchronizer objects. The
+history is sharded by course: the records of the entities stored in a course folder are kept in a history file inside
+that course folder, while records outside of any course folder are kept in the history file at the top level of the
+sync path. A small JSON manifest next to the top level history file lists the course folders that hold a shard. A
+shard is opened the first time a record of its course is looked up or written, so a synchronization only reads the
+history of the courses it synchronizes, and every shard is committed independently of the others.
+
+The records of a shard are kept by a history store, see history_stores.py. The CSV store (the default) loads the rows
+of the history file once into compact HistoryRecord objects and indexes them in dictionaries by normalized path and
+type and by normalized path. The SQLite store keeps the records in an indexed SQLite database instead, which is
+migrated from an existing CSV history file when first opened. With either store, looking up or updating the record of
+an entity takes constant time regardless of the number of records. The store is chosen by the 'history_backend'
+setting.
+
+Changes to a shard are committed to its store in batches, once a number of changes or an amount of time since the last
+commit of the shard is reached and at the end (or interruption) of a synchronization, see commit. The CSV store appends
+every change to a journal and syncs the journal to disk once per batch, and compacts the journal into the history file
+in the background once it has grown large. The SQLite store commits one transaction per batch.
+
+Records are written by a single writer thread of the History object. Any thread submits records to its queue without
+waiting for disk I/O, and the writer applies and persists them in the order they were submitted. Records that are still
+queued are visible to lookups by path. The flush method waits until all submitted records are applied, it is used at
+course boundaries (see commit) and when the history is closed.
+
+A history created before the history was sharded consists of the top level history file only. When no manifest is
+found, the records of that file are moved once into the shards of the course folders that still exist. The records of
+course folders that no longer exist stay in the top level history file, where they are looked up until the course
+folder is created again and they are moved into its shard.
+
 """
 
 # Future imports
@@ -11,69 +40,380 @@ from __future__ import print_function
 # Inbuilt modules
 import logging
 import os
+import threading
+import time
 
 # Third party modules
-import csv
+from six import text_type
+from six.moves import queue
 
 # CanvasSync modules
 from CanvasSync import constants as CONSTANTS
 from CanvasSync.local_entities.local_file import LocalFile
 from CanvasSync.utilities import helpers
+from CanvasSync.utilities.history_stores import csv_history_exists, open_store, FIELDNAMES, SQLITE_SUFFIX, \
+    OPERATION_DELETE, OPERATION_PUT
+
+# Suffix appended to the top level history file name for the manifest of the shards
+MANIFEST_SUFFIX = u".manifest"
+
+# The key of the shard holding the records outside of any course folder
+ROOT_SHARD = None
+
+# Queued to stop the writer thread of a History object
+_STOP_WRITER = object()
+
+
+class HistoryShard:
+    def __init__(self, path, settings):
+        """
+        path     : string | The path of the history file of the shard
+        settings : object | The Settings object, see the history settings
+        """
+        self.store = open_store(path, settings.history_backend,
+                                journal_fsync=settings.history_journal_fsync,
+                                compaction_ratio=settings.history_compaction_ratio)
+
+        self.commit_records = settings.history_commit_records
+        self.commit_seconds = settings.history_commit_seconds
+        self.pending_changes = 0
+        self.last_commit_time = time.time()
+
+        # Records are written by the writer thread of the History object, and may be committed from other threads
+        self.lock = threading.RLock()
+
+    def get_for_path(self, path):
+        with self.lock:
+            return self.store.get_for_path(path)
+
+    def rows(self):
+        with self.lock:
+            return self.store.rows()
+
+    def put(self, record):
+        self.apply(OPERATION_PUT, record)
+
+    def delete(self, record):
+        self.apply(OPERATION_DELETE, record)
+
+    def apply(self, operation, record):
+        """
+        Puts or deletes a record, committing once the commit thresholds are reached
+
+        operation : string | history_stores.OPERATION_PUT or OPERATION_DELETE
+        record    : dict   | A history record
+        """
+        with self.lock:
+            if operation == OPERATION_DELETE:
+                self.store.delete(record)
+            else:
+                self.store.put(record)
+
+            self.pending_changes += 1
+            if (self.pending_changes >= self.commit_records or
+                    time.time() - self.last_commit_time >= self.commit_seconds):
+                self.commit()
+
+    def commit(self):
+        with self.lock:
+            if self.pending_changes:
+                self.store.commit()
+
+            self.pending_changes = 0
+            self.last_commit_time = time.time()
+
+    def close(self):
+        with self.lock:
+            self.store.close()
+            self.pending_changes = 0
 
 
 class History:
     def __init__(self, settings):
-        self.history_file_path = os.path.join(settings.sync_path, settings.history_file_name)
-        self.history = self.__get_history_from_file(self.history_file_path)
-
-    @staticmethod
-    def __get_history_from_file(path):
-        if os.path.exists(path):
-            with open(path, newline='') as file:
-                data = list(csv.DictReader(file))
-                return data
-        else:
-            return []
+        self.sync_path = os.path.normpath(settings.sync_path)
+        self.history_file_name = settings.history_file_name
+        self.history_file_path = os.path.join(self.sync_path, self.history_file_name)
+        self.manifest_path = self.history_file_path + MANIFEST_SUFFIX
+        self.settings = settings
+
+        # The opened shards by course folder name, ROOT_SHARD for the top level history file
+        self.shards = {}
+
+        # Guards the dictionary of opened shards, the manifest and the queued records, each shard guards its own store
+        self.lock = threading.RLock()
+
+        self.manifest = self.__load_manifest()
+
+        # Operations on records submitted to the writer thread, and the latest queued record by normalized path (None
+        # for a deleted record), see write_history_record_to_file. The writer thread is started by the first record.
+        self.queue = queue.Queue()
+        self.queued_records = {}
+        self.writer = None
+        self.writer_errors = []
+
+    def __load_manifest(self):
+        """ [PRIVATE] Returns the manifest of the shards, splitting an unsharded history into shards if none exists """
+        if os.path.exists(self.manifest_path):
+            return helpers.read_json_file(self.manifest_path)
+
+        manifest = {u"shards": [], u"unsharded": []}
+        if csv_history_exists(self.history_file_path) or os.path.exists(self.history_file_path + SQLITE_SUFFIX):
+            self.manifest = manifest
+            self.__migrate_unsharded_history()
+
+        return manifest
+
+    def __migrate_unsharded_history(self):
+        """
+        [PRIVATE] Moves the records of the top level history file to the shards of their course folders. Records of
+        course folders that no longer exist are kept in the top level history file, and the names of these course
+        folders are listed as unsharded in the manifest, see __move_unsharded_records.
+        """
+        root = self.__get_shard(ROOT_SHARD, create=True)
+        remaining = []
+
+        for record in root.store.rows():
+            course_name = self.get_course_name(record.get(CONSTANTS.HISTORY_PATH))
+            if course_name is ROOT_SHARD or not os.path.isdir(os.path.join(self.sync_path, course_name)):
+                remaining.append(record)
+                if course_name is not ROOT_SHARD and course_name not in self.manifest[u"unsharded"]:
+                    self.manifest[u"unsharded"].append(course_name)
+                continue
+            self.__get_shard(course_name, create=True).store.put(record)
+
+        # Commit the shards and the manifest before the records are removed from the top level history file, so an
+        # interrupted migration is repeated rather than losing records
+        for shard in self.shards.values():
+            shard.store.commit()
+        self.__write_manifest()
+
+        root.store.clear()
+        for record in remaining:
+            root.store.put(record)
+        root.store.commit()
+
+    def __move_unsharded_records(self, course_name, shard):
+        """
+        [PRIVATE] Moves the records of a course folder that are kept in the top level history file since the migration
+        of an unsharded history into the shard of the course folder
+
+        course_name : string | The name of a course folder listed as unsharded in the manifest
+        shard       : object | The HistoryShard object of the course folder
+        """
+        root = self.__get_shard(ROOT_SHARD)
+        records = self.__get_unsharded_records(course_name)
+        for record in records:
+            shard.store.put(record)
+
+        # Commit the shard before the records are removed from the top level history file, so an interrupted move is
+        # repeated rather than losing records
+        shard.store.commit()
+        with root.lock:
+            for record in records:
+                root.store.delete(record)
+            root.store.commit()
+
+        self.manifest[u"unsharded"].remove(course_name)
+        self.__write_manifest()
+
+    def __get_unsharded_records(self, course_name):
+        """ [PRIVATE] Returns the records of a course folder listed as unsharded, see __move_unsharded_records """
+        return [record for record in self.__get_shard(ROOT_SHARD).rows()
+                if self.get_course_name(record.get(CONSTANTS.HISTORY_PATH)) == course_name]
+
+    def __is_unsharded(self, course_name):
+        """ [PRIVATE] Returns True if records of the course folder are kept in the top level history file """
+        return course_name is not ROOT_SHARD and course_name in self.manifest.get(u"unsharded", [])
+
+    def __write_manifest(self):
+        """ [PRIVATE] Writes the manifest of the shards """
+        helpers.write_json_file(self.manifest_path, self.manifest)
+
+    def get_course_name(self, path):
+        """
+        Returns the name of the course folder containing the path, or ROOT_SHARD if the path is not located inside a
+        course folder of the sync path
+
+        path : string | absolute path to local entity
+        """
+        if not path:
+            return ROOT_SHARD
+
+        relative_path = os.path.relpath(os.path.normpath(path), self.sync_path)
+        if relative_path == os.curdir or relative_path.split(os.sep)[0] == os.pardir:
+            return ROOT_SHARD
+
+        return relative_path.split(os.sep)[0]
+
+    def __get_shard(self, course_name, create=False):
+        """
+        [PRIVATE] Returns the shard of a course folder, opening it if needed. Returns None if the course has no shard
+        yet and 'create' is False. The shard of a course folder listed as unsharded is created once the course folder
+        exists again, and the records of the course folder are moved into it from the top level history file.
+
+        course_name : string | The name of a course folder, or ROOT_SHARD
+        create      : bool   | Create the shard if it does not exist
+        """
+        with self.lock:
+            shard = self.shards.get(course_name)
+            if shard is not None:
+                return shard
+
+            unsharded = self.__is_unsharded(course_name)
+            if course_name is ROOT_SHARD:
+                path = self.history_file_path
+            else:
+                if course_name not in self.manifest[u"shards"]:
+                    if not (create or unsharded and os.path.isdir(os.path.join(self.sync_path, course_name))):
+                        return None
+                    self.manifest[u"shards"].append(course_name)
+                    self.__write_manifest()
+                path = os.path.join(self.sync_path, course_name, self.history_file_name)
+
+            shard = HistoryShard(path, self.settings)
+            self.shards[course_name] = shard
+            if unsharded:
+                self.__move_unsharded_records(course_name, shard)
+            return shard
 
     def get_history_for_path(self, path):
         """
-        Returns the first row of record within the entity history file with a matching path to the specified path.
+        Returns the first row of record within the entity history file with a matching path to the specified path, or
+        the latest record with the path that is queued to be written.
 
         path : string | absolute path to local entity
         """
-        try:
-            return [row for idx, row in enumerate(self.history) if os.path.normpath(row.get('path')) == os.path.normpath(path)][0]
-        except IndexError:
-            return None
+        with self.lock:
+            if os.path.normpath(path) in self.queued_records:
+                return self.queued_records[os.path.normpath(path)]
 
-    def get_record_idx(self, record):
-        try:
-            return [idx for idx, row in enumerate(self.history)
-                    if row.get(CONSTANTS.HISTORY_PATH) == record.get(CONSTANTS.HISTORY_PATH) and
-                    row.get(CONSTANTS.HISTORY_TYPE) == record.get(CONSTANTS.HISTORY_TYPE)][0]
-        except:
-            return -1
+        course_name = self.get_course_name(path)
+        shard = self.__get_shard(course_name)
+        if shard is None and self.__is_unsharded(course_name):
+            shard = self.__get_shard(ROOT_SHARD)
+        return shard.get_for_path(path) if shard is not None else None
 
     def write_history_record_to_file(self, data):
-        fieldnames = [CONSTANTS.HISTORY_ID, CONSTANTS.HISTORY_PATH, CONSTANTS.HISTORY_MODIFIED_AT, CONSTANTS.HISTORY_TYPE]
-        record_index = self.get_record_idx(data)
-        if record_index != -1:
-            self.history[record_index] = data
-            with open(self.history_file_path, 'w', newline='') as file:
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(self.history)
-        elif not self.history:
-            self.history.append(data)
-            with open(self.history_file_path, 'w', newline='') as file:
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(self.history)
+        """
+        Submits a record to the writer thread, which adds it to the history or replaces the record with the same path
+        and type. Returns without waiting for the record to be written. The change is committed to the history file of
+        the shard with the next batch, see commit.
+
+        data : dict | A history record
+        """
+        self.__submit(OPERATION_PUT, data)
+
+    def delete_history_record(self, data):
+        """
+        Submits the removal of the record with the same path and type as 'data' to the writer thread. Returns without
+        waiting for the record to be removed.
+
+        data : dict | A history record
+        """
+        self.__submit(OPERATION_DELETE, data)
+
+    def __submit(self, operation, data):
+        """ [PRIVATE] Queues an operation on a record for the writer thread, starting the thread if needed """
+        # Queue a copy with text values, as the records are returned by the history stores
+        record = {field: u"" if data.get(field) is None else text_type(data.get(field)) for field in FIELDNAMES}
+
+        with self.lock:
+            self.queued_records[os.path.normpath(record[CONSTANTS.HISTORY_PATH])] = \
+                record if operation == OPERATION_PUT else None
+            if self.writer is None:
+                self.writer = threading.Thread(target=self.__write_queued_records)
+                self.writer.daemon = True
+                self.writer.start()
+        self.queue.put((operation, record))
+
+    def __write_queued_records(self):
+        """ [PRIVATE] The loop of the writer thread, applies the queued operations in order until stopped """
+        while True:
+            item = self.queue.get()
+            try:
+                if item is _STOP_WRITER:
+                    return
+                operation, record = item
+                shard = self.__get_shard(self.get_course_name(record[CONSTANTS.HISTORY_PATH]),
+                                         create=operation == OPERATION_PUT)
+                if shard is not None:
+                    shard.apply(operation, record)
+            except Exception as e:
+                with self.lock:
+                    self.writer_errors.append(e)
+            finally:
+                if item is not _STOP_WRITER:
+                    with self.lock:
+                        path = os.path.normpath(item[1][CONSTANTS.HISTORY_PATH])
+                        if path in self.queued_records and \
+                                self.queued_records[path] is (item[1] if item[0] == OPERATION_PUT else None):
+                            del self.queued_records[path]
+                self.queue.task_done()
+
+    def flush(self):
+        """
+        Blocks until all records submitted so far are written to the history stores, then re-raises the first
+        exception raised while writing a record, if any
+        """
+        self.queue.join()
+
+        with self.lock:
+            errors, self.writer_errors = self.writer_errors, []
+        if errors:
+            raise errors[0]
+
+    def get_course_records(self, course_path):
+        """
+        Returns a list of all records of the shard of a course, after writing the queued records
+
+        course_path : string | The path of the course folder
+        """
+        self.flush()
+        course_name = self.get_course_name(course_path)
+        shard = self.__get_shard(course_name)
+        if shard is None and self.__is_unsharded(course_name):
+            return self.__get_unsharded_records(course_name)
+        return shard.rows() if shard is not None else []
+
+    def commit(self, path=None):
+        """
+        Writes the queued records and commits the uncommitted changes to the history stores
+
+        path : string | Only commit the shard of the course containing this path, all shards if None
+        """
+        self.flush()
+
+        if path is not None:
+            shard = self.__get_shard(self.get_course_name(path))
+            shards = [shard] if shard is not None else []
         else:
-            self.history.append(data)
-            with open(self.history_file_path, 'a', newline='') as file:
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writerow(data)
+            with self.lock:
+                shards = list(self.shards.values())
+
+        for shard in shards:
+            shard.commit()
+
+    def close(self):
+        """
+        Writes the queued records, stops the writer thread, commits the uncommitted changes and closes the history
+        stores, waiting for a compaction running in the background to finish. The history may be used again after
+        closing.
+        """
+        try:
+            self.flush()
+        finally:
+            with self.lock:
+                writer, self.writer = self.writer, None
+            if writer is not None:
+                self.queue.put(_STOP_WRITER)
+                writer.join()
+
+            with self.lock:
+                shards = list(self.shards.values())
+                self.shards = {}
+
+            for shard in shards:
+                shard.close()
 
     def write_entity_to_file(self, entity):
         """
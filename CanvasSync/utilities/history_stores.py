@@ -0,0 +1,535 @@
+"""
+History stores
+
+Storage backends of the sync history used by the History object.
+
+A store holds history records, dictionaries with the fields listed in FIELDNAMES, keyed by the normalized path and the
+type of the record. All stores implement the same interface:
+
+get_for_path(path) : Returns the first record with a matching normalized path, or None
+put(record)        : Adds a record or replaces the record with the same normalized path and type
+delete(record)     : Removes the record with the same normalized path and type, if any
+rows()             : Returns a list of all records
+clear()            : Removes all records
+commit()           : Persists all changes made since the last commit
+close()            : Releases the resources of the store
+
+CsvHistoryStore keeps all records in memory as compact HistoryRecord objects, indexed by dictionaries. Its records are
+returned as dictionaries with text values and the normalized path. The records are stored in a CSV snapshot and an
+append-only CSV journal next to it: every change is appended to the journal with a single write, and a commit syncs the
+journal to disk with one fsync for the whole batch. Once the journal has grown large compared to the snapshot, a new
+snapshot is written in a background thread and the journal starts over. Loading replays the journal onto the snapshot,
+so all changes written before a crash or an interruption are recovered.
+SqliteHistoryStore keeps the records in a SQLite database in WAL mode with an index on the path, and commits one
+transaction per batch of changes. It does not load the records into memory, so startup time and memory use do not grow
+with the size of the history. Opening a SQLite store next to an existing CSV history migrates the CSV records once,
+and the CSV files are then renamed with MIGRATED_SUFFIX appended.
+
+Access to a store is not synchronized, the History object serializes it.
+"""
+
+# Inbuilt modules
+import calendar
+import io
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+# Third party modules
+import csv
+from six import text_type
+
+# CanvasSync modules
+from CanvasSync import constants as CONSTANTS
+
+
+# The fields of a history record. Fields added after the first four are empty in records written before they existed.
+# size         : The size in bytes of the file on the Canvas server
+# etag         : The ETag header of the download of the file
+# content_hash : The CONSTANTS.CONTENT_HASH_ALGORITHM hex digest of the content of the local file
+# verified_at  : The time the local file was last downloaded or found to match the history record
+FIELDNAMES = [CONSTANTS.HISTORY_ID, CONSTANTS.HISTORY_PATH, CONSTANTS.HISTORY_MODIFIED_AT, CONSTANTS.HISTORY_TYPE,
+              CONSTANTS.HISTORY_SIZE, CONSTANTS.HISTORY_ETAG, CONSTANTS.HISTORY_CONTENT_HASH,
+              CONSTANTS.HISTORY_VERIFIED_AT]
+
+# Names of the available backends, see open_store
+BACKEND_CSV = u"csv"
+BACKEND_SQLITE = u"sqlite"
+
+# Suffix appended to the history file name for the SQLite database
+SQLITE_SUFFIX = u".sqlite"
+
+# Suffix appended to the names of the files of a CSV history once it is migrated to a SQLite database
+MIGRATED_SUFFIX = u".migrated"
+
+# Suffixes appended to the history file name for the journal of the CSV store and for the journal of a compaction in
+# progress, and the journal size in bytes below which the journal is not compacted
+JOURNAL_SUFFIX = u".journal"
+COMPACTING_JOURNAL_SUFFIX = u".journal.compacting"
+MIN_COMPACTION_SIZE = 256 * 1024
+
+# The fields of a journal row, the operation (OPERATION_PUT or OPERATION_DELETE) followed by the fields of the record
+JOURNAL_OPERATION = u"operation"
+JOURNAL_FIELDNAMES = [JOURNAL_OPERATION] + FIELDNAMES
+OPERATION_PUT = u"put"
+OPERATION_DELETE = u"delete"
+
+# The format of the timestamps of Canvas, and a pattern matching its year, month, day, hour, minute and second
+TIMESTAMP_FORMAT = u"%Y-%m-%dT%H:%M:%SZ"
+TIMESTAMP_PATTERN = re.compile(r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})Z$")
+
+
+def get_record_key(record):
+    """
+    Returns the key identifying a record in the history, its normalized path and type
+
+    record : dict | A history record
+    """
+    return os.path.normpath(record.get(CONSTANTS.HISTORY_PATH)), record.get(CONSTANTS.HISTORY_TYPE)
+
+
+def encode_timestamp(value):
+    """
+    Returns a history timestamp as an integer number of seconds since the epoch. Timestamps that are not in the
+    TIMESTAMP_FORMAT used by Canvas, or would not be restored exactly by decode_timestamp, are returned as they are.
+
+    value : string | A timestamp of a history record
+    """
+    if not value:
+        return None
+
+    # Parsed with a pattern rather than with strptime, which is too slow for every record of a large history
+    match = TIMESTAMP_PATTERN.match(value)
+    if match is None:
+        return value
+    fields = tuple(map(int, match.groups()))
+
+    seconds = calendar.timegm(fields)
+    return seconds if time.gmtime(seconds)[:6] == fields else value
+
+
+def decode_timestamp(value):
+    """ Returns the text of a timestamp encoded by encode_timestamp """
+    if value is None:
+        return u""
+    return text_type(time.strftime(TIMESTAMP_FORMAT, time.gmtime(value))) if isinstance(value, int) else value
+
+
+def encode_integer(value):
+    """ Returns a number of a history record (e.g. an ID) as an integer, or as text if it is not a decimal number """
+    value = u"" if value is None else text_type(value)
+    return int(value) if value.isdigit() and text_type(int(value)) == value else value
+
+
+def decode_integer(value):
+    """ Returns the text of a number encoded by encode_integer """
+    return text_type(value)
+
+
+def encode_hash(value):
+    """ Returns a hex digest of a history record as bytes, or as it is if it is not a lower case hex digest """
+    if not value:
+        return None
+    try:
+        digest = bytes.fromhex(value)
+    except (TypeError, ValueError):
+        return value
+    return digest if digest.hex() == value else value
+
+
+def decode_hash(value):
+    """ Returns the hex digest of a digest encoded by encode_hash """
+    if value is None:
+        return u""
+    return value.hex() if isinstance(value, bytes) else value
+
+
+class HistoryRecord(object):
+    """
+    The compact in-memory representation of a history record used by the CsvHistoryStore.
+
+    The normalized path is split in its parent folder and its name. The parent folder and the type strings are interned,
+    so they are shared by all records of the same folder and type. Decimal ID numbers and timestamps in the Canvas
+    format, as well as sizes, are stored as integers and content hashes as bytes. Records compare equal and hash by
+    their key, the normalized path and the type.
+    """
+    __slots__ = ("id", "folder", "name", "trailing_separator", "modified_at", "type", "size", "etag", "content_hash",
+                 "verified_at")
+
+    def __init__(self, record):
+        """
+        record : dict | A history record
+        """
+        path = record.get(CONSTANTS.HISTORY_PATH) or u""
+        folder, self.name = os.path.split(os.path.normpath(path))
+        self.folder = sys.intern(folder)
+        self.trailing_separator = len(path) > 1 and path.endswith(os.sep)
+        self.type = sys.intern(text_type(record.get(CONSTANTS.HISTORY_TYPE) or u""))
+        self.update(record)
+
+    def update(self, record):
+        """ Replaces the fields of the record that are not part of its key by those of the dictionary 'record' """
+        self.id = encode_integer(record.get(CONSTANTS.HISTORY_ID))
+        self.modified_at = encode_timestamp(record.get(CONSTANTS.HISTORY_MODIFIED_AT))
+        self.size = encode_integer(record.get(CONSTANTS.HISTORY_SIZE))
+        self.etag = record.get(CONSTANTS.HISTORY_ETAG) or None
+        self.content_hash = encode_hash(record.get(CONSTANTS.HISTORY_CONTENT_HASH))
+        self.verified_at = encode_timestamp(record.get(CONSTANTS.HISTORY_VERIFIED_AT))
+
+    def get_path(self):
+        path = os.path.join(self.folder, self.name)
+        return path + os.sep if self.trailing_separator else path
+
+    def as_dict(self):
+        """ Returns the record as a dictionary with the fields of FIELDNAMES as text """
+        return {CONSTANTS.HISTORY_ID: decode_integer(self.id),
+                CONSTANTS.HISTORY_PATH: self.get_path(),
+                CONSTANTS.HISTORY_MODIFIED_AT: decode_timestamp(self.modified_at),
+                CONSTANTS.HISTORY_TYPE: self.type,
+                CONSTANTS.HISTORY_SIZE: decode_integer(self.size),
+                CONSTANTS.HISTORY_ETAG: self.etag or u"",
+                CONSTANTS.HISTORY_CONTENT_HASH: decode_hash(self.content_hash),
+                CONSTANTS.HISTORY_VERIFIED_AT: decode_timestamp(self.verified_at)}
+
+    def __eq__(self, other):
+        return self.folder == other.folder and self.name == other.name and self.type == other.type
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.folder, self.name, self.type))
+
+
+class CsvHistoryStore(object):
+    def __init__(self, path, journal_fsync=True, compaction_ratio=1.0):
+        """
+        path             : string | The path of the CSV history file, the snapshot of the history
+        journal_fsync    : bool   | Sync the journal to disk on every commit
+        compaction_ratio : float  | Compact the journal into the snapshot once it is this many times the snapshot size
+        """
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.compacting_journal_path = path + COMPACTING_JOURNAL_SUFFIX
+        self.journal_fsync = journal_fsync
+        self.compaction_ratio = compaction_ratio
+
+        # The HistoryRecord objects of the history in the order of the file, keyed by themselves, and the index of
+        # them by parent folder and name, see __index_record. The index maps each name to the list of the records of
+        # its path in the order of the file, usually a single one, so a record is removed without a scan of the history.
+        self.records = {}
+        self.path_index = {}
+
+        # Load the snapshot, then replay the journal of an unfinished compaction and the journal
+        for row in self.__read_rows(path):
+            self.__add_record(HistoryRecord(row))
+        journal_header = None
+        for journal_path in (self.compacting_journal_path, self.journal_path):
+            journal_header, rows = self.__read_journal(journal_path)
+            for row in rows:
+                if row.get(JOURNAL_OPERATION) == OPERATION_DELETE:
+                    self.__delete_record(row)
+                else:
+                    self.__put_record(row)
+
+        # The journal appended to by put, opened on the first change
+        self.journal = None
+        self.journal_size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        self.unsynced = False
+        self.journal_buffer = io.StringIO()
+        self.journal_writer = csv.writer(self.journal_buffer)
+
+        # The thread writing a snapshot in the background, see __compact
+        self.compaction = None
+
+        if os.path.exists(self.compacting_journal_path) or (journal_header and journal_header != JOURNAL_FIELDNAMES):
+            # Finish an interrupted compaction, or rewrite a journal of an earlier version of JOURNAL_FIELDNAMES
+            self.__compact(background=False)
+
+    @staticmethod
+    def __read_rows(path):
+        if os.path.exists(path):
+            with open(path, newline='') as file:
+                for row in csv.DictReader(file):
+                    yield row
+
+    @staticmethod
+    def __read_journal(path):
+        """
+        [PRIVATE] Returns the header and a list of the rows of a journal, or None and an empty list if the journal does
+        not exist. A last row that was not completely written before an interruption is removed from the journal.
+        """
+        if not os.path.exists(path):
+            return None, []
+        with open(path, u"rb") as file:
+            data = file.read()
+        if not data.endswith(b"\n"):
+            data = data[:data.rfind(b"\n") + 1]
+            os.truncate(path, len(data))
+        reader = csv.DictReader(io.TextIOWrapper(io.BytesIO(data), newline=''))
+        rows = list(reader)
+        return reader.fieldnames, rows
+
+    def __add_record(self, record):
+        self.records[record] = record
+        self.__index_record(record)
+
+    def __index_record(self, record):
+        """ Appends a record to the list of the records of its path in the path index """
+        self.path_index.setdefault(record.folder, {}).setdefault(record.name, []).append(record)
+
+    def __put_record(self, record):
+        """ [PRIVATE] Adds or replaces a record in memory """
+        new_record = HistoryRecord(record)
+        existing = self.records.get(new_record)
+        if existing is not None:
+            # Update the record in place to keep its position in the history file
+            existing.update(record)
+        else:
+            self.__add_record(new_record)
+
+    def __delete_record(self, record):
+        """ [PRIVATE] Removes a record from memory and from the list of the records of its path """
+        existing = self.records.pop(HistoryRecord(record), None)
+        if existing is None:
+            return
+
+        names = self.path_index[existing.folder]
+        records = names[existing.name]
+        records.remove(existing)
+        if not records:
+            del names[existing.name]
+            if not names:
+                del self.path_index[existing.folder]
+
+    def __append_to_journal(self, record, operation=OPERATION_PUT):
+        """ [PRIVATE] Appends a record to the journal in a single write """
+        if self.journal is None:
+            new_journal = not os.path.exists(self.journal_path)
+            self.journal = open(self.journal_path, 'a', newline='')
+            if new_journal:
+                self.journal_writer.writerow(JOURNAL_FIELDNAMES)
+
+        self.journal_writer.writerow([operation] + [record.get(field) for field in FIELDNAMES])
+        line = self.journal_buffer.getvalue()
+        self.journal_buffer.seek(0)
+        self.journal_buffer.truncate()
+
+        self.journal.write(line)
+        self.journal.flush()
+        self.journal_size += len(line)
+        self.unsynced = True
+
+    @staticmethod
+    def __as_dict(record):
+        return record.as_dict() if record is not None else None
+
+    def get_for_path(self, path):
+        folder, name = os.path.split(os.path.normpath(path))
+        records = self.path_index.get(folder, {}).get(name)
+        return self.__as_dict(records[0] if records else None)
+
+    def put(self, record):
+        self.__put_record(record)
+        self.__append_to_journal(record)
+
+    def delete(self, record):
+        self.__delete_record(record)
+        self.__append_to_journal(record, operation=OPERATION_DELETE)
+
+    def rows(self):
+        return [record.as_dict() for record in self.records]
+
+    def clear(self):
+        self.records = {}
+        self.path_index = {}
+        self.__compact(background=False)
+
+    def __close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def __compact(self, background=True):
+        """
+        [PRIVATE] Writes all records to a new snapshot and starts a new journal. The records are copied in the calling
+        thread and the snapshot is then written by a background thread, while a new journal receives the changes made
+        in the mean time. The old journal is kept as the compacting journal until the snapshot is written, so loading
+        the store before the compaction finished replays it onto the previous snapshot. A compaction that would replace
+        the compacting journal of an interrupted compaction is executed in the calling thread.
+
+        background : bool | Write the snapshot in a background thread
+        """
+        self.wait_for_compaction()
+        self.__close_journal()
+        self.journal_size = 0
+        self.unsynced = False
+
+        rows = [record.as_dict() for record in self.records]
+        if background and not os.path.exists(self.compacting_journal_path):
+            if os.path.exists(self.journal_path):
+                os.replace(self.journal_path, self.compacting_journal_path)
+            self.compaction = threading.Thread(target=self.__write_snapshot, args=(rows,))
+            self.compaction.start()
+        else:
+            self.__write_snapshot(rows)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+
+    def __write_snapshot(self, rows):
+        """
+        [PRIVATE] Writes the rows to a temporary file that is synced to disk and then atomically renamed to the
+        snapshot, and removes the compacting journal
+        """
+        temp_path = self.path + u".tmp"
+        with open(temp_path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(rows)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+
+        if os.path.exists(self.compacting_journal_path):
+            os.remove(self.compacting_journal_path)
+
+    def wait_for_compaction(self):
+        """ Blocks until a compaction running in the background has finished """
+        if self.compaction is not None:
+            self.compaction.join()
+            self.compaction = None
+
+    def commit(self):
+        """
+        Syncs the journal to disk, if enabled, so all changes since the last commit are synced with one fsync call.
+        Starts a compaction once the journal has grown to the compaction ratio of the size of the snapshot.
+        """
+        if self.unsynced and self.journal_fsync:
+            os.fsync(self.journal.fileno())
+            self.unsynced = False
+
+        snapshot_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        compaction_running = self.compaction is not None and self.compaction.is_alive()
+        if (not compaction_running and self.journal_size >= MIN_COMPACTION_SIZE and
+                self.journal_size >= snapshot_size * self.compaction_ratio):
+            self.__compact()
+
+    def close(self):
+        self.commit()
+        self.wait_for_compaction()
+        self.__close_journal()
+
+
+class SqliteHistoryStore(object):
+    def __init__(self, path):
+        """
+        path : string | The path of the SQLite database file
+        """
+        self.path = path
+
+        # The History object serializes access to the store, which may happen from several threads
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(u"PRAGMA journal_mode=WAL")
+        self.connection.execute(u"PRAGMA synchronous=NORMAL")
+        self.connection.execute(u"CREATE TABLE IF NOT EXISTS history ("
+                                u"id TEXT, path TEXT, modified_at TEXT, type TEXT, norm_path TEXT NOT NULL, "
+                                u"PRIMARY KEY (norm_path, type))")
+
+        # Add the columns of fields added to FIELDNAMES after the database was created
+        columns = [row[1] for row in self.connection.execute(u"PRAGMA table_info(history)")]
+        for field in FIELDNAMES:
+            if field not in columns:
+                self.connection.execute(u"ALTER TABLE history ADD COLUMN %s TEXT NOT NULL DEFAULT ''" % field)
+
+        self.connection.execute(u"CREATE INDEX IF NOT EXISTS history_norm_path ON history (norm_path)")
+        # Dropped index of a lookup by ID that is no longer used, it only slowed down writes
+        self.connection.execute(u"DROP INDEX IF EXISTS history_type_id")
+        self.connection.commit()
+
+    @staticmethod
+    def __to_record(row):
+        """ Returns a history record from a row of the history table """
+        return dict(zip(FIELDNAMES, row)) if row else None
+
+    def __select_one(self, where, parameters):
+        return self.__to_record(self.connection.execute(
+            u"SELECT %s FROM history WHERE %s ORDER BY rowid LIMIT 1" % (u", ".join(FIELDNAMES), where),
+            parameters).fetchone())
+
+    def is_empty(self):
+        return self.connection.execute(u"SELECT 1 FROM history LIMIT 1").fetchone() is None
+
+    def get_for_path(self, path):
+        return self.__select_one(u"norm_path = ?", (os.path.normpath(path),))
+
+    def put(self, record):
+        # Values are stored as text, like in the CSV history file. A new transaction is opened implicitly by the first
+        # change after a commit.
+        values = [u"" if record.get(field) is None else text_type(record.get(field)) for field in FIELDNAMES]
+        updates = [u"%s = excluded.%s" % (field, field) for field in FIELDNAMES if field != CONSTANTS.HISTORY_TYPE]
+        self.connection.execute(
+            u"INSERT INTO history (%s, norm_path) VALUES (%s) ON CONFLICT (norm_path, type) DO UPDATE SET %s"
+            % (u", ".join(FIELDNAMES), u", ".join(u"?" * (len(FIELDNAMES) + 1)), u", ".join(updates)),
+            values + [get_record_key(record)[0]])
+
+    def delete(self, record):
+        self.connection.execute(u"DELETE FROM history WHERE norm_path = ? AND type = ?", get_record_key(record))
+
+    def rows(self):
+        return [self.__to_record(row) for row in self.connection.execute(
+            u"SELECT %s FROM history ORDER BY rowid" % u", ".join(FIELDNAMES))]
+
+    def clear(self):
+        self.connection.execute(u"DELETE FROM history")
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+def get_csv_history_paths(path):
+    """ Returns a list of the paths of the files of a CSV history at 'path', the snapshot and the journals """
+    return [path + suffix for suffix in (u"", JOURNAL_SUFFIX, COMPACTING_JOURNAL_SUFFIX)]
+
+
+def csv_history_exists(path):
+    """ Returns True if a CSV history, a snapshot or a journal, exists at 'path' """
+    return any(os.path.exists(csv_path) for csv_path in get_csv_history_paths(path))
+
+
+def open_store(path, backend=BACKEND_CSV, journal_fsync=True, compaction_ratio=1.0):
+    """
+    Opens the history store of the specified backend at 'path'. The SQLite backend stores its database at 'path' with
+    SQLITE_SUFFIX appended. If the database is empty and a CSV history exists at 'path', its records are migrated to
+    the database, and the files of the CSV history are renamed with MIGRATED_SUFFIX appended so that the records are
+    not migrated again once the database is empty again.
+
+    path             : string | The path of the history file
+    backend          : string | BACKEND_CSV or BACKEND_SQLITE
+    journal_fsync    : bool   | See CsvHistoryStore
+    compaction_ratio : float  | See CsvHistoryStore
+    """
+    if backend == BACKEND_CSV:
+        return CsvHistoryStore(path, journal_fsync=journal_fsync, compaction_ratio=compaction_ratio)
+    elif backend != BACKEND_SQLITE:
+        raise ValueError(u"Unknown history backend: %s" % backend)
+
+    store = SqliteHistoryStore(path + SQLITE_SUFFIX)
+    if store.is_empty() and csv_history_exists(path):
+        csv_store = CsvHistoryStore(path)
+        for record in csv_store.rows():
+            store.put(record)
+        store.commit()
+        csv_store.close()
+
+        for csv_path in get_csv_history_paths(path):
+            if os.path.exists(csv_path):
+                os.replace(csv_path, csv_path + MIGRATED_SUFFIX)
+
+    return store
@@ -9,32 +9,200 @@ instructure_api.py
 The InstructureApi object is initialized with a Settings object from the CanvasSync.py module.
 This class implements the basic API calling functionality to the Canvas by Instructure server.
 
-requests is used to do https communication with the server. The server domain and authentication token is
-loaded from the Settings object. The Instructure API uses the JSON format to transmit data objects over the internet
-in attribute-value pairs. The json module is used to easily convert this format into a Python dictionary object.
+requests is used to do https communication with the server. All requests are sent through a single pooled, keep-alive
+requests.Session (see connection_pool.py) that is shared by every entity through the get_api method, so the TCP and TLS
+handshake to the server is only paid once per pooled connection. The server domain, authentication token, connection
+pool size and default timeouts are loaded from the Settings object. The Instructure API uses the JSON format to
+transmit data objects over the internet in attribute-value pairs. The json module is used to easily convert this format
+into a Python dictionary object.
 
 The InstructureApi object implements various methods that will fetch resources from the server such as lists of courses,
-modules and files that the user has authentication to access.
+modules and files that the user has authentication to access. List endpoints are paginated by Canvas, the pages are
+followed through the 'Link' response header. When Canvas also reports the last page of a listing, the remaining pages
+are fetched concurrently by a small thread pool and yielded in order.
+
+GET requests are idempotent and are repeated with an exponential backoff when they fail with a transient error, such as
+a 429 or 503 response or a reset connection (see retry.py). The retries are counted for the summary of the run.
+
+Every GET request is started by a scheduler that keeps the rate limit quota reported by Canvas above a floor, pacing
+the requests when it runs low and starting waiting API calls before file payloads (see rate_limit.py). The number of
+API calls and of payload transfers in flight is limited separately and adapted to the latency and errors of the server
+(see concurrency.py).
+
+The JSON responses are stored on disk with their ETag and Last-Modified validators, and requested conditionally on the
+next run. A 304 Not Modified response is served from the stored copy (see response_cache.py). If the metadata cache is
+enabled, stored responses younger than the time-to-live of their endpoint are served without a request at all.
 """
+# Inbuilt modules
+import hashlib
 import json
-import requests
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Third party modules
+from six import text_type
+from six.moves.urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+
+# CanvasSync modules
+from CanvasSync import constants as CONSTANTS
+from CanvasSync.utilities import helpers
+from CanvasSync.utilities.concurrency import ConcurrencyController
+from CanvasSync.utilities.connection_pool import make_session
+from CanvasSync.utilities.rate_limit import PRIORITY_API, PRIORITY_PAYLOAD, RateLimitScheduler
+from CanvasSync.utilities.response_cache import ENTRY_BODY, ENTRY_LINKS, ResponseCache
+from CanvasSync.utilities.retry import RETRY_EXCEPTIONS, RetryPolicy
+
+# The number of hosts to keep a connection pool for, the Canvas domain, the file storage server(s) payloads are
+# redirected to and a few hosts of linked files, see LinkedFile
+POOLED_HOSTS = 10
+
+# The number of bytes read from the network and written to disk at a time when streaming file payloads
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def get_numbered_page_urls(next_url, last_url):
+    """
+    Returns a list of the urls of all pages from 'next_url' to 'last_url' (both included) if both urls address their
+    page by number. Otherwise, if Canvas uses opaque bookmarks as page identifiers or either url is missing, an empty
+    list is returned.
+
+    next_url : string | The url of the rel="next" page of a listing
+    last_url : string | The url of the rel="last" page of a listing
+    """
+    if not next_url or not last_url:
+        return []
+
+    next_parts = urlsplit(next_url)
+    query = parse_qs(next_parts.query, keep_blank_values=True)
+    next_page = query.get(u"page", [u""])[0]
+    last_page = parse_qs(urlsplit(last_url).query).get(u"page", [u""])[0]
+    if not (next_page.isdigit() and last_page.isdigit()):
+        return []
+
+    page_urls = []
+    for page_number in range(int(next_page), int(last_page) + 1):
+        query[u"page"] = [text_type(page_number)]
+        page_urls.append(urlunsplit(next_parts._replace(query=urlencode(query, doseq=True))))
+    return page_urls
+
+
+def _content_range_starts_at(res, offset):
+    """
+    Returns True if the partial content response 'res' holds the payload from byte 'offset' and onwards
+
+    res    : object | A requests.Response object
+    offset : int    | The first byte that was requested
+    """
+    return res.headers.get(u"Content-Range", u"").startswith(u"bytes %i-" % offset)
+
+
+class DownloadStopped(Exception):
+    """ Raised by a payload download interrupted by InstructureApi.stop_downloads """
 
 
 class InstructureApi(object):
     def __init__(self, settings):
         """
-        settings : string | A Settings object used to load domain and token attributes
+        settings : string | A Settings object used to load domain, token and connection pool attributes
         """
         self.settings = settings
 
+        # Limit the number of API calls and payload transfers in flight, adapted to the server if enabled
+        if settings.adaptive_concurrency:
+            self.api_controller = ConcurrencyController(initial=settings.page_prefetch_workers, minimum=1,
+                                                        maximum=settings.api_concurrency_max)
+            self.payload_controller = ConcurrencyController(initial=settings.download_workers, minimum=1,
+                                                            maximum=settings.payload_concurrency_max)
+        else:
+            self.api_controller = ConcurrencyController(initial=settings.page_prefetch_workers,
+                                                        minimum=settings.page_prefetch_workers,
+                                                        maximum=settings.page_prefetch_workers)
+            self.payload_controller = ConcurrencyController(initial=settings.download_workers,
+                                                            minimum=settings.download_workers,
+                                                            maximum=settings.download_workers)
+
+        # Pooled keep-alive session used for all communication with the server. Every API call and payload transfer in
+        # flight holds a connection, so the pool keeps at least that many connections per host alive. Otherwise the
+        # connections beyond the pool size would be closed after each request.
+        pool_maxsize = max(settings.connection_pool_size,
+                           self.api_controller.maximum + self.payload_controller.maximum)
+        self.session, self.adapter = make_session(pool_connections=POOLED_HOSTS,
+                                                  pool_maxsize=pool_maxsize,
+                                                  timeout=(settings.connect_timeout, settings.read_timeout))
+
+        # Repeats GET requests that fail with a transient error
+        self.retry_policy = RetryPolicy(attempts=settings.retry_attempts,
+                                        base_delay=settings.retry_base_delay,
+                                        max_delay=settings.retry_max_delay)
+
+        # Paces requests to stay within the rate limit of the server
+        self.scheduler = RateLimitScheduler(floor=settings.rate_limit_floor,
+                                            leak_rate=settings.rate_limit_leak_rate)
+
+        # Stores JSON responses to request them conditionally on the next run, and to serve them without a request
+        # while fresh if the metadata cache is enabled. None if disabled.
+        self.response_cache = None
+        if settings.response_cache or settings.metadata_cache:
+            self.response_cache = ResponseCache(settings.response_cache_path,
+                                                max_size=settings.response_cache_max_size,
+                                                ttls=settings.metadata_cache_ttl if settings.metadata_cache else None)
+
+        # Thread pool used to fetch the remaining pages of a listing concurrently, see iterate_pages. Sized for the
+        # highest API concurrency, the api_controller limits the requests in flight.
+        self.page_prefetch_workers = self.api_controller.maximum
+        self.page_executor = ThreadPoolExecutor(max_workers=self.page_prefetch_workers)
+
+        # Set by stop_downloads to interrupt the payload transfers in progress
+        self.downloads_stopped = threading.Event()
+
+    def _send_get(self, url, priority=PRIORITY_API, **kwargs):
+        """
+        [PRIVATE] Sends a GET request through the rate limit scheduler, repeating it on transient errors. Every attempt
+        is scheduled on its own. An API call takes a slot of the api_controller before it enters the scheduler, so that
+        calls waiting for a slot are not counted as in flight. Payload transfers hold a slot of the payload_controller
+        for the whole transfer, see download_file_payload_to_path.
+
+        url      : string | The full url of the request
+        priority : int    | The scheduling priority, PRIORITY_API or PRIORITY_PAYLOAD
+        """
+        if priority == PRIORITY_PAYLOAD:
+            send = lambda: self.scheduler.send(lambda: self._observed_get(self.payload_controller, url, **kwargs),
+                                               priority)
+        else:
+            def send():
+                with self.api_controller.slot():
+                    return self.scheduler.send(lambda: self._observed_get(self.api_controller, url, **kwargs),
+                                               priority)
+
+        return self.retry_policy.send(send)
+
+    def _observed_get(self, controller, url, **kwargs):
+        """
+        [PRIVATE] Sends a GET request and reports its latency and whether it failed with a transient error to the
+        ConcurrencyController object 'controller'
+
+        controller : object | The ConcurrencyController object holding a slot for the request
+        url        : string | The full url of the request
+        """
+        started_at = time.time()
+        try:
+            res = self.session.get(url, **kwargs)
+        except Exception as e:
+            controller.observe(time.time() - started_at, congested=self.retry_policy.is_retryable_exception(e))
+            raise
+        controller.observe(time.time() - started_at, congested=self.retry_policy.is_retryable_response(res))
+        return res
+
     def _get(self, api_call):
         """
         [PRIVATE] Implements the basic GET call to the API. The get_json method wraps around this method.
 
         api_call : string | Any call to the Instructure API ("/api/v1/courses" for instance)
         """
-        return requests.get(u"%s%s" % (self.settings.domain, api_call),
-                            headers=self.get_auth_header())
+        return self._send_get(u"%s%s" % (self.settings.domain, api_call), headers=self.get_auth_header())
 
     def _post(self, api_call, **kwargs):
         """
@@ -43,7 +211,7 @@ class InstructureApi(object):
         api_call : string | Any call to the Instructure API ("/api/v1/courses" for instance)
         """
         headers = {**self.get_auth_header(), **kwargs.pop('headers', {})}
-        return requests.post(u"%s%s" % (self.settings.domain, api_call), headers=headers, **kwargs)
+        return self.session.post(u"%s%s" % (self.settings.domain, api_call), headers=headers, **kwargs)
 
     def _put(self, api_call, **kwargs):
         """
@@ -52,21 +220,105 @@ class InstructureApi(object):
         api_call : string | Any call to the Instructure API ("/api/v1/courses" for instance)
         """
         headers = {**self.get_auth_header(), **kwargs.pop('headers', {})}
-        return requests.put(u"%s%s" % (self.settings.domain, api_call), headers=headers, **kwargs)
+        return self.session.put(u"%s%s" % (self.settings.domain, api_call), headers=headers, **kwargs)
+
+    def stop_downloads(self):
+        """
+        Interrupts the payload transfers in progress after their current chunk, and makes new transfers fail right
+        away. The transfers raise DownloadStopped, see download_file_payload_to_path.
+        """
+        self.downloads_stopped.set()
 
     def get_auth_header(self):
         return {u'Authorization': u"Bearer %s" % self.settings.token}
 
+    def get_connection_stats(self):
+        """
+        Returns a dictionary with the number of requests sent through the connection pool and how many of them were
+        sent over a newly opened versus a reused (kept-alive) connection.
+        """
+        return self.adapter.stats.as_dict()
+
+    def get_retry_stats(self):
+        """
+        Returns a dictionary with the number of GET requests that were repeated after a transient error, by status code
+        or exception name, and the number of requests that still failed after the last attempt.
+        """
+        return self.retry_policy.stats.as_dict()
+
+    def get_rate_limit_state(self):
+        """
+        Returns a dictionary with the state of the rate limit scheduler: the last and the lowest quota reported by the
+        server, the average request cost, the requests in flight and waiting, and the requests paced to keep the quota
+        above the floor.
+        """
+        return self.scheduler.get_state()
+
+    def get_concurrency_summary(self):
+        """
+        Returns a dictionary with a summary of the concurrency limits chosen over the run for API calls (key 'api') and
+        payload transfers (key 'payload'), see ConcurrencyController.get_summary
+        """
+        return {u"api": self.api_controller.get_summary(),
+                u"payload": self.payload_controller.get_summary()}
+
+    def get_response_cache_stats(self):
+        """
+        Returns a dictionary with the number of conditional requests answered 304 Not Modified, the response bytes this
+        saved, the number of conditional requests answered with a new version and the number of responses served from
+        the metadata cache without a request, or None if the cache is disabled
+        """
+        return self.response_cache.get_stats() if self.response_cache is not None else None
+
+    def invalidate_course(self, course_id):
+        """
+        Removes the stored responses of all requests of a course from the response cache, so that the course is
+        requested in full again
+
+        course_id : int | A course ID number
+        """
+        if self.response_cache is not None:
+            self.response_cache.invalidate_course(course_id)
+
+    def _get_json_url(self, url):
+        """
+        [PRIVATE] Sends a GET request for a JSON response and returns the JSON digested body along with the parsed
+        'Link' header of the response. The request is made conditional on the version of the response stored in the
+        response cache, which is served if the server answers 304 Not Modified, and updated otherwise. A fresh stored
+        response is served without a request if the metadata cache is enabled.
+
+        url : string | The full url of the request
+        """
+        entry = None
+        if self.response_cache is not None:
+            entry = self.response_cache.get_fresh(url)
+            if entry is not None:
+                return entry[ENTRY_BODY], entry[ENTRY_LINKS]
+            entry = self.response_cache.get(url)
+
+        headers = self.get_auth_header()
+        headers.update(ResponseCache.get_conditional_headers(entry))
+        res = self._send_get(url, headers=headers)
+
+        if entry is not None and res.status_code == 304:
+            self.response_cache.count_not_modified(url, entry)
+            return entry[ENTRY_BODY], entry[ENTRY_LINKS]
+        res.raise_for_status()
+
+        body = json.loads(res.text)
+        if self.response_cache is not None:
+            if entry is not None:
+                self.response_cache.count_modified()
+            self.response_cache.put(url, res, body)
+        return body, res.links
+
     def get_json(self, api_call):
         """
-        A wrapper around the private _get method that will call _get with a specified API call and return the json
-        digested dictionary.
+        Sends a GET request with a specified API call and returns the json digested dictionary, see _get_json_url.
 
         api_call : string | Any call to the Instructure API ("/api/v1/courses" for instance)
         """
-        res = self._get(api_call)
-        res.raise_for_status()
-        return json.loads(res.text)
+        return self._get_json_url(u"%s%s" % (self.settings.domain, api_call))[0]
 
     def post_json(self, api_call, body, **kwargs):
         """
@@ -92,66 +344,155 @@ class InstructureApi(object):
         res.raise_for_status()
         return json.loads(res.text)
 
+    def _get_page(self, url):
+        """
+        [PRIVATE] Fetches a single page of a paginated list endpoint. Returns the JSON digested page, or None if the
+        response was not a list, along with the parsed 'Link' header of the response.
+
+        url : string | The full url of the page
+        """
+        page, links = self._get_json_url(url)
+        if not isinstance(page, (list, tuple)):
+            page = None
+        return page, links
+
+    def _prefetch_pages(self, page_urls):
+        """
+        [PRIVATE] A generator that fetches the pages at 'page_urls' concurrently and yields them in order, as returned
+        by _get_page. At most 'page_prefetch_workers' pages are requested or held in memory ahead of the consumer.
+
+        page_urls : list | A list of full urls of pages
+        """
+        page_urls = iter(page_urls)
+        pending = deque()
+        try:
+            for url in page_urls:
+                pending.append(self.page_executor.submit(self._get_page, url))
+                if len(pending) == self.page_prefetch_workers:
+                    break
+
+            while pending:
+                page, links = pending.popleft().result()
+
+                url = next(page_urls, None)
+                if url:
+                    pending.append(self.page_executor.submit(self._get_page, url))
+
+                yield page, links
+        finally:
+            # Do not fetch pages that will not be consumed
+            for future in pending:
+                future.cancel()
+
+    def iterate_pages(self, api_call):
+        """
+        A generator that yields the JSON digested list of every page of a paginated list endpoint. Canvas returns at
+        most 'per_page' items per response and points to the next page in the 'Link' header of the response, which is
+        followed until no page with rel="next" is given, holding a single page in memory at a time.
+
+        If the first page also points to a numbered rel="last" page, all remaining page urls are known up front and
+        are fetched concurrently instead (see _prefetch_pages), still yielding the pages in order. Up to
+        'page_prefetch_workers' pages are then requested or held in memory ahead of the page being consumed.
+
+        api_call : string | Any call to a list endpoint of the Instructure API ("/api/v1/courses" for instance)
+        """
+        url = u"%s%s" % (self.settings.domain, api_call)
+        while url:
+            page, links = self._get_page(url)
+            if page is None:
+                return
+            yield page
+
+            page_urls = get_numbered_page_urls(links.get(u"next", {}).get(u"url"),
+                                               links.get(u"last", {}).get(u"url"))
+            if page_urls:
+                for page, links in self._prefetch_pages(page_urls):
+                    if page is None:
+                        return
+                    yield page
+
+            # Continue sequentially if the listing grew beyond the page that was reported as the last one
+            url = links.get(u"next", {}).get(u"url")
+
+    def iterate_json_list(self, api_call):
+        """
+        A generator that yields the items of all pages of a paginated list endpoint one by one, see iterate_pages.
+
+        api_call : string | Any call to a list endpoint of the Instructure API ("/api/v1/courses" for instance)
+        """
+        for page in self.iterate_pages(api_call):
+            for item in page:
+                yield item
+
     def get_json_list(self, api_call):
-        data = self.get_json(api_call)
-        if not isinstance(data, (list, tuple)):
-            data = []
-        return data
+        """
+        Returns a list of the items of all pages of a paginated list endpoint. Use iterate_json_list instead when the
+        items are only needed once and in order.
+
+        api_call : string | Any call to a list endpoint of the Instructure API ("/api/v1/courses" for instance)
+        """
+        return list(self.iterate_json_list(api_call))
 
     def get_courses(self):
         """
-        Returns a list of course dictionaries.
+        Returns a generator of course dictionaries.
         """
-        return self.get_json_list(u"/api/v1/courses?per_page=100")
+        return self.iterate_json_list(u"/api/v1/courses?per_page=100")
 
-    def get_modules_in_course(self, course_id):
+    def get_modules_in_course(self, course_id, include_items=False):
         """
-        Returns a list of dictionaries on the Canvas modules located in a given course.
+        Returns a generator of dictionaries on the Canvas modules located in a given course.
 
-        course_id : int | A course ID number
+        If 'include_items' is True, the items of each module (with content details) are included in the module
+        dictionary under the 'items' key. Canvas omits the items of modules with too many items, in which case they
+        must be fetched with get_items_in_module.
+
+        course_id     : int     | A course ID number
+        include_items : boolean | Include the items of the modules in the listing
         """
-        return self.get_json_list(u"/api/v1/courses/%s/modules?per_page=100" % course_id)
+        include = u"&include[]=items&include[]=content_details" if include_items else u""
+        return self.iterate_json_list(u"/api/v1/courses/%s/modules?per_page=100%s" % (course_id, include))
 
     def get_files_in_folder(self, folder_id):
         """
-        Returns a list of dictionaries on the Canvas files located in a given folder
+        Returns a generator of dictionaries on the Canvas files located in a given folder
 
         folder_id : int | A folder ID number
         """
-        return self.get_json_list(u"/api/v1/folders/%s/files?per_page=100" % folder_id)
+        return self.iterate_json_list(u"/api/v1/folders/%s/files?per_page=100" % folder_id)
 
     def get_folders_in_folder(self, folder_id):
         """
-        Returns a list of dictionaries on the Canvas folders located in a given folder
+        Returns a generator of dictionaries on the Canvas folders located in a given folder
 
         folder_id : int | A folder ID number
         """
-        return self.get_json_list(u"/api/v1/folders/%s/folders?per_page=100" % folder_id)
+        return self.iterate_json_list(u"/api/v1/folders/%s/folders?per_page=100" % folder_id)
 
     def get_files_in_course(self, course_id):
         """
-        Returns a list of dictionaries on the Canvas files located in a given course.
+        Returns a generator of dictionaries on the Canvas files located in a given course.
 
         course_id : int | A course ID number
         """
-        return self.get_json_list(u"/api/v1/courses/%s/files?per_page=100" % course_id)
+        return self.iterate_json_list(u"/api/v1/courses/%s/files?per_page=100" % course_id)
 
     def get_folders_in_course(self, course_id):
         """
-        Returns a list of dictionaries on the Canvas folders located in a given course.
+        Returns a generator of dictionaries on the Canvas folders located in a given course.
 
         course_id : int | A course ID number
         """
-        return self.get_json_list(u"/api/v1/courses/%s/folders?per_page=100" % course_id)
+        return self.iterate_json_list(u"/api/v1/courses/%s/folders?per_page=100" % course_id)
 
     def get_items_in_module(self, course_id, module_id):
         """
-        Returns a dictionary of items located in a given module in a given course
+        Returns a list of dictionaries of items located in a given module in a given course
 
         course_id : int | A course ID number
         module_id : int | A module ID number
         """
-        return self.get_json(u"/api/v1/courses/%s/modules/%s/items?per_page=100" % (course_id, module_id))
+        return self.get_json_list(u"/api/v1/courses/%s/modules/%s/items?per_page=100" % (course_id, module_id))
 
     def download_item_information(self, url):
         """
@@ -162,14 +503,168 @@ class InstructureApi(object):
         url = url.split(self.settings.domain)[-1]
         return self.get_json(url)
 
-    def download_file_payload(self, donwload_url):
-        """
-        Returns the payload of a specified file in the Canvas system
-
-        donwload_url : string | The API download url pointing to a file in the Canvas system
-        """
-        url = donwload_url.split(self.settings.domain)[-1]
-        return self._get(url).content
+    def _get_payload_response(self, url, offset, if_range=None, external=False):
+        """
+        [PRIVATE] Opens a streamed GET request for a file payload, requesting only the bytes from 'offset' and onwards
+        if 'offset' is larger than 0.
+
+        url      : string | The full url of the file payload
+        offset   : int    | The number of bytes already downloaded
+        if_range : string | The ETag of the payload the downloaded bytes belong to, the server sends the whole payload
+                            if it changed since. Not sent if None.
+        external : bool   | The url points outside of the Canvas server, the authentication header is not sent
+        """
+        headers = self.get_auth_header() if not external else {}
+        if offset:
+            headers[u"Range"] = u"bytes=%i-" % offset
+            if if_range:
+                headers[u"If-Range"] = if_range
+        return self._send_get(url, priority=PRIORITY_PAYLOAD, headers=headers, stream=True)
+
+    def _stream_payload(self, url, res, part_path, offset, hasher, etag, external=False):
+        """
+        [PRIVATE] Writes the payload of the streamed response 'res' to the '.part' file from byte 'offset' and onwards,
+        and updates 'hasher' with it. Returns the hash object of the complete payload.
+
+        If the connection fails with a transient error (see retry.py) while the payload is streamed, the rest of the
+        payload is requested with a HTTP Range request from the end of the '.part' file after the delay of the retry
+        policy. Transient errors are retried as long as attempts of the retry policy remain, counting from the last
+        failure that did not receive any bytes. If the server sends the whole payload instead, it is written over.
+
+        url       : string | The full url of the file payload
+        res       : object | The requests.Response object of the payload, closed when done
+        part_path : string | The path of the '.part' file
+        offset    : int    | The number of bytes of the payload already in the '.part' file
+        hasher    : object | The hashlib hash object of the bytes already in the '.part' file
+        etag      : string | The ETag of the payload, or None
+        external  : bool   | See _get_payload_response
+        """
+        retry = 0
+        while True:
+            try:
+                with res, open(part_path, u"ab" if offset else u"wb") as out_file:
+                    for chunk in res.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        if self.downloads_stopped.is_set():
+                            raise DownloadStopped(part_path)
+                        out_file.write(chunk)
+                        hasher.update(chunk)
+                    out_file.flush()
+                    os.fsync(out_file.fileno())
+                return hasher
+            except RETRY_EXCEPTIONS as e:
+                if os.path.getsize(part_path) > offset:
+                    retry = 0
+                if retry >= self.retry_policy.attempts - 1 or self.downloads_stopped.is_set():
+                    self.retry_policy.stats.count_failure()
+                    raise
+                self.retry_policy.stats.count_retry(type(e).__name__)
+                time.sleep(self.retry_policy.get_delay(retry))
+                retry += 1
+
+            offset = os.path.getsize(part_path)
+            res = self._get_payload_response(url, offset, if_range=etag, external=external)
+            if res.status_code == 416:
+                # The connection failed after the last byte of the payload was received
+                res.close()
+                return hasher
+            try:
+                res.raise_for_status()
+            except Exception:
+                res.close()
+                raise
+            if res.status_code != 206 or not _content_range_starts_at(res, offset):
+                offset = 0
+                hasher = hashlib.new(CONSTANTS.CONTENT_HASH_ALGORITHM)
+
+    def download_file_payload_to_path(self, download_url, path, size=None, modified_at=None, external=False):
+        """
+        Streams the payload of a specified file in the Canvas system to disk. The payload is written in chunks of
+        DOWNLOAD_CHUNK_SIZE bytes to a temporary '.part' file next to 'path', which is synced to disk and then renamed
+        to 'path' in one atomic operation. Memory use is thus independent of the file size and 'path' never holds a
+        truncated file.
+
+        If the expected 'size' and 'modified_at' of the file are given, the download is resumable: they are recorded in
+        a '.part.info' file next to the '.part' file, and an interrupted download leaves both files in place. The next
+        call for the same, unchanged file continues the download with a HTTP Range request from the end of the '.part'
+        file. If the server ignores the Range request, the download starts over. Without 'size' and 'modified_at' an
+        interrupted download deletes the '.part' file. In both cases the exception is re-raised. A download interrupted
+        by stop_downloads raises DownloadStopped.
+
+        A transfer that fails with a transient error while the payload is streamed is continued from the end of the
+        '.part' file, see _stream_payload. The content hash of the payload is computed while it is streamed to disk.
+        Returns a dictionary of the size in bytes, the content hash and the ETag header of the response (or None) of the
+        downloaded payload, keyed by the corresponding history fields.
+
+        download_url : string | The API download url pointing to a file in the Canvas system
+        path         : string | The path to store the payload at
+        size         : int    | The expected size of the payload in bytes
+        modified_at  : string | The modified_at timestamp of the file in the Canvas system
+        external     : bool   | The url points to a file outside of the Canvas system (e.g. a LinkedFile), it is
+                                requested as it is and without the authentication header
+        """
+        if external:
+            url = download_url
+        else:
+            url = u"%s%s" % (self.settings.domain, download_url.split(self.settings.domain)[-1])
+        part_path = path + CONSTANTS.PARTIAL_DOWNLOAD_SUFFIX
+        info_path = path + CONSTANTS.PARTIAL_DOWNLOAD_INFO_SUFFIX
+
+        resumable = size is not None and modified_at is not None
+        expected_info = {u"size": size, u"modified_at": modified_at}
+
+        # Resume from the end of a previous partial download of the same version of the file
+        offset = 0
+        if resumable and os.path.exists(part_path) and helpers.read_json_file(info_path) == expected_info:
+            offset = os.path.getsize(part_path)
+
+        hasher = hashlib.new(CONSTANTS.CONTENT_HASH_ALGORITHM)
+
+        if self.downloads_stopped.is_set():
+            raise DownloadStopped(path)
+
+        # Hold a slot of the payload concurrency limit for the whole transfer
+        self.payload_controller.acquire()
+        try:
+            res = self._get_payload_response(url, offset, external=external)
+
+            if offset and res.status_code == 416 and offset != size:
+                # The partial file does not match the payload, start over
+                res.close()
+                offset = 0
+                res = self._get_payload_response(url, offset, external=external)
+
+            with res:
+                etag = res.headers.get(u"ETag")
+
+                if offset and res.status_code == 416:
+                    # The partial file already holds the complete payload
+                    helpers.hash_file(part_path, hasher)
+                else:
+                    res.raise_for_status()
+
+                    if res.status_code != 206 or not _content_range_starts_at(res, offset):
+                        offset = 0
+                    if resumable and not offset:
+                        helpers.write_json_file(info_path, expected_info)
+                    if offset:
+                        helpers.hash_file(part_path, hasher)
+
+                    hasher = self._stream_payload(url, res, part_path, offset, hasher, etag, external=external)
+        except BaseException:
+            if not resumable and os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        finally:
+            self.payload_controller.release()
+
+        downloaded_size = os.path.getsize(part_path)
+        os.replace(part_path, path)
+        if os.path.exists(info_path):
+            os.remove(info_path)
+
+        return {CONSTANTS.HISTORY_SIZE: downloaded_size,
+                CONSTANTS.HISTORY_CONTENT_HASH: hasher.hexdigest(),
+                CONSTANTS.HISTORY_ETAG: etag}
 
     def get_assignments_in_course(self, course_id):
         """
@@ -241,4 +736,12 @@ class InstructureApi(object):
         upload_params : dict   | Upload params returned from Canvas
         files         : dict   |  Dictionary representing files to be uploaded
         """
-        return requests.post(upload_url,  params=upload_params, files=files)
\ No newline at end of file
+        return self.session.post(upload_url,  params=upload_params, files=files)
+
+    def confirm_file_upload(self, location):
+        """
+        Completes a file upload that Canvas answered with a redirect by requesting the location it pointed to
+
+        location : string | The confirmation url returned from the upload url
+        """
+        return self.session.get(location, headers=self.get_auth_header())
\ No newline at end of file
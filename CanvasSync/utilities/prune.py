@@ -0,0 +1,216 @@
+"""
+prune.py, Class
+
+The Pruner object removes stale entries after a synchronization. An entry of the sync history of a course is stale if
+its path was not seen during the synchronization, that is if no CanvasEntity object was created for it because the
+file, page or module no longer exists on the Canvas server. The paths seen are collected by the Synchronizer object in
+one set per course, and the history records of each course are looked up in it.
+
+Files, linked files and pages are the content of the mirror. Depending on the prune mode, stale content is
+
+report  : only listed, together with the number of bytes that would be reclaimed
+delete  : deleted from the sync path
+archive : moved to the '.archive' folder of the course, keeping its path within the course folder
+
+and its history record is removed (except in the report mode). Stale module and sub-header folders are removed along
+with their history record only if they are empty once their content was pruned, as they may hold files of the user.
+
+Courses are only pruned if all of their content was synchronized, as the entities of module items or assignments that
+are not synchronized are never seen. For the same reason, linked files are not pruned while linked files are not
+downloaded.
+"""
+
+# Future imports
+from __future__ import print_function
+
+# Inbuilt modules
+import os
+import shutil
+
+# CanvasSync modules
+from CanvasSync import constants as CONSTANTS
+from CanvasSync.utilities import helpers
+from CanvasSync.utilities.ANSI import ANSI
+
+# The prune modes, see the module documentation
+PRUNE_OFF = u"off"
+PRUNE_REPORT = u"report"
+PRUNE_DELETE = u"delete"
+PRUNE_ARCHIVE = u"archive"
+PRUNE_MODES = (PRUNE_OFF, PRUNE_REPORT, PRUNE_DELETE, PRUNE_ARCHIVE)
+
+# The history record types of content and of folders
+CONTENT_TYPES = (CONSTANTS.ENTITY_FILE, CONSTANTS.ENTITY_LINKED_FILE, CONSTANTS.ENTITY_PAGE)
+FOLDER_TYPES = (CONSTANTS.ENTITY_MODULE, u"sub_header")
+
+
+def get_size(path):
+    """ Returns the size in bytes of the file at 'path', or of all files below the folder at 'path' """
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+
+    size = 0
+    for folder, _, file_names in os.walk(path):
+        for file_name in file_names:
+            size += os.path.getsize(os.path.join(folder, file_name))
+    return size
+
+
+def move_into(path, target_path):
+    """
+    Moves the file or folder at 'path' to 'target_path'. A folder is merged into an existing folder at 'target_path',
+    replacing files of the same name.
+
+    path        : string | The path of a file or folder
+    target_path : string | The path to move it to
+    """
+    if not (os.path.isdir(path) and os.path.isdir(target_path)):
+        if os.path.isdir(target_path):
+            shutil.rmtree(target_path)
+        os.replace(path, target_path)
+        return
+
+    for name in os.listdir(path):
+        move_into(os.path.join(path, name), os.path.join(target_path, name))
+    os.rmdir(path)
+
+
+class Pruner(object):
+    def __init__(self, settings, history, mode):
+        """
+        settings : object | The Settings object
+        history  : object | The History object
+        mode     : string | One of PRUNE_MODES
+        """
+        if mode not in PRUNE_MODES:
+            raise ValueError(u"Unknown prune mode: %s" % mode)
+
+        self.settings = settings
+        self.history = history
+        self.mode = mode
+
+        # The number of stale entries and their size in bytes
+        self.stale_entries = 0
+        self.stale_bytes = 0
+
+    def is_course_complete(self):
+        """ Returns True if all content of the courses is synchronized, so that all current entities are seen """
+        return all(self.settings.modules_settings.values()) and self.settings.sync_assignments
+
+    @staticmethod
+    def is_seen(path, course_path, seen_paths):
+        """
+        Returns True if the path or, for content stored in a page folder that was not downloaded again, one of its
+        parent folders within the course was seen
+
+        path        : string | A normalized path
+        course_path : string | The normalized path of the course folder
+        seen_paths  : dict   | The normalized paths seen in the course, mapped to True if everything below is seen
+        """
+        if path in seen_paths:
+            return True
+
+        folder = os.path.dirname(path)
+        while len(folder) > len(course_path):
+            if seen_paths.get(folder):
+                return True
+            folder = os.path.dirname(folder)
+        return False
+
+    def get_stale_records(self, course_path, seen_paths):
+        """
+        Returns a list of the history records of a course whose paths were not seen, content before folders and
+        deeper folders before their parents
+
+        course_path : string | The path of the course folder
+        seen_paths  : dict   | See is_seen
+        """
+        course_path = os.path.normpath(course_path)
+        types = CONTENT_TYPES + FOLDER_TYPES
+        if not self.settings.download_linked:
+            # Linked files are not seen when they are not downloaded
+            types = tuple(entity_type for entity_type in types if entity_type != CONSTANTS.ENTITY_LINKED_FILE)
+
+        stale = [record for record in self.history.get_course_records(course_path)
+                 if record.get(CONSTANTS.HISTORY_TYPE) in types and
+                 not self.is_seen(os.path.normpath(record.get(CONSTANTS.HISTORY_PATH)), course_path, seen_paths)]
+
+        stale.sort(key=lambda record: (record.get(CONSTANTS.HISTORY_TYPE) in FOLDER_TYPES,
+                                       -len(os.path.normpath(record.get(CONSTANTS.HISTORY_PATH)))))
+        return stale
+
+    def print_status(self, status, color, path, size=None):
+        """ Print the status of a stale entry """
+        helpers.print_line(ANSI.format(u"[%s]" % status, formatting=color) + u" " * (13 - len(status)) + u"|   %s%s"
+                           % (os.path.relpath(path, self.settings.sync_path),
+                              u" (%s)" % helpers.format_size(size) if size is not None else u""))
+
+    def prune_record(self, course_path, record):
+        """
+        Prunes the local copy and the history record of a stale entry according to the prune mode
+
+        course_path : string | The path of the course folder
+        record      : dict   | The history record of the stale entry
+        """
+        path = os.path.normpath(record.get(CONSTANTS.HISTORY_PATH))
+
+        if record.get(CONSTANTS.HISTORY_TYPE) in FOLDER_TYPES:
+            if os.path.isdir(path) and os.listdir(path):
+                return
+            self.stale_entries += 1
+            if self.mode == PRUNE_REPORT:
+                self.print_status(u"STALE", u"yellow", path)
+                return
+            if os.path.isdir(path):
+                os.rmdir(path)
+            self.print_status(u"REMOVED", u"red", path)
+            self.history.delete_history_record(record)
+            return
+
+        size = get_size(path) if os.path.exists(path) else 0
+        self.stale_entries += 1
+        self.stale_bytes += size
+
+        if self.mode == PRUNE_REPORT:
+            self.print_status(u"STALE", u"yellow", path, size)
+            return
+
+        if os.path.exists(path):
+            if self.mode == PRUNE_ARCHIVE:
+                archive_path = os.path.join(course_path, CONSTANTS.FOLDER_ARCHIVE, os.path.relpath(path, course_path))
+                if not os.path.isdir(os.path.dirname(archive_path)):
+                    os.makedirs(os.path.dirname(archive_path))
+                # The archive folder of a page may already hold the files of the page archived before it
+                move_into(path, archive_path)
+            elif os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+        self.print_status(u"ARCHIVED" if self.mode == PRUNE_ARCHIVE else u"DELETED", u"red", path, size)
+        self.history.delete_history_record(record)
+
+    def prune_course(self, course_path, seen_paths):
+        """
+        Prunes the stale entries of a course
+
+        course_path : string | The path of the course folder
+        seen_paths  : dict   | See is_seen
+        """
+        if self.mode == PRUNE_OFF or not self.is_course_complete():
+            return
+
+        for record in self.get_stale_records(course_path, seen_paths):
+            self.prune_record(course_path, record)
+
+    def print_summary(self):
+        """ Print the number of stale entries and the number of bytes reclaimed, or reclaimable in the report mode """
+        if self.mode == PRUNE_OFF or not self.stale_entries:
+            return
+
+        if self.mode == PRUNE_REPORT:
+            message = u"%d stale entries, %s reclaimable (prune mode 'delete' or 'archive' removes them)"
+        else:
+            message = u"%d stale entries pruned, %s reclaimed"
+        print(ANSI.format(u"\n[*] " + message % (self.stale_entries, helpers.format_size(self.stale_bytes)),
+                          formatting=u"bold"))
@@ -0,0 +1,195 @@
+"""
+rate_limit.py, module
+
+Implements the request scheduler that keeps the InstructureApi object within the rate limit of the Canvas server.
+
+Canvas throttles API requests with a leaky bucket per access token: every request costs a number of units, reported in
+the X-Request-Cost header of its response, and the quota left in the bucket is reported in the X-Rate-Limit-Remaining
+header. The bucket refills over time, and requests made while it is empty are answered with 403 "Rate Limit Exceeded".
+
+The RateLimitScheduler object tracks the remaining quota and the average request cost from the response headers. Before
+a request is sent it projects the quota left once the requests already in flight are charged, assuming the bucket
+refills at 'leak_rate' units per second since the last report. Requests are started while this projection stays above
+'floor', and otherwise wait until responses report a higher quota or enough time has passed for the bucket to refill.
+Waiting requests are started by priority (API calls before file payloads) and in the order they arrived. Until Canvas
+reports a quota, requests are not paced.
+"""
+
+# Inbuilt modules
+import heapq
+import itertools
+import threading
+import time
+
+# CanvasSync modules
+from CanvasSync.utilities.retry import RATE_LIMIT_EXCEEDED
+
+# The priorities of requests, lower values are started first
+PRIORITY_API = 0
+PRIORITY_PAYLOAD = 1
+
+# The response headers reporting the rate limit
+HEADER_REMAINING = u"X-Rate-Limit-Remaining"
+HEADER_COST = u"X-Request-Cost"
+
+# The weight of the cost of the latest response in the average request cost
+COST_SMOOTHING = 0.2
+
+
+def _get_float_header(res, header):
+    """ Returns the value of a numeric header of the response 'res', or None if missing or malformed """
+    try:
+        return float(res.headers[header])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class RateLimitScheduler(object):
+    def __init__(self, floor, leak_rate):
+        """
+        floor     : float | The quota in units kept in the bucket
+        leak_rate : float | The assumed rate in units per second at which the bucket refills
+        """
+        self.floor = floor
+        self.leak_rate = leak_rate
+
+        self.condition = threading.Condition()
+
+        # The quota reported by the latest response and when it was received, None until Canvas reports a quota
+        self.remaining = None
+        self.reported_at = None
+
+        # The highest quota reported by a response that was not throttled, the bucket does not refill beyond it
+        self.capacity = None
+
+        # The average cost of a request
+        self.cost = 0.0
+
+        # The number of requests sent but not yet answered, and a heap of (priority, sequence number) tickets of the
+        # requests waiting to be started
+        self.in_flight = 0
+        self.waiting = []
+        self.sequence = itertools.count()
+
+        # Instrumentation, see get_state
+        self.requests = 0
+        self.paced_requests = 0
+        self.paced_seconds = 0.0
+        self.throttled_responses = 0
+        self.lowest_remaining = None
+
+    def _get_estimated_remaining(self, now):
+        """ [PRIVATE] Returns the quota estimated to be in the bucket at time 'now', before charging requests """
+        refilled = self.remaining + self.leak_rate * (now - self.reported_at)
+        return min(refilled, self.capacity) if self.capacity is not None else refilled
+
+    def _get_delay(self):
+        """ [PRIVATE] Returns the number of seconds to wait before one more request can be started, 0 if it can """
+        if self.remaining is None:
+            return 0.0
+
+        required = self.floor + (self.in_flight + 1) * self.cost
+        if self.capacity is not None and not self.in_flight:
+            # The bucket never held the floor, start a single request once it is estimated to be full
+            required = min(required, self.capacity)
+
+        missing = required - self._get_estimated_remaining(time.time())
+        if missing <= 0:
+            return 0.0
+        if self.leak_rate <= 0:
+            # The quota is only updated by responses, wait for one unless none is expected
+            return float(u"inf") if self.in_flight else 0.0
+        return missing / self.leak_rate
+
+    def acquire(self, priority):
+        """
+        Blocks until a request of the given priority can be started without the quota falling below the floor, and
+        waiting requests of a higher priority or that arrived earlier are started
+
+        priority : int | PRIORITY_API or PRIORITY_PAYLOAD
+        """
+        with self.condition:
+            ticket = (priority, next(self.sequence))
+            heapq.heappush(self.waiting, ticket)
+
+            waited_since = None
+            while True:
+                if self.waiting[0] == ticket:
+                    delay = self._get_delay()
+                    if delay <= 0:
+                        break
+                    if waited_since is None:
+                        waited_since = time.time()
+                    self.condition.wait(None if delay == float(u"inf") else delay)
+                else:
+                    self.condition.wait()
+
+            heapq.heappop(self.waiting)
+            self.in_flight += 1
+            self.requests += 1
+            if waited_since is not None:
+                self.paced_requests += 1
+                self.paced_seconds += time.time() - waited_since
+
+            # Let the next waiting request check if it can start as well
+            self.condition.notify_all()
+
+    def release(self, res):
+        """
+        Marks a started request as answered and updates the quota and request cost from its response
+
+        res : object | The requests.Response object of the request, or None if the request failed
+        """
+        with self.condition:
+            self.in_flight -= 1
+
+            if res is not None:
+                remaining = _get_float_header(res, HEADER_REMAINING)
+                cost = _get_float_header(res, HEADER_COST)
+                throttled = res.status_code == 429 or (res.status_code == 403 and RATE_LIMIT_EXCEEDED in res.text)
+
+                if throttled:
+                    self.throttled_responses += 1
+                    remaining = min(remaining if remaining is not None else 0.0, 0.0)
+                if remaining is not None:
+                    self.remaining = remaining
+                    self.reported_at = time.time()
+                    if not throttled:
+                        self.capacity = max(self.capacity, remaining) if self.capacity is not None else remaining
+                    if self.lowest_remaining is None or remaining < self.lowest_remaining:
+                        self.lowest_remaining = remaining
+                if cost is not None:
+                    self.cost = cost if not self.cost else (1 - COST_SMOOTHING) * self.cost + COST_SMOOTHING * cost
+
+            self.condition.notify_all()
+
+    def send(self, request, priority=PRIORITY_API):
+        """
+        Sends a request by calling 'request' once it can be started, see acquire, and returns its response
+
+        request  : callable | A function without arguments that sends the request and returns a requests.Response object
+        priority : int      | PRIORITY_API or PRIORITY_PAYLOAD
+        """
+        self.acquire(priority)
+        res = None
+        try:
+            res = request()
+            return res
+        finally:
+            self.release(res)
+
+    def get_state(self):
+        """
+        Returns a dictionary of the last reported quota, the lowest quota reported, the average request cost, the
+        number of requests in flight and waiting, and the number of requests and seconds spent waiting for quota
+        """
+        with self.condition:
+            return {u"remaining": self.remaining,
+                    u"lowest_remaining": self.lowest_remaining,
+                    u"request_cost": self.cost,
+                    u"in_flight": self.in_flight,
+                    u"waiting": len(self.waiting),
+                    u"requests": self.requests,
+                    u"paced_requests": self.paced_requests,
+                    u"paced_seconds": self.paced_seconds,
+                    u"throttled_responses": self.throttled_responses}
@@ -0,0 +1,310 @@
+"""
+response_cache.py, Class
+
+The ResponseCache object stores the JSON responses of GET requests to the Canvas API on disk, so that they can be
+requested conditionally on the next run.
+
+Canvas answers API requests with an ETag header identifying the version of the response, and some with a Last-Modified
+header. For every response carrying either, the cache stores the validators together with the decoded JSON body and
+the parsed 'Link' header (needed to follow the pages of a listing) under the url of the request. The next request of
+the same url sends the validators in the If-None-Match and If-Modified-Since headers, and the server answers
+304 Not Modified without a body if nothing changed, in which case the cached body and links are used.
+
+If time-to-live values per endpoint are given, the cache also serves as a metadata cache: an entry the server returned
+or confirmed less than the time-to-live of its endpoint ago (see get_endpoint) is served without any request, so that
+frequent runs cost no requests while the entries are fresh. The time-to-live of an endpoint of 0 or less disables this
+for the endpoint.
+
+Each entry is a JSON file named by the SHA-1 hash of its url, written atomically. Entries of urls of a course
+(/courses/<id>/...) are stored in a 'course_<id>' sub-folder, so that all entries of a course can be invalidated at
+once. The modification time of an entry file records when the server last returned or confirmed the entry, and its
+access time when it was last used. When the files of the cache exceed 'max_size' bytes, the least recently used entries
+are evicted. The folder is created on the first write. As the entries hold the download urls of files, which grant
+access to the files without authentication, the folders and entry files are only accessible by the user.
+"""
+
+# Inbuilt modules
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+
+# Third party modules
+from six.moves.urllib.parse import urlsplit
+
+# CanvasSync modules
+from CanvasSync.utilities import helpers
+
+# The keys of a cache entry
+ENTRY_URL = u"url"
+ENTRY_ETAG = u"etag"
+ENTRY_LAST_MODIFIED = u"last_modified"
+ENTRY_LINKS = u"links"
+ENTRY_BODY = u"body"
+ENTRY_SIZE = u"size"
+
+# The endpoints entries are classified by for their time-to-live, see get_endpoint
+ENDPOINT_COURSES = u"courses"
+ENDPOINT_MODULES = u"modules"
+ENDPOINT_MODULE_ITEMS = u"module_items"
+ENDPOINT_ASSIGNMENTS = u"assignments"
+ENDPOINT_FILES = u"files"
+ENDPOINT_FOLDERS = u"folders"
+ENDPOINT_PAGES = u"pages"
+ENDPOINT_OTHER = u"other"
+
+# Patterns of url paths and the endpoint they belong to, the first matching pattern applies
+ENDPOINT_PATTERNS = [(re.compile(pattern), endpoint) for pattern, endpoint in (
+    (u"/courses/?$", ENDPOINT_COURSES),
+    (u"/modules/[^/]+/items", ENDPOINT_MODULE_ITEMS),
+    (u"/modules", ENDPOINT_MODULES),
+    (u"/assignments", ENDPOINT_ASSIGNMENTS),
+    (u"/folders/?$", ENDPOINT_FOLDERS),
+    (u"/(files|folders/[^/]+/files)", ENDPOINT_FILES),
+    (u"/folders", ENDPOINT_FOLDERS),
+    (u"/pages", ENDPOINT_PAGES))]
+
+# Matches the course ID number of the url path of a course
+COURSE_PATTERN = re.compile(u"/courses/([^/]+)")
+
+# The fraction of 'max_size' the cache is reduced to when entries are evicted
+EVICTION_TARGET = 0.9
+
+# The permissions of the folders and of the entry files of the cache, only accessible by the user
+FOLDER_MODE = 0o700
+ENTRY_MODE = 0o600
+
+
+def get_endpoint(url):
+    """
+    Returns the endpoint of a url, one of the ENDPOINT_* constants
+
+    url : string | The full url of a request
+    """
+    path = urlsplit(url).path
+    for pattern, endpoint in ENDPOINT_PATTERNS:
+        if pattern.search(path):
+            return endpoint
+    return ENDPOINT_OTHER
+
+
+class ResponseCache(object):
+    def __init__(self, path, max_size=None, ttls=None):
+        """
+        path     : string | The path of the cache folder
+        max_size : int    | The number of bytes the entry files may take up, unlimited if None
+        ttls     : dict   | The time-to-live in seconds of the entries of each endpoint (ENDPOINT_* keys), entries are
+                            not served without a request if None
+        """
+        self.path = path
+        self.max_size = max_size
+        self.ttls = ttls
+
+        # Serializes writes, entries of the same url are written to the same temporary file
+        self.lock = threading.Lock()
+
+        # The number of bytes taken up by the entry files, None until needed, see evict
+        self.size = None
+
+        # The number of conditional requests answered 304 Not Modified and the response bytes this saved, the number
+        # of conditional requests answered with a new version, and the number of entries served without a request
+        self.not_modified = 0
+        self.saved_bytes = 0
+        self.modified = 0
+        self.fresh = 0
+
+    def get_course_path(self, course_id):
+        """ Returns the path of the sub-folder of the entries of a course """
+        return os.path.join(self.path, u"course_%s" % course_id)
+
+    def get_entry_path(self, url):
+        """ Returns the path of the file of the entry of 'url' """
+        file_name = hashlib.sha1(url.encode(u"utf-8")).hexdigest() + u".json"
+
+        course = COURSE_PATTERN.search(urlsplit(url).path)
+        if course is not None:
+            return os.path.join(self.get_course_path(course.group(1)), file_name)
+        return os.path.join(self.path, file_name)
+
+    def get(self, url):
+        """
+        Returns the entry of 'url' as a dictionary, or None if the url is not cached
+
+        url : string | The full url of a request
+        """
+        entry = helpers.read_json_file(self.get_entry_path(url))
+        if not isinstance(entry, dict) or entry.get(ENTRY_URL) != url:
+            return None
+        return entry
+
+    def get_fresh(self, url):
+        """
+        Returns the entry of 'url' if it was returned or confirmed by the server less than the time-to-live of its
+        endpoint ago, otherwise None. The entry is marked as used.
+
+        url : string | The full url of a request
+        """
+        if self.ttls is None:
+            return None
+
+        ttl = self.ttls.get(get_endpoint(url), self.ttls.get(ENDPOINT_OTHER, 0))
+        if ttl <= 0:
+            return None
+
+        entry_path = self.get_entry_path(url)
+        try:
+            validated_at = os.path.getmtime(entry_path)
+        except OSError:
+            return None
+        if time.time() - validated_at >= ttl:
+            return None
+
+        entry = self.get(url)
+        if entry is None:
+            return None
+
+        self.__touch(entry_path, validated_at)
+        with self.lock:
+            self.fresh += 1
+        return entry
+
+    @staticmethod
+    def __touch(entry_path, validated_at=None):
+        """
+        [PRIVATE] Marks an entry file as used now, and as validated at 'validated_at' or now if None
+
+        entry_path : string | The path of an entry file
+        """
+        now = time.time()
+        try:
+            os.utime(entry_path, (now, validated_at if validated_at is not None else now))
+        except OSError:
+            pass
+
+    @staticmethod
+    def get_conditional_headers(entry):
+        """
+        Returns a dictionary of the headers that make a request conditional on the cached version of the response
+
+        entry : dict | A cache entry, or None
+        """
+        headers = {}
+        if entry is None:
+            return headers
+
+        if entry.get(ENTRY_ETAG):
+            headers[u"If-None-Match"] = entry[ENTRY_ETAG]
+        if entry.get(ENTRY_LAST_MODIFIED):
+            headers[u"If-Modified-Since"] = entry[ENTRY_LAST_MODIFIED]
+        return headers
+
+    def put(self, url, res, body):
+        """
+        Stores the decoded JSON body and the links of the response 'res' to a request of 'url' if the response carries
+        an ETag or Last-Modified header. Returns True if it was stored.
+
+        url  : string | The full url of the request
+        res  : object | The requests.Response object
+        body : object | The JSON digested body of the response
+        """
+        etag = res.headers.get(u"ETag")
+        last_modified = res.headers.get(u"Last-Modified")
+        if not etag and not last_modified:
+            return False
+
+        entry = {ENTRY_URL: url,
+                 ENTRY_ETAG: etag,
+                 ENTRY_LAST_MODIFIED: last_modified,
+                 ENTRY_LINKS: res.links,
+                 ENTRY_BODY: body,
+                 ENTRY_SIZE: len(res.content)}
+
+        entry_path = self.get_entry_path(url)
+        with self.lock:
+            # The cache folder is created first, the mode of makedirs does not apply to intermediate folders
+            for folder in (self.path, os.path.dirname(entry_path)):
+                if not os.path.isdir(folder):
+                    os.makedirs(folder, mode=FOLDER_MODE)
+
+            previous_size = os.path.getsize(entry_path) if os.path.exists(entry_path) else 0
+            helpers.write_json_file(entry_path, entry, mode=ENTRY_MODE)
+
+            if self.size is not None:
+                self.size += os.path.getsize(entry_path) - previous_size
+            self.evict()
+        return True
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the entry files take up at most EVICTION_TARGET times 'max_size'
+        bytes, if they take up more than 'max_size' bytes. Called with the lock held.
+        """
+        if self.max_size is None:
+            return
+
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.__list_entries())
+        if self.size <= self.max_size:
+            return
+
+        for _, size, entry_path in sorted(self.__list_entries()):
+            if self.size <= self.max_size * EVICTION_TARGET:
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            self.size -= size
+
+    def __list_entries(self):
+        """ [PRIVATE] Returns a list of (last used time, size, path) of all entry files """
+        entries = []
+        for folder, _, file_names in os.walk(self.path):
+            for file_name in file_names:
+                if not file_name.endswith(u".json"):
+                    continue
+                entry_path = os.path.join(folder, file_name)
+                try:
+                    stat = os.stat(entry_path)
+                except OSError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, entry_path))
+        return entries
+
+    def invalidate_course(self, course_id):
+        """
+        Removes all entries of urls of a course, so that they are requested unconditionally again
+
+        course_id : int | A course ID number
+        """
+        with self.lock:
+            course_path = self.get_course_path(course_id)
+            if os.path.isdir(course_path):
+                shutil.rmtree(course_path)
+                self.size = None
+
+    def count_not_modified(self, url, entry):
+        """ Count a conditional request of 'url' answered 304 Not Modified, served by the cache entry 'entry' """
+        self.__touch(self.get_entry_path(url))
+        with self.lock:
+            self.not_modified += 1
+            self.saved_bytes += entry.get(ENTRY_SIZE) or 0
+
+    def count_modified(self):
+        """ Count a conditional request answered with a new version of the response """
+        with self.lock:
+            self.modified += 1
+
+    def get_stats(self):
+        """
+        Returns a dictionary of the number of conditional requests answered 304 Not Modified, the number of response
+        bytes this saved, the number of conditional requests answered with a new version, and the number of fresh
+        entries served without a request
+        """
+        with self.lock:
+            return {u"not_modified": self.not_modified,
+                    u"saved_bytes": self.saved_bytes,
+                    u"modified": self.modified,
+                    u"fresh": self.fresh}
@@ -0,0 +1,154 @@
+"""
+retry.py, module
+
+Implements the retry policy of the InstructureApi object for idempotent (GET) requests.
+
+A busy Canvas cluster answers with transient errors that succeed when the request is repeated a little later: 429 Too
+Many Requests, 403 Forbidden with a "Rate Limit Exceeded" body (how Canvas reports throttling), 500, 502, 503 and 504
+server errors, as well as connections that are refused, reset or time out. The RetryPolicy object classifies the
+outcome of a request and repeats it after a delay that grows exponentially with every attempt, is capped at a maximum
+and is drawn at random below that bound ("full jitter") so that concurrent workers do not retry in lockstep. When the
+server gives a Retry-After header, the request is repeated no earlier than it asks for. Every retry is counted in a
+RetryStats object by its cause, to be reported at the end of the run.
+
+Non-idempotent requests (POST, PUT) are never retried, as the server may have applied them before failing.
+"""
+
+# Inbuilt modules
+import email.utils
+import random
+import threading
+import time
+
+# Third party modules
+import requests
+
+# The status codes of responses that are retried
+RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+
+# The body of a 403 Forbidden response when Canvas throttles requests
+RATE_LIMIT_EXCEEDED = u"Rate Limit Exceeded"
+
+# The exceptions of requests that are retried, connection errors also cover refused and reset connections
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError)
+
+
+def get_retry_after(res):
+    """
+    Returns the number of seconds to wait before repeating a request as given by the Retry-After header of the response
+    'res', as a number of seconds or as a HTTP date. Returns None if the header is missing or malformed.
+
+    res : object | A requests.Response object
+    """
+    retry_after = res.headers.get(u"Retry-After")
+    if not retry_after:
+        return None
+
+    retry_after = retry_after.strip()
+    if retry_after.isdigit():
+        return float(retry_after)
+
+    date = email.utils.parsedate_tz(retry_after)
+    if date is None:
+        return None
+    return max(email.utils.mktime_tz(date) - time.time(), 0.0)
+
+
+class RetryStats(object):
+    """ Thread safe counters of the requests retried by a RetryPolicy, by the status code or exception causing them """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.retries = {}
+        self.failures = 0
+
+    def count_retry(self, cause):
+        with self._lock:
+            self.retries[cause] = self.retries.get(cause, 0) + 1
+
+    def count_failure(self):
+        """ Count a request that still failed with a transient error after the last attempt """
+        with self._lock:
+            self.failures += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {u"retries": sum(self.retries.values()),
+                    u"retries_by_cause": dict(self.retries),
+                    u"failures": self.failures}
+
+
+class RetryPolicy(object):
+    def __init__(self, attempts, base_delay, max_delay, stats=None):
+        """
+        attempts   : int    | The maximum number of times a request is sent, 1 disables retries
+        base_delay : float  | The upper bound in seconds of the delay before the first retry, doubled on every retry
+        max_delay  : float  | The cap in seconds of the upper bound of the delay
+        stats      : object | A RetryStats object counting the retries, a new one if None
+        """
+        self.attempts = max(attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = stats if stats is not None else RetryStats()
+
+    @staticmethod
+    def is_retryable_response(res):
+        """ Returns True if the response 'res' is a transient error """
+        if res.status_code in RETRY_STATUS_CODES:
+            return True
+        return res.status_code == 403 and RATE_LIMIT_EXCEEDED in res.text
+
+    @staticmethod
+    def is_retryable_exception(exception):
+        """ Returns True if the exception raised by a request is a transient error """
+        return isinstance(exception, RETRY_EXCEPTIONS)
+
+    def get_delay(self, retry, res=None):
+        """
+        Returns the number of seconds to wait before the retry number 'retry' (counting from 0): a random delay below
+        the capped exponential bound, or the Retry-After delay of the response 'res' if it is longer
+
+        retry : int    | The number of retries made so far
+        res   : object | The requests.Response object of the failed attempt, or None
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+        retry_after = get_retry_after(res) if res is not None else None
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def send(self, request):
+        """
+        Sends a request by calling 'request' and returns its response, repeating it after a delay while it fails with
+        a transient error and attempts remain. The response of the last attempt is returned and the exception of the
+        last attempt is re-raised, so the caller handles persistent errors as before.
+
+        request : callable | A function without arguments that sends the request and returns a requests.Response object
+        """
+        for retry in range(self.attempts):
+            is_last_attempt = retry == self.attempts - 1
+            try:
+                res = request()
+            except Exception as e:
+                if not self.is_retryable_exception(e):
+                    raise
+                if is_last_attempt:
+                    self.stats.count_failure()
+                    raise
+                self.stats.count_retry(type(e).__name__)
+                time.sleep(self.get_delay(retry))
+                continue
+
+            if not self.is_retryable_response(res):
+                return res
+            if is_last_attempt:
+                self.stats.count_failure()
+                return res
+
+            # Release the connection of the failed attempt before waiting
+            delay = self.get_delay(retry, res)
+            res.close()
+            self.stats.count_retry(res.status_code)
+            time.sleep(delay)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Measures the memory used to hold a CSV sync history in memory with tracemalloc.
+
+A synthetic history file of N records (100.000 by default) laid out like a mirror of courses, modules and files is
+written to a temporary folder, and then loaded in two ways:
+
+dicts   : The rows of csv.DictReader held in a list and indexed by dictionaries keyed by normalized (path, type), by
+          normalized path and by (type, id), the representation used by the CSV history store before HistoryRecord
+records : A CsvHistoryStore, which holds HistoryRecord objects
+
+Usage: python benchmarks/history_memory.py [N]
+"""
+
+# Inbuilt modules
+import csv
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), u".."))
+
+# CanvasSync modules
+from CanvasSync import constants as CONSTANTS
+from CanvasSync.utilities.history_stores import CsvHistoryStore, FIELDNAMES, get_record_key
+
+
+def write_history_file(path, n_records, sync_path):
+    """ Writes a synthetic history file of 'n_records' records of courses, modules and files under 'sync_path' """
+    with open(path, u"w", newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+        writer.writeheader()
+
+        record_id = 0
+        course = 0
+        while record_id < n_records:
+            course_path = os.path.join(sync_path, u"Course %d" % course) + os.sep
+            writer.writerow({CONSTANTS.HISTORY_ID: record_id, CONSTANTS.HISTORY_PATH: course_path,
+                             CONSTANTS.HISTORY_MODIFIED_AT: u"", CONSTANTS.HISTORY_TYPE: CONSTANTS.ENTITY_COURSE})
+            record_id += 1
+
+            for module in range(20):
+                module_path = os.path.join(course_path, u"%d - Week %d" % (module + 1, module + 1)) + os.sep
+                writer.writerow({CONSTANTS.HISTORY_ID: record_id, CONSTANTS.HISTORY_PATH: module_path,
+                                 CONSTANTS.HISTORY_MODIFIED_AT: u"", CONSTANTS.HISTORY_TYPE: CONSTANTS.ENTITY_MODULE})
+                record_id += 1
+
+                for file in range(25):
+                    writer.writerow({CONSTANTS.HISTORY_ID: record_id,
+                                     CONSTANTS.HISTORY_PATH: os.path.join(module_path, u"lecture_%d.pdf" % file),
+                                     CONSTANTS.HISTORY_MODIFIED_AT: u"2020-09-%02dT12:00:00Z" % (file + 1),
+                                     CONSTANTS.HISTORY_TYPE: CONSTANTS.ENTITY_FILE})
+                    record_id += 1
+            course += 1
+
+    return record_id
+
+
+def load_dicts(path):
+    """ Loads the history as a list of dictionaries with indexes """
+    with open(path, newline='') as file:
+        history = list(csv.DictReader(file))
+
+    record_index, path_index, id_index = {}, {}, {}
+    for idx, row in enumerate(history):
+        key = get_record_key(row)
+        record_index[key] = idx
+        path_index.setdefault(key[0], idx)
+        id_index.setdefault((key[1], row.get(CONSTANTS.HISTORY_ID)), idx)
+
+    return history, record_index, path_index, id_index
+
+
+def load_records(path):
+    """ Loads the history in a CsvHistoryStore """
+    return CsvHistoryStore(path)
+
+
+def measure(load, path):
+    """ Returns the number of bytes allocated by 'load' that are still held after loading """
+    gc.collect()
+    tracemalloc.start()
+    loaded = load(path)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+    return size
+
+
+def main():
+    n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    temp_folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(temp_folder, u".history")
+        n_records = write_history_file(path, n_records, os.path.join(temp_folder, u"sync"))
+
+        print(u"Records: %d" % n_records)
+        for name, load in ((u"dicts", load_dicts), (u"records", load_records)):
+            size = measure(load, path)
+            print(u"%-8s %8.1f MiB  %6.1f MiB per 100k records  %5d bytes per record"
+                  % (name, size / 2.0 ** 20, size / 2.0 ** 20 * 100000 / n_records, size // n_records))
+    finally:
+        shutil.rmtree(temp_folder)
+
+
+if __name__ == u"__main__":
+    main()
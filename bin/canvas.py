@@ -17,6 +17,11 @@ of start the synchronization process.
 The module takes the arguments -h or --help that will show a help screen and quit.
 The module takes the arguments -i or --info that will show the currently logged settings from the settings file.
 The module takes the arguments -s or --setup that will force CanvasSync to prompt the user for settings.
+The module takes the arguments -V or --verify that will inspect every local file during the synchronization.
+The module takes the arguments -P or --prune followed by off, report, delete or archive that will set how files no
+longer found on Canvas are pruned after the synchronization.
+The module takes the arguments -c or --cached that will use fresh responses of the metadata cache without requests, and
+--invalidate followed by a course code or ID number that will discard the cached responses of the course first.
 
 """
 
@@ -29,6 +34,7 @@ import os
 import sys
 
 # If python 2.7, use raw_input(), otherwise use input()
+from six import text_type
 from six.moves import input
 
 # CanvasSync modules
@@ -55,7 +61,7 @@ except ImportError as e:
 from CanvasSync.utilities.ANSI import ANSI
 from CanvasSync.settings.settings import Settings
 from CanvasSync.utilities import helpers
-from CanvasSync.utilities.instructure_api import InstructureApi
+from CanvasSync.utilities.prune import PRUNE_MODES
 from CanvasSync import usage
 
 try:
@@ -76,7 +82,9 @@ def run_canvas_sync():
 
     # Get command line arguments (C-style)
     try:
-        opts, args = getopt.getopt(sys.argv[1:], u"hsiSp:", [u"help", u"setup", u"info", u"sync", u"password"])
+        opts, args = getopt.getopt(sys.argv[1:], u"hsiSVcP:p:", [u"help", u"setup", u"info", u"sync", u"verify",
+                                                                 u"cached", u"prune=", u"invalidate=",
+                                                                 u"password"])
     except getopt.GetoptError as err:
         # print help information and exit
         print(err)
@@ -86,6 +94,10 @@ def run_canvas_sync():
     setup = False
     show_info = False
     manual_sync = False
+    full_verify = False
+    prune_mode = None
+    metadata_cache = False
+    invalidate_courses = []
     password = ""
 
     if len(opts) != 0:
@@ -102,6 +114,20 @@ def run_canvas_sync():
             elif o in (u"-S", u"--sync"):
                 # Force sync
                 manual_sync = True
+            elif o in (u"-V", u"--verify"):
+                # Inspect all local files instead of trusting the sync history
+                full_verify = True
+            elif o in (u"-c", u"--cached"):
+                # Use fresh cached responses without requesting them
+                metadata_cache = True
+            elif o == u"--invalidate":
+                # Discard the cached responses of a course
+                invalidate_courses.append(a.strip())
+            elif o in (u"-P", u"--prune"):
+                # Set how stale files are pruned after the sync
+                prune_mode = a.strip().lower()
+                assert prune_mode in PRUNE_MODES, u"Unknown prune mode specified, please refer to " \
+                                                  u"the --help section."
             elif o in (u"-p", u"--password"):
                 # Specify decryption password
                 print ("Warning: entering password via command "
@@ -115,6 +141,11 @@ def run_canvas_sync():
     # Initialize Settings object. This object will parse the settings
     # file or generate a new one if one does not exist.
     settings = Settings()
+    settings.full_verify = full_verify
+    if prune_mode is not None:
+        settings.prune_mode = prune_mode
+    settings.metadata_cache = settings.metadata_cache or metadata_cache
+    settings.invalidate_courses = invalidate_courses
 
     # If the settings file does not exist or the user promoted to re-setup,
     # start prompting user for settings info.
@@ -169,8 +200,8 @@ def do_download_sync(settings, password=None):
         settings.print_auth_token_reset_error()
         sys.exit()
 
-    # Initialize the API object
-    api = InstructureApi(settings)
+    # Get the API object, created once the command line options are applied
+    api = settings.get_api()
 
     # Start Synchronizer with the current settings
     synchronizer = Synchronizer(settings=settings, api=api)
@@ -178,6 +209,7 @@ def do_download_sync(settings, password=None):
 
     # If here, sync was completed, show prompt
     print(ANSI.format(u"\n\n[*] Sync complete", formatting=u"bold"))
+    print_run_summary(api)
 
 
 def do_upload_sync(settings, password=None):
@@ -190,8 +222,8 @@ def do_upload_sync(settings, password=None):
         settings.print_auth_token_reset_error()
         sys.exit()
 
-    # Initialize the API object
-    api = InstructureApi(settings)
+    # Get the API object, created once the command line options are applied
+    api = settings.get_api()
 
     # Start LocalSynchronizer with the current settings
     local_synchronizer = LocalSynchronizer(settings=settings, api=api)
@@ -199,6 +231,57 @@ def do_upload_sync(settings, password=None):
 
     # If here, sync was completed, show prompt
     print(ANSI.format(u"\n\n[*] Sync complete", formatting=u"bold"))
+    print_run_summary(api)
+
+
+def print_run_summary(api):
+    """
+    Print statistics on the HTTP traffic of the synchronization, the conditional requests served from the response
+    cache, the requests repeated after a transient error, the requests paced by the rate limit and the concurrency
+    limits chosen over the run
+    """
+    connection_stats = api.get_connection_stats()
+    print(u"[*] HTTP requests: %i (%i over reused connections, %i new connections)"
+          % (connection_stats[u"requests"],
+             connection_stats[u"reused_connections"],
+             connection_stats[u"new_connections"]))
+
+    retry_stats = api.get_retry_stats()
+    if retry_stats[u"retries"] or retry_stats[u"failures"]:
+        causes = sorted(retry_stats[u"retries_by_cause"].items(), key=lambda cause: text_type(cause[0]))
+        print(u"[*] Retried requests: %i (%s), %i failed after the last attempt"
+              % (retry_stats[u"retries"],
+                 u", ".join(u"%s: %i" % cause for cause in causes),
+                 retry_stats[u"failures"]))
+
+    cache_stats = api.get_response_cache_stats()
+    if cache_stats is not None and (cache_stats[u"not_modified"] or cache_stats[u"modified"]):
+        print(u"[*] Conditional requests: %i not modified (%s served from the cache), %i changed"
+              % (cache_stats[u"not_modified"],
+                 helpers.format_size(cache_stats[u"saved_bytes"]),
+                 cache_stats[u"modified"]))
+    if cache_stats is not None and cache_stats[u"fresh"]:
+        print(u"[*] Metadata cache: %i responses served without a request" % cache_stats[u"fresh"])
+
+    rate_limit_state = api.get_rate_limit_state()
+    if rate_limit_state[u"lowest_remaining"] is not None:
+        print(u"[*] Rate limit: lowest remaining quota %.1f, %i requests paced for %.1f seconds, %i throttled"
+              % (rate_limit_state[u"lowest_remaining"],
+                 rate_limit_state[u"paced_requests"],
+                 rate_limit_state[u"paced_seconds"],
+                 rate_limit_state[u"throttled_responses"]))
+
+    for kind, summary in sorted(api.get_concurrency_summary().items()):
+        # Show at most 12 changes of the limit, evenly spread over the run
+        timeline = summary[u"timeline"]
+        timeline = [timeline[idx * (len(timeline) - 1) // 11] for idx in range(12)] if len(timeline) > 12 else timeline
+        print(u"[*] %s concurrency: %i to %i, average %.1f, reduced %i times (%s)"
+              % (u"API" if kind == u"api" else u"Payload",
+                 summary[u"lowest"],
+                 summary[u"highest"],
+                 summary[u"average"],
+                 summary[u"decreases"],
+                 u", ".join(u"%.0fs: %i" % change for change in timeline)))
 
 
 def entry():
@@ -39,7 +39,7 @@ setup(name='CanvasSync',
       author_email='mathias@perslev.com',
       url='https://github.com/perslev/CanvasSync',
       license="LICENSE.txt",
-      packages=find_packages(),
+      packages=find_packages(exclude=["tests", "tests.*"]),
       package_dir={'CanvasSync': 'CanvasSync'},
       entry_points={
           'console_scripts': [
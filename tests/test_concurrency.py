@@ -0,0 +1,132 @@
+"""
+Tests of the adaptive concurrency limit of concurrency.py
+"""
+
+# Inbuilt modules
+import threading
+import unittest
+
+# CanvasSync modules
+from CanvasSync.utilities.concurrency import ConcurrencyController, LATENCY_WARMUP
+
+
+class ConcurrencyControllerTest(unittest.TestCase):
+    def fill(self, controller):
+        """ Takes all slots of the current limit """
+        while controller.active < int(controller.limit):
+            controller.acquire()
+
+    def test_bounds(self):
+        controller = ConcurrencyController(initial=20, minimum=0, maximum=8)
+        self.assertEqual((controller.minimum, controller.maximum, controller.limit), (1, 8, 8.0))
+
+    def test_additive_increase(self):
+        controller = ConcurrencyController(initial=4, minimum=1, maximum=16)
+        self.fill(controller)
+
+        # Raised by 1 / limit per request, about one slot per round of 'limit' requests
+        controller.observe(0.1, congested=False)
+        self.assertAlmostEqual(controller.limit, 4.25)
+        for _ in range(4):
+            controller.observe(0.1, congested=False)
+        self.assertEqual(int(controller.limit), 5)
+        self.assertEqual(controller.timeline[-1][1], 5)
+
+    def test_no_increase_while_underused(self):
+        controller = ConcurrencyController(initial=4, minimum=1, maximum=16)
+        controller.acquire()
+
+        for _ in range(10):
+            controller.observe(0.1, congested=False)
+        self.assertEqual(controller.limit, 4.0)
+
+    def test_increase_is_capped(self):
+        controller = ConcurrencyController(initial=2, minimum=1, maximum=2)
+        self.fill(controller)
+
+        for _ in range(10):
+            controller.observe(0.1, congested=False)
+        self.assertEqual(controller.limit, 2.0)
+
+    def test_multiplicative_decrease(self):
+        controller = ConcurrencyController(initial=8, minimum=3, maximum=16, decrease_factor=0.5)
+        controller.acquire()
+
+        controller.observe(0.1, congested=True)
+        self.assertEqual((controller.limit, controller.decreases), (4.0, 1))
+
+        controller.observe(0.1, congested=True)
+        self.assertEqual((controller.limit, controller.decreases), (3.0, 2))
+
+    def test_requests_in_flight_do_not_decrease_again(self):
+        controller = ConcurrencyController(initial=8, minimum=1, maximum=16, decrease_factor=0.5)
+        self.fill(controller)
+
+        controller.observe(0.1, congested=True)
+        controller.release()
+        self.assertEqual((controller.limit, controller.recovering), (4.0, 7))
+
+        # The 7 other requests were sent before the limit was cut
+        for _ in range(7):
+            controller.observe(0.1, congested=True)
+            controller.release()
+        self.assertEqual((controller.limit, controller.decreases, controller.recovering), (4.0, 1, 0))
+
+        # A request sent after the cut decreases the limit again
+        controller.acquire()
+        controller.observe(0.1, congested=True)
+        self.assertEqual((controller.limit, controller.decreases), (2.0, 2))
+
+    def test_latency_spike_is_congestion(self):
+        controller = ConcurrencyController(initial=4, minimum=1, maximum=16, latency_factor=3.0)
+        controller.acquire()
+
+        for _ in range(LATENCY_WARMUP):
+            controller.observe(0.1, congested=False)
+        controller.observe(0.25, congested=False)
+        self.assertEqual(controller.decreases, 0)
+
+        controller.observe(0.5, congested=False)
+        self.assertEqual((controller.limit, controller.decreases), (2.0, 1))
+
+    def test_no_latency_spike_during_warmup(self):
+        controller = ConcurrencyController(initial=4, minimum=1, maximum=16)
+        controller.acquire()
+
+        controller.observe(0.1, congested=False)
+        controller.observe(10.0, congested=False)
+        self.assertEqual(controller.decreases, 0)
+
+    def test_acquire_blocks_at_the_limit(self):
+        controller = ConcurrencyController(initial=1, minimum=1, maximum=1)
+        controller.acquire()
+
+        acquired = threading.Event()
+
+        def acquire():
+            with controller.slot():
+                acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.2))
+
+        controller.release()
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        self.assertEqual(controller.active, 0)
+
+    def test_summary(self):
+        controller = ConcurrencyController(initial=4, minimum=1, maximum=16)
+        controller.acquire()
+        controller.observe(0.1, congested=True)
+
+        summary = controller.get_summary()
+        self.assertEqual((summary[u"limit"], summary[u"lowest"], summary[u"highest"], summary[u"decreases"]),
+                         (2, 2, 4, 1))
+        self.assertEqual([limit for _, limit in summary[u"timeline"]], [4, 2])
+        self.assertTrue(2.0 <= summary[u"average"] <= 4.0)
+
+
+if __name__ == u"__main__":
+    unittest.main()
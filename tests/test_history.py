@@ -0,0 +1,94 @@
+"""
+Tests of the sharded sync history of history.py
+"""
+
+# Inbuilt modules
+import os
+import shutil
+import tempfile
+import unittest
+
+# CanvasSync modules
+from CanvasSync import constants as CONSTANTS
+from CanvasSync.utilities import helpers
+from CanvasSync.utilities.history import History, MANIFEST_SUFFIX
+from CanvasSync.utilities.history_stores import CsvHistoryStore, open_store
+from tests.test_history_stores import make_record
+
+
+class FakeSettings(object):
+    def __init__(self, sync_path):
+        self.sync_path = sync_path
+        self.history_file_name = u".history"
+        self.history_backend = u"csv"
+        self.history_journal_fsync = False
+        self.history_compaction_ratio = 1.0
+        self.history_commit_records = 500
+        self.history_commit_seconds = 30
+
+
+class UnshardedHistoryMigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.sync_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.sync_path)
+        self.settings = FakeSettings(self.sync_path)
+        self.root_history_path = os.path.join(self.sync_path, self.settings.history_file_name)
+
+        os.mkdir(os.path.join(self.sync_path, u"Present"))
+        self.present = os.path.join(self.sync_path, u"Present", u"a.pdf")
+        self.missing = os.path.join(self.sync_path, u"Missing", u"b.pdf")
+        self.top_level = os.path.join(self.sync_path, u"c.pdf")
+
+        # A history written before the history was sharded
+        store = CsvHistoryStore(self.root_history_path)
+        for entity_id, path in enumerate((self.present, self.missing, self.top_level)):
+            store.put(make_record(path, entity_id))
+        store.close()
+
+    def open_history(self):
+        history = History(self.settings)
+        self.addCleanup(history.close)
+        return history
+
+    def get_recorded_paths(self, folder):
+        """ Returns the paths recorded in the history file of a folder """
+        store = open_store(os.path.join(folder, self.settings.history_file_name))
+        try:
+            return sorted(record[CONSTANTS.HISTORY_PATH] for record in store.rows())
+        finally:
+            store.close()
+
+    def test_records_of_present_course_folders_are_moved(self):
+        history = self.open_history()
+
+        self.assertEqual(history.get_history_for_path(self.present)[CONSTANTS.HISTORY_ID], u"0")
+        history.close()
+        self.assertEqual(self.get_recorded_paths(os.path.dirname(self.present)), [self.present])
+        self.assertEqual(self.get_recorded_paths(self.sync_path), sorted([self.missing, self.top_level]))
+
+    def test_records_of_missing_course_folders_are_found(self):
+        history = self.open_history()
+
+        self.assertEqual(history.get_history_for_path(self.missing)[CONSTANTS.HISTORY_ID], u"1")
+        self.assertEqual([record[CONSTANTS.HISTORY_PATH]
+                          for record in history.get_course_records(os.path.dirname(self.missing))], [self.missing])
+        self.assertFalse(os.path.exists(os.path.dirname(self.missing)))
+
+        history.close()
+        self.assertEqual(self.open_history().get_history_for_path(self.missing)[CONSTANTS.HISTORY_ID], u"1")
+
+    def test_records_are_moved_once_the_course_folder_is_created_again(self):
+        self.open_history().close()
+        os.mkdir(os.path.dirname(self.missing))
+
+        history = self.open_history()
+        self.assertEqual(history.get_history_for_path(self.missing)[CONSTANTS.HISTORY_ID], u"1")
+        history.close()
+        self.assertEqual(self.get_recorded_paths(os.path.dirname(self.missing)), [self.missing])
+        self.assertEqual(self.get_recorded_paths(self.sync_path), [self.top_level])
+        self.assertNotIn(u"Missing", helpers.read_json_file(self.root_history_path + MANIFEST_SUFFIX)[u"unsharded"])
+        self.assertEqual(self.open_history().get_history_for_path(self.missing)[CONSTANTS.HISTORY_ID], u"1")
+
+
+if __name__ == u"__main__":
+    unittest.main()
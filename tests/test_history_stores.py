@@ -0,0 +1,201 @@
+"""
+Tests of the history stores of history_stores.py
+"""
+
+# Inbuilt modules
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# CanvasSync modules
+from CanvasSync import constants as CONSTANTS
+from CanvasSync.utilities import history_stores
+from CanvasSync.utilities.history_stores import open_store, CsvHistoryStore, BACKEND_SQLITE, \
+    COMPACTING_JOURNAL_SUFFIX, JOURNAL_SUFFIX, MIGRATED_SUFFIX, SQLITE_SUFFIX
+
+
+def make_record(path, entity_id=1, entity_type=CONSTANTS.ENTITY_FILE, modified_at=u"2020-01-01T00:00:00Z"):
+    return {CONSTANTS.HISTORY_ID: entity_id,
+            CONSTANTS.HISTORY_PATH: path,
+            CONSTANTS.HISTORY_MODIFIED_AT: modified_at,
+            CONSTANTS.HISTORY_TYPE: entity_type}
+
+
+class HistoryStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.path = os.path.join(self.folder, u".history")
+
+    def get_paths(self, store):
+        return sorted(record[CONSTANTS.HISTORY_PATH] for record in store.rows())
+
+
+class CsvHistoryStoreTest(HistoryStoreTestCase):
+    def open(self, **kwargs):
+        store = CsvHistoryStore(self.path, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_records_are_replayed_from_the_journal(self):
+        store = self.open()
+        store.put(make_record(u"/sync/a", 1))
+        store.put(make_record(u"/sync/b", 2))
+        store.put(make_record(u"/sync/a", 3, modified_at=u"2021-01-01T00:00:00Z"))
+        store.delete(make_record(u"/sync/b"))
+        store.commit()
+
+        self.assertFalse(os.path.exists(self.path))
+        self.assertTrue(os.path.exists(self.path + JOURNAL_SUFFIX))
+
+        reopened = self.open()
+        self.assertEqual(self.get_paths(reopened), [u"/sync/a"])
+        self.assertEqual(reopened.get_for_path(u"/sync/a")[CONSTANTS.HISTORY_ID], u"3")
+        self.assertEqual(reopened.get_for_path(u"/sync/a")[CONSTANTS.HISTORY_MODIFIED_AT], u"2021-01-01T00:00:00Z")
+        self.assertIsNone(reopened.get_for_path(u"/sync/b"))
+
+    def test_incomplete_journal_row_is_dropped(self):
+        store = self.open()
+        store.put(make_record(u"/sync/a"))
+        store.put(make_record(u"/sync/b"))
+        store.close()
+
+        # Cut the last row as if the process was killed while appending it
+        with open(self.path + JOURNAL_SUFFIX, u"rb+") as journal:
+            journal.truncate(os.path.getsize(self.path + JOURNAL_SUFFIX) - 5)
+
+        reopened = self.open()
+        self.assertEqual(self.get_paths(reopened), [u"/sync/a"])
+
+        reopened.put(make_record(u"/sync/c"))
+        reopened.close()
+        self.assertEqual(self.get_paths(self.open()), [u"/sync/a", u"/sync/c"])
+
+    def test_records_sharing_a_path(self):
+        store = self.open()
+        store.put(make_record(u"/sync/a", 1, entity_type=CONSTANTS.ENTITY_MODULE))
+        store.put(make_record(u"/sync/a", 2, entity_type=CONSTANTS.ENTITY_PAGE))
+
+        self.assertEqual(store.get_for_path(u"/sync/a")[CONSTANTS.HISTORY_TYPE], CONSTANTS.ENTITY_MODULE)
+
+        store.delete(make_record(u"/sync/a", entity_type=CONSTANTS.ENTITY_MODULE))
+        self.assertEqual(store.get_for_path(u"/sync/a")[CONSTANTS.HISTORY_TYPE], CONSTANTS.ENTITY_PAGE)
+
+        store.delete(make_record(u"/sync/a", entity_type=CONSTANTS.ENTITY_PAGE))
+        self.assertIsNone(store.get_for_path(u"/sync/a"))
+        self.assertEqual(store.path_index, {})
+
+    def test_compaction(self):
+        store = self.open(compaction_ratio=0.5)
+        for idx in range(20):
+            store.put(make_record(u"/sync/%d" % idx, idx))
+        store.delete(make_record(u"/sync/0"))
+
+        with mock.patch.object(history_stores, u"MIN_COMPACTION_SIZE", 0):
+            store.commit()
+            store.wait_for_compaction()
+
+        self.assertTrue(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(self.path + JOURNAL_SUFFIX))
+        self.assertFalse(os.path.exists(self.path + COMPACTING_JOURNAL_SUFFIX))
+
+        # Changes after the compaction go to a new journal
+        store.put(make_record(u"/sync/20", 20))
+        store.close()
+        self.assertTrue(os.path.exists(self.path + JOURNAL_SUFFIX))
+
+        reopened = self.open()
+        self.assertEqual(len(reopened.rows()), 20)
+        self.assertIsNone(reopened.get_for_path(u"/sync/0"))
+        self.assertIsNotNone(reopened.get_for_path(u"/sync/20"))
+
+    def test_small_journal_is_not_compacted(self):
+        store = self.open(compaction_ratio=0.5)
+        store.put(make_record(u"/sync/a"))
+        store.commit()
+        store.wait_for_compaction()
+
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_interrupted_compaction_is_finished(self):
+        store = self.open()
+        store.put(make_record(u"/sync/a", 1))
+        store.close()
+
+        # A compaction moves the journal aside before it writes the snapshot, loading finishes the compaction
+        os.replace(self.path + JOURNAL_SUFFIX, self.path + COMPACTING_JOURNAL_SUFFIX)
+        store = self.open()
+        self.assertTrue(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(self.path + COMPACTING_JOURNAL_SUFFIX))
+
+        store.put(make_record(u"/sync/b", 2))
+        store.close()
+        self.assertEqual(self.get_paths(self.open()), [u"/sync/a", u"/sync/b"])
+
+    def test_clear(self):
+        store = self.open()
+        store.put(make_record(u"/sync/a"))
+        store.clear()
+        store.close()
+
+        self.assertEqual(self.open().rows(), [])
+
+
+class OpenStoreTest(HistoryStoreTestCase):
+    def write_csv_history(self, *records):
+        store = CsvHistoryStore(self.path)
+        for record in records:
+            store.put(record)
+        store.close()
+
+    def open_sqlite(self):
+        store = open_store(self.path, BACKEND_SQLITE)
+        self.addCleanup(store.close)
+        return store
+
+    def test_csv_history_is_migrated(self):
+        self.write_csv_history(make_record(u"/sync/a", 1), make_record(u"/sync/b", 2))
+
+        store = self.open_sqlite()
+        self.assertTrue(os.path.exists(self.path + SQLITE_SUFFIX))
+        self.assertEqual(self.get_paths(store), [u"/sync/a", u"/sync/b"])
+        self.assertEqual(store.get_for_path(u"/sync/b")[CONSTANTS.HISTORY_ID], u"2")
+
+        self.assertFalse(history_stores.csv_history_exists(self.path))
+        self.assertTrue(os.path.exists(self.path + JOURNAL_SUFFIX + MIGRATED_SUFFIX))
+
+    def test_csv_history_is_migrated_once(self):
+        self.write_csv_history(make_record(u"/sync/a"))
+
+        store = open_store(self.path, BACKEND_SQLITE)
+        store.delete(make_record(u"/sync/a"))
+        store.close()
+
+        self.assertEqual(self.open_sqlite().rows(), [])
+
+    def test_non_empty_database_is_kept(self):
+        store = open_store(self.path, BACKEND_SQLITE)
+        store.put(make_record(u"/sync/b"))
+        store.close()
+        self.write_csv_history(make_record(u"/sync/a"))
+
+        self.assertEqual(self.get_paths(self.open_sqlite()), [u"/sync/b"])
+        self.assertTrue(history_stores.csv_history_exists(self.path))
+
+    def test_csv_backend(self):
+        self.write_csv_history(make_record(u"/sync/a"))
+
+        store = open_store(self.path)
+        self.addCleanup(store.close)
+        self.assertIsInstance(store, CsvHistoryStore)
+        self.assertFalse(os.path.exists(self.path + SQLITE_SUFFIX))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            open_store(self.path, u"xml")
+
+
+if __name__ == u"__main__":
+    unittest.main()
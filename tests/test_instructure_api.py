@@ -0,0 +1,88 @@
+"""
+Tests of the module level helpers and the connection pool of instructure_api.py
+"""
+
+# Inbuilt modules
+import unittest
+
+# Third party modules
+from six.moves.urllib.parse import parse_qs, urlsplit
+
+# CanvasSync modules
+from CanvasSync.settings.settings import Settings
+from CanvasSync.utilities.instructure_api import InstructureApi, get_numbered_page_urls
+
+
+def get_query(url):
+    return parse_qs(urlsplit(url).query, keep_blank_values=True)
+
+
+class GetNumberedPageUrlsTest(unittest.TestCase):
+    def test_all_pages_from_next_to_last(self):
+        page_urls = get_numbered_page_urls(u"https://canvas.test/api/v1/courses?page=2&per_page=100",
+                                           u"https://canvas.test/api/v1/courses?page=4&per_page=100")
+
+        self.assertEqual([get_query(url)[u"page"] for url in page_urls], [[u"2"], [u"3"], [u"4"]])
+        for url in page_urls:
+            self.assertEqual(urlsplit(url).path, u"/api/v1/courses")
+            self.assertEqual(get_query(url)[u"per_page"], [u"100"])
+
+    def test_keeps_repeated_and_blank_parameters(self):
+        page_urls = get_numbered_page_urls(u"https://canvas.test/api/v1/modules?include[]=items&include[]=x&q=&page=1",
+                                           u"https://canvas.test/api/v1/modules?page=2")
+
+        self.assertEqual(len(page_urls), 2)
+        self.assertEqual(get_query(page_urls[1]),
+                         {u"include[]": [u"items", u"x"], u"q": [u""], u"page": [u"2"]})
+
+    def test_single_page(self):
+        page_urls = get_numbered_page_urls(u"https://canvas.test/api/v1/courses?page=3",
+                                           u"https://canvas.test/api/v1/courses?page=3")
+
+        self.assertEqual(len(page_urls), 1)
+        self.assertEqual(get_query(page_urls[0])[u"page"], [u"3"])
+
+    def test_last_before_next(self):
+        self.assertEqual(get_numbered_page_urls(u"https://canvas.test/api/v1/courses?page=3",
+                                                u"https://canvas.test/api/v1/courses?page=2"), [])
+
+    def test_bookmark_pages(self):
+        self.assertEqual(get_numbered_page_urls(u"https://canvas.test/api/v1/courses?page=bookmark:WzEwXQ",
+                                                u"https://canvas.test/api/v1/courses?page=bookmark:WzIwXQ"), [])
+
+    def test_missing_urls(self):
+        self.assertEqual(get_numbered_page_urls(None, u"https://canvas.test/api/v1/courses?page=2"), [])
+        self.assertEqual(get_numbered_page_urls(u"https://canvas.test/api/v1/courses?page=2", None), [])
+        self.assertEqual(get_numbered_page_urls(u"https://canvas.test/api/v1/courses?page=2",
+                                                u"https://canvas.test/api/v1/courses"), [])
+
+
+class ConnectionPoolSizeTest(unittest.TestCase):
+    def setUp(self):
+        self.settings = Settings()
+        self.settings.response_cache = False
+        self.settings.metadata_cache = False
+
+    def get_pool_maxsize(self):
+        api = InstructureApi(self.settings)
+        self.addCleanup(api.page_executor.shutdown)
+        return api.adapter.poolmanager.connection_pool_kw[u"maxsize"]
+
+    def test_pool_holds_the_concurrency_maximums(self):
+        self.settings.connection_pool_size = 10
+        self.settings.api_concurrency_max = 16
+        self.settings.payload_concurrency_max = 8
+        self.assertEqual(self.get_pool_maxsize(), 24)
+
+        self.settings.adaptive_concurrency = False
+        self.settings.page_prefetch_workers = 4
+        self.settings.download_workers = 4
+        self.assertEqual(self.get_pool_maxsize(), 10)
+
+    def test_larger_pool_size_is_kept(self):
+        self.settings.connection_pool_size = 32
+        self.assertEqual(self.get_pool_maxsize(), 32)
+
+
+if __name__ == u"__main__":
+    unittest.main()
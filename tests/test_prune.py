@@ -0,0 +1,288 @@
+"""
+Tests of the pruning of stale entries of prune.py
+"""
+
+# Inbuilt modules
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+# Third party modules
+import requests
+
+# CanvasSync modules
+from CanvasSync import constants as CONSTANTS
+from CanvasSync.entities.page import Page
+from CanvasSync.utilities.prune import Pruner, PRUNE_ARCHIVE, PRUNE_DELETE, PRUNE_OFF, PRUNE_REPORT
+
+
+class FakeSettings(object):
+    def __init__(self, sync_path):
+        self.sync_path = sync_path
+        self.modules_settings = {u"Files": True, u"HTML pages": True, u"External URLs": True}
+        self.sync_assignments = True
+        self.download_linked = True
+
+
+class FakeHistory(object):
+    """ Holds the history records of a single course """
+
+    def __init__(self):
+        self.records = []
+
+    def get_course_records(self, course_path):
+        return list(self.records)
+
+    def delete_history_record(self, record):
+        self.records.remove(record)
+
+    def get_history_for_path(self, path):
+        return None
+
+    def write_history_record_to_file(self, record):
+        pass
+
+
+class FakeApi(object):
+    """ Answers the lookup of a file linked in a page with an error """
+
+    def __init__(self, error):
+        self.error = error
+
+    def download_item_information(self, url):
+        raise self.error
+
+
+class FakeSynchronizer(object):
+    def __init__(self, history):
+        self.history = history
+        self.seen_paths = {}
+
+    def mark_seen(self, path, course_id, subtree=False):
+        path = os.path.normpath(path)
+        self.seen_paths[path] = self.seen_paths.get(path, False) or subtree
+
+    def add_entity(self, entity, course_id):
+        pass
+
+
+class FakeCourse(object):
+    """ The parent of the Page objects """
+
+    indent = 0
+
+    def __init__(self, path, api, settings, synchronizer):
+        self.path = path
+        self.api = api
+        self.settings = settings
+        self.synchronizer = synchronizer
+
+    def get_identifier_string(self):
+        return u"course"
+
+    def get_id(self):
+        return 1
+
+    def get_path(self):
+        return self.path
+
+    def get_api(self):
+        return self.api
+
+    def get_settings(self):
+        return self.settings
+
+    def get_synchronizer(self):
+        return self.synchronizer
+
+
+class PrunerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sync_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.sync_path)
+        self.course_path = os.path.join(self.sync_path, u"Course")
+
+        self.settings = FakeSettings(self.sync_path)
+        self.history = FakeHistory()
+        self.seen_paths = {}
+
+    def add(self, relative_path, entity_type, seen=False, subtree_seen=False, content=b"content"):
+        """ Creates a local file or folder in the course folder with a history record, returns its path """
+        path = os.path.join(self.course_path, relative_path)
+        if entity_type in (CONSTANTS.ENTITY_FILE, CONSTANTS.ENTITY_LINKED_FILE):
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, u"wb") as out_file:
+                out_file.write(content)
+        elif not os.path.isdir(path):
+            os.makedirs(path)
+
+        self.history.records.append({CONSTANTS.HISTORY_ID: u"1",
+                                     CONSTANTS.HISTORY_PATH: path,
+                                     CONSTANTS.HISTORY_TYPE: entity_type})
+        if seen or subtree_seen:
+            self.seen_paths[os.path.normpath(path)] = subtree_seen
+        return path
+
+    def prune(self, mode):
+        pruner = Pruner(self.settings, self.history, mode)
+        with contextlib.redirect_stdout(io.StringIO()):
+            pruner.prune_course(self.course_path, self.seen_paths)
+            pruner.print_summary()
+        return pruner
+
+    def get_recorded_paths(self):
+        return sorted(os.path.relpath(record[CONSTANTS.HISTORY_PATH], self.course_path)
+                      for record in self.history.records)
+
+
+class PrunerTest(PrunerTestCase):
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            Pruner(self.settings, self.history, u"shred")
+
+    def test_delete(self):
+        module = self.add(u"1 - Module", CONSTANTS.ENTITY_MODULE, seen=True)
+        kept = self.add(u"1 - Module/kept.pdf", CONSTANTS.ENTITY_FILE, seen=True)
+        stale = self.add(u"1 - Module/stale.pdf", CONSTANTS.ENTITY_FILE, content=b"12345")
+
+        pruner = self.prune(PRUNE_DELETE)
+
+        self.assertTrue(os.path.exists(kept))
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.isdir(module))
+        self.assertEqual(self.get_recorded_paths(), [u"1 - Module", os.path.join(u"1 - Module", u"kept.pdf")])
+        self.assertEqual((pruner.stale_entries, pruner.stale_bytes), (1, 5))
+
+    def test_report(self):
+        stale = self.add(u"1 - Module/stale.pdf", CONSTANTS.ENTITY_FILE, content=b"12345")
+
+        pruner = self.prune(PRUNE_REPORT)
+
+        self.assertTrue(os.path.exists(stale))
+        self.assertEqual(len(self.history.records), 1)
+        self.assertEqual((pruner.stale_entries, pruner.stale_bytes), (1, 5))
+
+    def test_off(self):
+        stale = self.add(u"1 - Module/stale.pdf", CONSTANTS.ENTITY_FILE)
+
+        pruner = self.prune(PRUNE_OFF)
+
+        self.assertTrue(os.path.exists(stale))
+        self.assertEqual((len(self.history.records), pruner.stale_entries), (1, 0))
+
+    def test_archive(self):
+        stale = self.add(u"1 - Module/stale.pdf", CONSTANTS.ENTITY_FILE)
+        stale_page = self.add(u"1 - Module/Page", CONSTANTS.ENTITY_PAGE)
+        self.add(u"1 - Module/Page/Page.html", CONSTANTS.ENTITY_FILE)
+
+        self.prune(PRUNE_ARCHIVE)
+
+        archive_path = os.path.join(self.course_path, CONSTANTS.FOLDER_ARCHIVE, u"1 - Module")
+        self.assertFalse(os.path.exists(stale))
+        self.assertFalse(os.path.exists(stale_page))
+        self.assertTrue(os.path.isfile(os.path.join(archive_path, u"stale.pdf")))
+        self.assertTrue(os.path.isfile(os.path.join(archive_path, u"Page", u"Page.html")))
+        self.assertEqual(self.history.records, [])
+
+    def test_content_of_pages_not_downloaded_again_is_seen(self):
+        self.add(u"1 - Module/Page", CONSTANTS.ENTITY_PAGE, subtree_seen=True)
+        linked = self.add(u"1 - Module/Page/linked.pdf", CONSTANTS.ENTITY_FILE)
+
+        pruner = self.prune(PRUNE_DELETE)
+
+        self.assertTrue(os.path.exists(linked))
+        self.assertEqual(pruner.stale_entries, 0)
+
+    def test_folders_are_only_removed_when_empty(self):
+        empty = self.add(u"1 - Old module", CONSTANTS.ENTITY_MODULE)
+        self.add(u"1 - Old module/stale.pdf", CONSTANTS.ENTITY_FILE)
+        not_empty = self.add(u"2 - Other module", CONSTANTS.ENTITY_MODULE)
+        with open(os.path.join(not_empty, u"notes.txt"), u"w") as out_file:
+            out_file.write(u"Not synchronized, written by the user")
+
+        self.prune(PRUNE_DELETE)
+
+        self.assertFalse(os.path.exists(empty))
+        self.assertTrue(os.path.isdir(not_empty))
+        self.assertEqual(self.get_recorded_paths(), [u"2 - Other module"])
+
+    def test_incomplete_course_is_not_pruned(self):
+        stale = self.add(u"1 - Module/stale.pdf", CONSTANTS.ENTITY_FILE)
+
+        self.settings.modules_settings[u"HTML pages"] = False
+        self.assertEqual(self.prune(PRUNE_DELETE).stale_entries, 0)
+
+        self.settings.modules_settings[u"HTML pages"] = True
+        self.settings.sync_assignments = False
+        self.assertEqual(self.prune(PRUNE_DELETE).stale_entries, 0)
+
+        self.assertTrue(os.path.exists(stale))
+        self.assertEqual(len(self.history.records), 1)
+
+    def test_linked_files_are_kept_while_not_downloaded(self):
+        linked = self.add(u"Assignments/Homework/notes.pdf", CONSTANTS.ENTITY_LINKED_FILE)
+        stale = self.add(u"Assignments/Homework/stale.pdf", CONSTANTS.ENTITY_FILE)
+        self.settings.download_linked = False
+
+        self.prune(PRUNE_DELETE)
+
+        self.assertTrue(os.path.exists(linked))
+        self.assertFalse(os.path.exists(stale))
+
+        self.settings.download_linked = True
+        self.prune(PRUNE_DELETE)
+
+        self.assertFalse(os.path.exists(linked))
+        self.assertEqual(self.history.records, [])
+
+
+class PageLinkedFilesPruneTest(PrunerTestCase):
+    """ Tests of the pruning of the files linked in a Page object that is downloaded again """
+
+    def sync_page(self, error):
+        """ Downloads a page linking a Canvas file whose lookup raises the error and marks the seen paths """
+        self.settings.download_linked = False
+        synchronizer = FakeSynchronizer(self.history)
+        course = FakeCourse(self.course_path, FakeApi(error), self.settings, synchronizer)
+        page = Page({CONSTANTS.PAGE_ID: 1,
+                     CONSTANTS.TITLE: u"Page",
+                     CONSTANTS.UPDATED_AT: u"2017-02-01T12:00:00Z",
+                     CONSTANTS.PAGE_BODY: u'<a data-api-endpoint="https://canvas/api/v1/files/1">notes.pdf</a>'},
+                    parent=course)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            page._sync()
+        self.seen_paths = synchronizer.seen_paths
+        return page
+
+    def get_http_error(self, status_code):
+        response = requests.Response()
+        response.status_code = status_code
+        return requests.exceptions.HTTPError(response=response)
+
+    def test_files_of_failed_lookups_are_kept(self):
+        linked = self.add(u"Page/notes.pdf", CONSTANTS.ENTITY_FILE)
+
+        for error in (requests.exceptions.ConnectionError(), requests.exceptions.Timeout(), self.get_http_error(503)):
+            # Change the page folder so that the page is downloaded again
+            os.utime(os.path.dirname(linked), None)
+            page = self.sync_page(error)
+            self.assertTrue(page.linked_files_incomplete)
+            self.assertEqual(self.prune(PRUNE_DELETE).stale_entries, 0)
+            self.assertTrue(os.path.exists(linked))
+
+    def test_files_gone_from_the_server_are_pruned(self):
+        linked = self.add(u"Page/notes.pdf", CONSTANTS.ENTITY_FILE)
+
+        page = self.sync_page(self.get_http_error(404))
+        self.assertFalse(page.linked_files_incomplete)
+        self.assertEqual(self.prune(PRUNE_DELETE).stale_entries, 1)
+        self.assertFalse(os.path.exists(linked))
+
+
+if __name__ == u"__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+"""
+Tests of the response cache of response_cache.py
+"""
+
+# Inbuilt modules
+import os
+import shutil
+import stat
+import tempfile
+import time
+import unittest
+
+# CanvasSync modules
+from CanvasSync.utilities import response_cache
+from CanvasSync.utilities.response_cache import ResponseCache, ENDPOINT_FILES, ENDPOINT_OTHER, ENTRY_BODY, \
+    ENTRY_LINKS, get_endpoint
+
+DOMAIN = u"https://canvas.test"
+
+
+class FakeResponse(object):
+    def __init__(self, body=b"[]", etag=u'"v1"', last_modified=None, links=None):
+        self.headers = {}
+        if etag:
+            self.headers[u"ETag"] = etag
+        if last_modified:
+            self.headers[u"Last-Modified"] = last_modified
+        self.links = links or {}
+        self.content = body
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.path = os.path.join(self.folder, u"cache")
+
+    def set_times(self, cache, url, validated_ago, used_ago=0):
+        """ Sets when the entry of 'url' was last validated and used, in seconds ago """
+        now = time.time()
+        os.utime(cache.get_entry_path(url), (now - used_ago, now - validated_ago))
+
+
+class GetEndpointTest(unittest.TestCase):
+    def test_endpoints(self):
+        for path, endpoint in ((u"/api/v1/courses", u"courses"),
+                               (u"/api/v1/courses/1/modules", u"modules"),
+                               (u"/api/v1/courses/1/modules/2/items", u"module_items"),
+                               (u"/api/v1/courses/1/assignments", u"assignments"),
+                               (u"/api/v1/courses/1/folders", u"folders"),
+                               (u"/api/v1/folders/3/folders", u"folders"),
+                               (u"/api/v1/folders/3/files", u"files"),
+                               (u"/api/v1/courses/1/files/4", u"files"),
+                               (u"/api/v1/courses/1/pages/intro", u"pages"),
+                               (u"/api/v1/users/self", u"other")):
+            self.assertEqual(get_endpoint(DOMAIN + path + u"?per_page=100"), endpoint, path)
+
+
+class ResponseCacheTest(ResponseCacheTestCase):
+    def test_put_and_get(self):
+        cache = ResponseCache(self.path)
+        url = DOMAIN + u"/api/v1/courses/1/modules"
+        links = {u"next": {u"url": url + u"?page=2", u"rel": u"next"}}
+
+        self.assertTrue(cache.put(url, FakeResponse(links=links), [{u"id": 1}]))
+
+        entry = cache.get(url)
+        self.assertEqual((entry[ENTRY_BODY], entry[ENTRY_LINKS]), ([{u"id": 1}], links))
+        self.assertEqual(cache.get_conditional_headers(entry), {u"If-None-Match": u'"v1"'})
+        self.assertIsNone(cache.get(url + u"?page=2"))
+
+    def test_responses_without_validators_are_not_stored(self):
+        cache = ResponseCache(self.path)
+        url = DOMAIN + u"/api/v1/courses"
+
+        self.assertFalse(cache.put(url, FakeResponse(etag=None), []))
+        self.assertIsNone(cache.get(url))
+
+        self.assertTrue(cache.put(url, FakeResponse(etag=None, last_modified=u"Tue, 01 Jan 2030 00:00:00 GMT"), []))
+        self.assertEqual(cache.get_conditional_headers(cache.get(url)),
+                         {u"If-Modified-Since": u"Tue, 01 Jan 2030 00:00:00 GMT"})
+
+    def test_entries_are_private(self):
+        cache = ResponseCache(self.path)
+        url = DOMAIN + u"/api/v1/courses/1/files"
+        cache.put(url, FakeResponse(), [])
+
+        entry_path = cache.get_entry_path(url)
+        self.assertEqual(stat.S_IMODE(os.stat(entry_path).st_mode), response_cache.ENTRY_MODE)
+        for folder in (self.path, os.path.dirname(entry_path)):
+            self.assertEqual(stat.S_IMODE(os.stat(folder).st_mode), response_cache.FOLDER_MODE)
+
+    def test_invalidate_course(self):
+        cache = ResponseCache(self.path)
+        course_url = DOMAIN + u"/api/v1/courses/1/modules"
+        other_course_url = DOMAIN + u"/api/v1/courses/2/modules"
+        courses_url = DOMAIN + u"/api/v1/courses"
+        for url in (course_url, other_course_url, courses_url):
+            cache.put(url, FakeResponse(), [])
+
+        cache.invalidate_course(1)
+
+        self.assertIsNone(cache.get(course_url))
+        self.assertIsNotNone(cache.get(other_course_url))
+        self.assertIsNotNone(cache.get(courses_url))
+
+
+class ResponseCacheTtlTest(ResponseCacheTestCase):
+    def setUp(self):
+        ResponseCacheTestCase.setUp(self)
+        self.cache = ResponseCache(self.path, ttls={ENDPOINT_FILES: 600, ENDPOINT_OTHER: 0})
+        self.url = DOMAIN + u"/api/v1/courses/1/files"
+        self.cache.put(self.url, FakeResponse(), [{u"id": 1}])
+
+    def test_fresh_entry_is_served(self):
+        self.set_times(self.cache, self.url, validated_ago=599)
+
+        self.assertEqual(self.cache.get_fresh(self.url)[ENTRY_BODY], [{u"id": 1}])
+        self.assertEqual(self.cache.get_stats()[u"fresh"], 1)
+
+    def test_expired_entry_is_not_served(self):
+        self.set_times(self.cache, self.url, validated_ago=601)
+
+        self.assertIsNone(self.cache.get_fresh(self.url))
+        self.assertIsNotNone(self.cache.get(self.url))
+
+    def test_serving_keeps_the_validation_time(self):
+        self.set_times(self.cache, self.url, validated_ago=300, used_ago=300)
+        validated_at = os.path.getmtime(self.cache.get_entry_path(self.url))
+
+        self.cache.get_fresh(self.url)
+
+        self.assertEqual(os.path.getmtime(self.cache.get_entry_path(self.url)), validated_at)
+        self.assertGreater(os.path.getatime(self.cache.get_entry_path(self.url)), validated_at)
+
+    def test_not_modified_renews_the_entry(self):
+        self.set_times(self.cache, self.url, validated_ago=601)
+
+        self.cache.count_not_modified(self.url, self.cache.get(self.url))
+
+        self.assertIsNotNone(self.cache.get_fresh(self.url))
+
+    def test_disabled_endpoints(self):
+        url = DOMAIN + u"/api/v1/users/self"
+        self.cache.put(url, FakeResponse(), {})
+        self.assertIsNone(self.cache.get_fresh(url))
+
+        self.assertIsNone(ResponseCache(self.path).get_fresh(self.url))
+
+
+class ResponseCacheEvictionTest(ResponseCacheTestCase):
+    def put_entries(self, cache, count):
+        """ Stores 'count' entries used one after the other, returns their urls from the least recently used """
+        urls = [DOMAIN + u"/api/v1/courses/%d/modules" % idx for idx in range(count)]
+        for idx, url in enumerate(urls):
+            cache.put(url, FakeResponse(), [u"x" * 100])
+            self.set_times(cache, url, validated_ago=0, used_ago=count - idx)
+        return urls
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResponseCache(self.path)
+        urls = self.put_entries(cache, 10)
+
+        # Use the oldest entry again, and exceed the size limit with one more entry
+        cache.max_size = int(os.path.getsize(cache.get_entry_path(urls[0])) * 10.5)
+        os.utime(cache.get_entry_path(urls[0]), None)
+        cache.put(DOMAIN + u"/api/v1/courses/10/modules", FakeResponse(), [u"x" * 100])
+
+        cached = [url for url in urls if cache.get(url) is not None]
+        self.assertLessEqual(cache.size, cache.max_size * response_cache.EVICTION_TARGET)
+        self.assertLess(len(cached), len(urls))
+        self.assertIn(urls[0], cached)
+        self.assertEqual(cached, [urls[0]] + urls[-len(cached) + 1:])
+        self.assertIsNotNone(cache.get(DOMAIN + u"/api/v1/courses/10/modules"))
+
+    def test_unlimited(self):
+        cache = ResponseCache(self.path)
+        urls = self.put_entries(cache, 10)
+
+        self.assertTrue(all(cache.get(url) is not None for url in urls))
+        self.assertIsNone(cache.size)
+
+
+if __name__ == u"__main__":
+    unittest.main()
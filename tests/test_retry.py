@@ -0,0 +1,148 @@
+"""
+Tests of the retry policy of retry.py
+"""
+
+# Inbuilt modules
+import email.utils
+import time
+import unittest
+from unittest import mock
+
+# Third party modules
+import requests
+
+# CanvasSync modules
+from CanvasSync.utilities import retry
+from CanvasSync.utilities.retry import RetryPolicy, get_retry_after
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, headers=None, text=u""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class GetRetryAfterTest(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(get_retry_after(FakeResponse(429, {u"Retry-After": u" 7 "})), 7.0)
+
+    def test_http_date(self):
+        date = email.utils.formatdate(time.time() + 30, usegmt=True)
+        self.assertAlmostEqual(get_retry_after(FakeResponse(503, {u"Retry-After": date})), 30.0, delta=2.0)
+
+    def test_http_date_in_the_past(self):
+        date = email.utils.formatdate(time.time() - 30, usegmt=True)
+        self.assertEqual(get_retry_after(FakeResponse(503, {u"Retry-After": date})), 0.0)
+
+    def test_missing_or_malformed(self):
+        self.assertIsNone(get_retry_after(FakeResponse(503)))
+        self.assertIsNone(get_retry_after(FakeResponse(503, {u"Retry-After": u"soon"})))
+
+
+class RetryPolicyDelayTest(unittest.TestCase):
+    def test_jitter_bounds(self):
+        policy = RetryPolicy(attempts=10, base_delay=0.5, max_delay=3.0)
+        for retry_number, bound in ((0, 0.5), (1, 1.0), (2, 2.0), (3, 3.0), (8, 3.0)):
+            delays = [policy.get_delay(retry_number) for _ in range(200)]
+            self.assertGreaterEqual(min(delays), 0.0)
+            self.assertLessEqual(max(delays), bound)
+
+    def test_full_jitter_range(self):
+        policy = RetryPolicy(attempts=10, base_delay=1.0, max_delay=60.0)
+        with mock.patch.object(retry.random, u"uniform", return_value=0.0) as uniform:
+            policy.get_delay(4)
+        uniform.assert_called_once_with(0, 16.0)
+
+    def test_retry_after_is_a_lower_bound(self):
+        policy = RetryPolicy(attempts=3, base_delay=1.0, max_delay=2.0)
+        self.assertEqual(policy.get_delay(0, FakeResponse(429, {u"Retry-After": u"10"})), 10.0)
+
+        with mock.patch.object(retry.random, u"uniform", return_value=1.5):
+            self.assertEqual(policy.get_delay(1, FakeResponse(429, {u"Retry-After": u"1"})), 1.5)
+
+
+class RetryPolicySendTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(retry.time, u"sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.policy = RetryPolicy(attempts=3, base_delay=1.0, max_delay=60.0)
+
+    def send(self, outcomes):
+        """ Sends a request returning or raising the items of 'outcomes' in turn, returns the result and call count """
+        outcomes = list(outcomes)
+        calls = []
+
+        def request():
+            calls.append(None)
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        return self.policy.send(request), len(calls)
+
+    def test_success_is_not_retried(self):
+        res, calls = self.send([FakeResponse(200)])
+        self.assertEqual((res.status_code, calls), (200, 1))
+        self.sleep.assert_not_called()
+
+    def test_transient_responses_are_retried(self):
+        failed = FakeResponse(503)
+        res, calls = self.send([failed, FakeResponse(403, text=retry.RATE_LIMIT_EXCEEDED), FakeResponse(200)])
+
+        self.assertEqual((res.status_code, calls), (200, 3))
+        self.assertTrue(failed.closed)
+        self.assertEqual(self.sleep.call_count, 2)
+        self.assertEqual(self.policy.stats.as_dict(), {u"retries": 2, u"retries_by_cause": {503: 1, 403: 1},
+                                                       u"failures": 0})
+
+    def test_other_errors_are_not_retried(self):
+        res, calls = self.send([FakeResponse(404)])
+        self.assertEqual((res.status_code, calls), (404, 1))
+
+        res, calls = self.send([FakeResponse(403, text=u"Unauthorized")])
+        self.assertEqual((res.status_code, calls), (403, 1))
+
+    def test_last_response_is_returned(self):
+        res, calls = self.send([FakeResponse(502), FakeResponse(502), FakeResponse(504)])
+
+        self.assertEqual((res.status_code, calls), (504, 3))
+        self.assertFalse(res.closed)
+        self.assertEqual(self.policy.stats.as_dict()[u"failures"], 1)
+
+    def test_retry_after_is_respected(self):
+        self.send([FakeResponse(429, {u"Retry-After": u"42"}), FakeResponse(200)])
+        self.sleep.assert_called_once_with(42.0)
+
+    def test_transient_exceptions_are_retried(self):
+        res, calls = self.send([requests.exceptions.ConnectionError(), requests.exceptions.ReadTimeout(),
+                                FakeResponse(200)])
+
+        self.assertEqual((res.status_code, calls), (200, 3))
+        self.assertEqual(self.policy.stats.as_dict()[u"retries_by_cause"],
+                         {u"ConnectionError": 1, u"ReadTimeout": 1})
+
+    def test_last_exception_is_raised(self):
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            self.send([requests.exceptions.ConnectionError()] * 2 + [requests.exceptions.ChunkedEncodingError()])
+        self.assertEqual(self.policy.stats.as_dict()[u"failures"], 1)
+
+    def test_other_exceptions_are_raised(self):
+        with self.assertRaises(ValueError):
+            self.send([ValueError()])
+        self.sleep.assert_not_called()
+
+    def test_single_attempt(self):
+        self.policy = RetryPolicy(attempts=0, base_delay=1.0, max_delay=60.0)
+        res, calls = self.send([FakeResponse(503), FakeResponse(200)])
+        self.assertEqual((res.status_code, calls), (503, 1))
+
+
+if __name__ == u"__main__":
+    unittest.main()